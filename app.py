@@ -1,9 +1,24 @@
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, render_template, request, send_file, jsonify, g, Response
 import os
 import json
+from datetime import datetime
+import functools
+import time
 import traceback
 import logging
 import tempfile
+import metrics
+import timing
+from batch import MAX_RANGES, run_batch
+from changes import get_change_log
+from enrich import get_enricher
+from joined import JoinedDataset
+from lean import get_event_details, lean_record
+from live import get_live_feed
+from pipeline import CsvSink, Pipeline
+from rollups import get_rollups
+from snapshots import get_bootstrap, publish_top
+from watchlist import get_watchlists
 from polymarket import PolymarketFetcher
 from polymarketevents import PolymarketEventsFetcher
 
@@ -21,16 +36,91 @@ TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
 # Create Flask app with explicit template directory
 app = Flask(__name__, template_folder=TEMPLATE_DIR)
 
-# Log initialization details
-logger.info(f"Flask app initialized with BASE_DIR: {BASE_DIR}")
-logger.info(f"Template directory: {TEMPLATE_DIR}")
-logger.info(f"Template directory exists: {os.path.exists(TEMPLATE_DIR)}")
-if os.path.exists(TEMPLATE_DIR):
-    logger.info(f"Template directory contents: {os.listdir(TEMPLATE_DIR)}")
+# Startup diagnostics (template listing, temp dir probing) are deferred to first use
+# so serverless cold starts don't pay for filesystem work; /health reports them on demand
+_temp_dir = None
 
-# Ensure we have a writable tmp directory for serverless environment
-temp_dir = tempfile.gettempdir()
-logger.info(f"Using temp directory: {temp_dir}")
+def get_temp_dir() -> str:
+    """Writable temp directory for exports, resolved on first use"""
+    global _temp_dir
+    if _temp_dir is None:
+        _temp_dir = tempfile.gettempdir()
+        logger.info(f"Using temp directory: {_temp_dir}")
+    return _temp_dir
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.phase_timer = timing.PhaseTimer().activate()
+    if timing.profiling_requested(request.headers):
+        g.profiler = timing.RequestProfiler(request.path)
+        g.profiler.start()
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    if 'request_start' in g:
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, (route, str(response.status_code)))
+    if response.content_length is not None:
+        metrics.RESPONSE_SIZE_BYTES.observe(response.content_length, (route,))
+    if 'phase_timer' in g and g.phase_timer.phases:
+        response.headers['Server-Timing'] = g.phase_timer.server_timing_header()
+    if g.get('profiler'):
+        profile_path = g.pop('profiler').stop()
+        logger.info(f"Wrote request profile to {profile_path}")
+        response.headers['X-Profile-File'] = os.path.basename(profile_path)
+    return response
+
+@app.teardown_request
+def stop_request_timer(exc):
+    if g.get('profiler'):
+        g.pop('profiler').profile.disable()
+    if 'phase_timer' in g:
+        g.phase_timer.deactivate()
+
+def debug_requested(data) -> bool:
+    """Whether the caller asked for the debug field via {"debug": true} or ?debug=1"""
+    return bool(data.get('debug')) or request.args.get('debug', '').lower() in ('1', 'true', 'yes')
+
+def refresh_top_list(kind: str):
+    """Fetch the unfiltered top 50 of a kind, write its CSV and publish it; used by the bootstrap refresh"""
+    fetcher = PolymarketEventsFetcher() if kind == 'events' else PolymarketFetcher()
+    filename = os.path.join(get_temp_dir(), 'polymarket_top50_events.csv' if kind == 'events' else 'polymarket_top50.csv')
+    records = Pipeline(kind, top=50, fetcher=fetcher, sinks=[CsvSink(filename, fetcher)]).run()
+    if records:
+        publish_top(kind, records)
+    return records
+
+for _kind in ('markets', 'events'):
+    get_bootstrap(_kind).refresh = functools.partial(refresh_top_list, _kind)
+
+def snapshot_response(kind: str, snapshot, fetcher, filename: str, data, lean: bool = False):
+    """/fetch_* response served from a bootstrap snapshot, marked with its age"""
+    records = snapshot['records']
+    if lean:
+        records = [lean_record(record) for record in records]
+    # Bundled snapshots have no known save time
+    age = time.time() - snapshot['saved_at'] if snapshot['saved_at'] is not None else None
+    described = f"{age:.0f}s old" if age is not None else "of unknown age"
+    logger.info(f"Serving {len(records)} {kind} from snapshot {snapshot['source']} ({described})")
+    if not os.path.exists(filename):
+        try:
+            fetcher.save_to_csv(records, filename)
+        except (OSError, KeyError) as e:
+            logger.warning(f"Could not write snapshot CSV {filename}: {e}")
+    payload = {
+        "success": True,
+        "message": f"Served {len(records)} {kind} from a snapshot {described}; refreshing in the background",
+        kind: records,
+        "filename": os.path.basename(filename),
+        "snapshot": {"source": snapshot['source'], "saved_at": snapshot['saved_at'],
+                     "age_seconds": round(age, 1) if age is not None else None},
+    }
+    if lean:
+        payload["lean"] = True
+    if debug_requested(data):
+        payload["debug"] = {"timing_ms": g.phase_timer.as_dict()}
+    return jsonify(payload)
 
 @app.route('/')
 def index():
@@ -57,9 +147,15 @@ def health():
         "template_dir": app.template_folder,
         "template_dir_exists": os.path.exists(app.template_folder),
         "cwd": os.getcwd(),
-        "base_dir": BASE_DIR
+        "base_dir": BASE_DIR,
+        "temp_dir": get_temp_dir()
     })
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint for this worker process"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/fetch_markets', methods=['POST'])
 def fetch_markets():
     try:
@@ -67,6 +163,8 @@ def fetch_markets():
         data = request.get_json() or {}
         start_date = data.get('start_date')
         end_date = data.get('end_date')
+        # Attach CLOB order-book prices, looked up in concurrent batches
+        enrich = bool(data.get('enrich'))
         
         # Set higher timeouts for serverless environment
         logger.info(f"Fetching top markets by volume (start_date: {start_date}, end_date: {end_date})")
@@ -75,33 +173,35 @@ def fetch_markets():
         # In a serverless environment, we need to be mindful of timeouts
         # Log the start of the operation
         logger.info("Starting markets API request...")
-        raw_markets = fetcher.fetch_top_markets_by_volume(50, start_date=start_date, end_date=end_date)
-        logger.info(f"Received markets API response with {len(raw_markets) if raw_markets else 0} markets")
-        
-        if not raw_markets:
-            logger.error("Failed to fetch markets data - empty response")
-            return jsonify({"error": "Failed to fetch markets data"}), 500
-        
-        # Parse and filter the markets
-        parsed_markets = []
-        for i, market in enumerate(raw_markets, 1):
-            parsed = fetcher.parse_market_data(market, i)
-            if parsed:
-                parsed_markets.append(parsed)
-        
-        # Take only top 50 and re-rank them
-        top_markets = parsed_markets[:50]
-        for i, market in enumerate(top_markets, 1):
-            market['rank'] = i
-        
         # Save data to CSV - use temp directory for serverless environment
         date_suffix = ""
         if start_date:
             date_suffix = f"_{start_date}"
         if end_date:
             date_suffix += f"_to_{end_date}"
-        filename = os.path.join(temp_dir, f"polymarket_top50{date_suffix}.csv")
-        fetcher.save_to_csv(top_markets, filename)
+        filename = os.path.join(get_temp_dir(), f"polymarket_top50{date_suffix}.csv")
+        
+        # After a cold start, answer from the persisted snapshot while a background fetch runs
+        if not start_date and not end_date and not enrich:
+            snapshot = get_bootstrap('markets').current()
+            if snapshot:
+                return snapshot_response('markets', snapshot, fetcher, filename, data)
+        
+        # Fetch, parse, filter, rank and write the CSV in one streaming pass
+        sinks = [get_enricher()] if enrich else []
+        sinks.append(CsvSink(filename, fetcher))
+        pipeline = Pipeline('markets', top=50, start_date=start_date, end_date=end_date, fetcher=fetcher,
+                            sinks=sinks)
+        top_markets = pipeline.run()
+        logger.info(f"Received {pipeline.stats['fetched']} markets from the API in {pipeline.stats['pages']} page(s)")
+        
+        if not pipeline.stats['fetched']:
+            logger.error("Failed to fetch markets data - empty response")
+            return jsonify({"error": "Failed to fetch markets data"}), 500
+        
+        # Only the unfiltered top list is a consistent series to diff against
+        if not start_date and not end_date:
+            publish_top('markets', top_markets)
         
         # Ensure required fields are present in each market
         for market in top_markets:
@@ -113,12 +213,16 @@ def fetch_markets():
             market.setdefault('liquidity', 0)
         
         logger.info(f"Successfully fetched {len(top_markets)} markets")
-        return jsonify({
+        payload = {
             "success": True, 
             "message": f"Successfully fetched {len(top_markets)} markets", 
             "markets": top_markets,
             "filename": os.path.basename(filename)
-        })
+        }
+        if debug_requested(data):
+            payload["debug"] = {"timing_ms": g.phase_timer.as_dict()}
+        with timing.phase('serialize'):
+            return jsonify(payload)
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Error fetching markets: {error_msg}")
@@ -132,6 +236,13 @@ def fetch_events():
         data = request.get_json() or {}
         start_date = data.get('start_date')
         end_date = data.get('end_date')
+        # Also return the markets nested in each event, parsed from the same response
+        expand = bool(data.get('expand_markets'))
+        enrich = bool(data.get('enrich'))
+        # Leave out nested markets and descriptions; /events/<id>/details has them
+        lean = bool(data.get('lean'))
+        if lean and expand:
+            return jsonify({"error": "lean and expand_markets can't be combined"}), 400
         
         # Set higher timeouts for serverless environment
         logger.info(f"Fetching top events by volume (start_date: {start_date}, end_date: {end_date})")
@@ -140,33 +251,37 @@ def fetch_events():
         # In a serverless environment, we need to be mindful of timeouts
         # Log the start of the operation
         logger.info("Starting events API request...")
-        raw_events = fetcher.fetch_top_events_by_volume(50, start_date=start_date, end_date=end_date)
-        logger.info(f"Received events API response with {len(raw_events) if raw_events else 0} events")
-        
-        if not raw_events:
-            logger.error("Failed to fetch events data - empty response")
-            return jsonify({"error": "Failed to fetch events data"}), 500
-        
-        # Parse and filter events
-        parsed_events = []
-        for i, event in enumerate(raw_events, 1):
-            parsed = fetcher.parse_event_data(event, i)
-            if parsed:
-                parsed_events.append(parsed)
-        
-        # Take only top 50 and re-rank them
-        top_events = parsed_events[:50]
-        for i, event in enumerate(top_events, 1):
-            event['rank'] = i
-        
         # Save data to CSV - use temp directory for serverless environment
         date_suffix = ""
         if start_date:
             date_suffix = f"_{start_date}"
         if end_date:
             date_suffix += f"_to_{end_date}"
-        filename = os.path.join(temp_dir, f"polymarket_top50_events{date_suffix}.csv")
-        fetcher.save_to_csv(top_events, filename)
+        filename = os.path.join(get_temp_dir(), f"polymarket_top50_events{date_suffix}.csv")
+        
+        # After a cold start, answer from the persisted snapshot while a background fetch runs;
+        # snapshots hold full records, trimmed here for lean requests
+        if not start_date and not end_date and not expand:
+            snapshot = get_bootstrap('events').current()
+            if snapshot:
+                return snapshot_response('events', snapshot, fetcher, filename, data, lean=lean)
+        
+        # Fetch, parse, filter, rank and write the CSV in one streaming pass
+        pipeline = Pipeline('events', top=50, start_date=start_date, end_date=end_date, fetcher=fetcher,
+                            sinks=[CsvSink(filename, fetcher)], expand_markets=expand, lean=lean)
+        top_events = pipeline.run()
+        logger.info(f"Received {pipeline.stats['fetched']} events from the API in {pipeline.stats['pages']} page(s)")
+        
+        if not pipeline.stats['fetched']:
+            logger.error("Failed to fetch events data - empty response")
+            return jsonify({"error": "Failed to fetch events data"}), 500
+        
+        # Only the unfiltered top list is a consistent series to diff against; lean records
+        # lack descriptions, so they'd overwrite the snapshot with incomplete ones
+        if not start_date and not end_date and not lean:
+            # Expanded events carry their parsed markets; the published list holds plain events
+            publish_top('events', [{key: value for key, value in event.items() if key != 'markets'}
+                                   for event in top_events] if expand else top_events)
         
         # Ensure required fields are present in each event
         for event in top_events:
@@ -181,18 +296,190 @@ def fetch_events():
             event.setdefault('event_id', None)
         
         logger.info(f"Successfully fetched {len(top_events)} events")
-        return jsonify({
+        payload = {
             "success": True, 
             "message": f"Successfully fetched {len(top_events)} events", 
             "events": top_events,
             "filename": os.path.basename(filename)
-        })
+        }
+        if lean:
+            payload["lean"] = True
+        if expand:
+            joined = JoinedDataset(top_events)
+            markets = joined.market_rows()
+            if enrich:
+                get_enricher().enrich(markets)
+            markets_filename = os.path.join(get_temp_dir(), f"polymarket_top50_event_markets{date_suffix}.csv")
+            payload["markets"] = markets
+            payload["index"] = {"event_markets": joined.event_markets, "market_event": joined.market_event}
+            if markets:
+                PolymarketFetcher().save_to_csv(markets, markets_filename)
+                payload["markets_filename"] = os.path.basename(markets_filename)
+        if debug_requested(data):
+            payload["debug"] = {"timing_ms": g.phase_timer.as_dict()}
+        with timing.phase('serialize'):
+            return jsonify(payload)
     except Exception as e:
         error_msg = str(e)
         logger.error(f"Error fetching events: {error_msg}")
         logger.error(traceback.format_exc())
         return jsonify({"error": error_msg}), 500
 
+@app.route('/fetch_batch', methods=['POST'])
+def fetch_batch():
+    """Top 50 per creation-date window, fetched concurrently with shared upstream pages
+
+    Body: {"kind": "markets", "ranges": [{"start_date": "2025-01-01", "end_date": "2025-03-31"}, ...]}
+    """
+    data = request.get_json() or {}
+    kind = data.get('kind', 'markets')
+    if kind not in ('markets', 'events'):
+        return jsonify({"error": "kind must be 'markets' or 'events'"}), 400
+    ranges = data.get('ranges')
+    if not isinstance(ranges, list) or not 1 <= len(ranges) <= MAX_RANGES:
+        return jsonify({"error": f"ranges must be a list of 1 to {MAX_RANGES} date windows"}), 400
+    windows = []
+    for item in ranges:
+        if not isinstance(item, dict):
+            return jsonify({"error": "each range must be an object with start_date and/or end_date"}), 400
+        window = (item.get('start_date') or None, item.get('end_date') or None)
+        try:
+            for date in window:
+                if date:
+                    datetime.fromisoformat(date)
+        except (TypeError, ValueError):
+            return jsonify({"error": f"invalid date in range {item}; use YYYY-MM-DD"}), 400
+        windows.append(window)
+    # Identical windows are fetched (and their CSV written) once
+    unique = list(dict.fromkeys(windows))
+
+    try:
+        fetcher = PolymarketEventsFetcher() if kind == 'events' else PolymarketFetcher()
+        filenames = []
+        for start_date, end_date in unique:
+            date_suffix = (f"_{start_date}" if start_date else "") + (f"_to_{end_date}" if end_date else "")
+            prefix = 'polymarket_top50_events' if kind == 'events' else 'polymarket_top50'
+            filenames.append(os.path.join(get_temp_dir(), f"{prefix}{date_suffix}.csv"))
+        logger.info(f"Fetching top {kind} for {len(unique)} date windows")
+        results, upstream = run_batch(kind, unique, top=50,
+                                      sinks_for=lambda i: [CsvSink(filenames[i], fetcher)])
+    except Exception as e:
+        logger.error(f"Error fetching batch: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({"error": str(e)}), 500
+    if not upstream['fetched']:
+        return jsonify({"error": f"Failed to fetch {kind} data"}), 500
+
+    by_window = {window: (records, filename) for window, records, filename in zip(unique, results, filenames)}
+    payload = {
+        "success": True,
+        "message": f"Fetched {len(windows)} date windows with {upstream['pages']} upstream page(s)",
+        "kind": kind,
+        "results": [{
+            "start_date": window[0],
+            "end_date": window[1],
+            kind: by_window[window][0],
+            "count": len(by_window[window][0]),
+            "filename": os.path.basename(by_window[window][1]) if by_window[window][0] else None,
+        } for window in windows],
+        "upstream": {"groups": [[unique[i] for i in group] for group in upstream['groups']],
+                     "pages": upstream['pages'], "fetched": upstream['fetched']},
+    }
+    if debug_requested(data):
+        payload["debug"] = {"timing_ms": g.phase_timer.as_dict()}
+    with timing.phase('serialize'):
+        return jsonify(payload)
+
+@app.route('/events/<event_id>/details')
+def event_details(event_id):
+    """Description and parsed nested markets of one event, for lean event lists"""
+    try:
+        details = get_event_details().get(event_id)
+    except Exception as e:
+        logger.error(f"Error fetching details of event {event_id}: {e}")
+        return jsonify({"error": str(e)}), 502
+    if details is None:
+        return jsonify({"error": f"Unknown event: {event_id}"}), 404
+    return jsonify(details)
+
+@app.route('/watchlists')
+def list_watchlists():
+    return jsonify({"watchlists": get_watchlists().names()})
+
+@app.route('/watchlists/<name>', methods=['GET', 'PUT', 'DELETE'])
+def watchlist(name):
+    """A watchlist's records, served from memory and refreshed by id once stale
+
+    PUT {"kind": "markets", "ids": [...]} creates or replaces it, DELETE removes
+    it, and GET ?refresh=1 forces a refresh.
+    """
+    store = get_watchlists()
+    if request.method == 'PUT':
+        data = request.get_json() or {}
+        ids = data.get('ids')
+        if not isinstance(ids, list):
+            return jsonify({"error": "ids must be a list of market or event ids"}), 400
+        try:
+            store.put(name, data.get('kind', 'markets'), ids)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    elif request.method == 'DELETE':
+        if not store.delete(name):
+            return jsonify({"error": f"Unknown watchlist: {name}"}), 404
+        return jsonify({"success": True, "deleted": name})
+
+    refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
+    try:
+        view = store.view(name, refresh=refresh)
+    except Exception as e:
+        logger.error(f"Error refreshing watchlist {name}: {e}")
+        return jsonify({"error": str(e)}), 502
+    if view is None:
+        return jsonify({"error": f"Unknown watchlist: {name}"}), 404
+    with timing.phase('serialize'):
+        return jsonify(view)
+
+@app.route('/changes')
+def changes():
+    """Rank and volume movers since a cursor: /changes?kind=markets&since=<cursor>
+
+    The response's cursor is passed back as since on the next poll; reset means
+    the client fell behind the retained history and should refetch the full list.
+    """
+    kind = request.args.get('kind', 'markets')
+    if kind not in ('markets', 'events'):
+        return jsonify({"error": "kind must be 'markets' or 'events'"}), 400
+    try:
+        since = int(request.args.get('since', 0))
+    except ValueError:
+        return jsonify({"error": "since must be an integer cursor"}), 400
+    return jsonify(get_change_log(kind).since(since))
+
+@app.route('/stats')
+def stats():
+    """Aggregates of the latest unfiltered top list: /stats?kind=markets
+
+    Totals plus count, volume, 24h volume, liquidity and top record per category
+    and per end month, maintained as snapshots are ingested.
+    """
+    kind = request.args.get('kind', 'markets')
+    if kind not in ('markets', 'events'):
+        return jsonify({"error": "kind must be 'markets' or 'events'"}), 400
+    return jsonify(get_rollups(kind).stats())
+
+@app.route('/stream')
+def stream():
+    """Server-Sent Events feed of the unfiltered top list: /stream?kind=markets
+
+    Every connected browser shares one refresh loop per worker, so upstream is
+    fetched once per interval regardless of the number of viewers.
+    """
+    kind = request.args.get('kind', 'markets')
+    if kind not in ('markets', 'events'):
+        return jsonify({"error": "kind must be 'markets' or 'events'"}), 400
+    return Response(get_live_feed(kind).stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/download/<path:filename>')
 def download_file(filename):
     # Sanitize filename to prevent directory traversal
@@ -204,7 +491,7 @@ def download_file(filename):
         return "File not found", 404
     
     # Use the temp directory path for the file
-    file_path = os.path.join(temp_dir, safe_filename)
+    file_path = os.path.join(get_temp_dir(), safe_filename)
     
     if not os.path.exists(file_path):
         logger.warning(f"Requested file does not exist: {file_path}")
@@ -0,0 +1,222 @@
+"""Several creation-date windows of one kind fetched concurrently, sharing upstream pages.
+
+Comparing date windows one /fetch_* request at a time costs one upstream pull
+per window, back to back. run_batch plans them together. Windows that mostly
+overlap are grouped, and each group reads a single upstream stream for the union
+of its windows. Every window takes its own top N from that stream by checking
+creation dates locally, so a page needed by several windows is fetched once.
+Each window still parses the page itself; after the first, those parses are
+mostly parse cache hits. Groups, and the windows within a group, run
+concurrently, so a batch takes about as long as its slowest group:
+
+    results, stats = run_batch('markets', [('2025-01-01', '2025-03-31'), ('2025-02-01', '2025-04-30')])
+"""
+import contextvars
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pipeline import FIRST_PAGE_FACTOR, MAX_PAGE_SIZE, MIN_PAGE_SIZE, SOURCES, Pipeline
+
+MAX_RANGES = 20
+# Windows share a stream when their overlap is at least this share of the combined span
+MIN_OVERLAP = 0.5
+
+
+def _map_in_context(executor: ThreadPoolExecutor, fn: Callable, items: Iterable) -> List:
+    """executor.map, with each call run in a copy of the caller's context so the request's phase timer sees it"""
+    futures = [executor.submit(contextvars.copy_context().run, fn, item) for item in items]
+    return [future.result() for future in futures]
+
+
+def _timestamp(date: Optional[str]) -> Optional[float]:
+    return datetime.fromisoformat(date).timestamp() if date else None
+
+
+class Window:
+    """One requested creation-date window, with the same bounds build_params sends upstream"""
+
+    def __init__(self, start_date: Optional[str] = None, end_date: Optional[str] = None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.start_ts = _timestamp(start_date)
+        self.end_ts = _timestamp(end_date)
+
+    def span(self, now: float) -> Tuple[float, float]:
+        return (self.start_ts if self.start_ts is not None else 0.0,
+                self.end_ts if self.end_ts is not None else now)
+
+    def end_bound(self, now: float) -> Optional[float]:
+        """The window's end_date_min; windows ending in the past all get "now" (see queryplan.py)"""
+        return self.end_ts if self.end_ts is not None and self.end_ts > now else None
+
+    def contains(self, record: Dict) -> bool:
+        """Whether a parsed record was created inside the window; unreadable dates pass"""
+        if self.start_ts is None and self.end_ts is None:
+            return True
+        created_at = record.get('created_at')
+        if not created_at:
+            return True
+        try:
+            from polymarket import parse_date
+            created_ts = float(created_at) if isinstance(created_at, (int, float)) else \
+                parse_date(created_at).timestamp()
+        except Exception:
+            return True
+        if self.start_ts is not None and created_ts < self.start_ts:
+            return False
+        return self.end_ts is None or created_ts <= self.end_ts
+
+
+class SharedPages:
+    """Raw upstream pages of one query, fetched once and read by any number of consumers
+
+    Args:
+        source: Pipeline source.
+        fetcher: Fetcher to request pages with.
+        window: Union window the pages are requested for.
+        page_size: Records per page.
+        concurrency: Pages requested in parallel per round after the first, which is one page.
+    """
+
+    def __init__(self, source, fetcher, window: Window, page_size: int, concurrency: int = 4):
+        self.source = source
+        self.fetcher = fetcher
+        self.window = window
+        self.page_size = page_size
+        self.concurrency = max(1, concurrency)
+        self.stats = {'pages': 0, 'fetched': 0}
+        self._pages: List[List[Dict]] = []
+        self._done = False
+        self._lock = threading.Lock()
+
+    def _fetch_round(self):
+        offset = len(self._pages) * self.page_size
+        fetch = lambda page_offset: self.source.fetch_page(self.fetcher, self.page_size, self.window.start_date,
+                                                           self.window.end_date, page_offset, self.page_size)
+        # Most windows are served by the first page; only the ones still short pay for a parallel round
+        count = self.concurrency if self._pages else 1
+        offsets = [offset + i * self.page_size for i in range(count)]
+        if count > 1:
+            with ThreadPoolExecutor(max_workers=count) as executor:
+                pages = _map_in_context(executor, fetch, offsets)
+        else:
+            pages = [fetch(offsets[0])]
+        for page in pages:
+            self.stats['pages'] += 1
+            self.stats['fetched'] += len(page)
+            self._pages.append(page)
+            if len(page) < self.page_size:
+                self._done = True
+                return
+
+    def get(self, index: int) -> Optional[List[Dict]]:
+        """Page index, fetching the next round if nobody has yet; None past the last page"""
+        while True:
+            if index < len(self._pages):
+                return self._pages[index]
+            if self._done:
+                return None
+            with self._lock:
+                # Another consumer may have fetched the round while this one waited
+                if index >= len(self._pages) and not self._done:
+                    self._fetch_round()
+
+
+class WindowPipeline(Pipeline):
+    """Pipeline for one window that reads its pages from a SharedPages stream"""
+
+    def __init__(self, kind: str, shared: SharedPages, window: Window, top: int = 50,
+                 sinks: Iterable[Callable] = ()):
+        super().__init__(kind, top=top, start_date=window.start_date, end_date=window.end_date,
+                         fetcher=shared.fetcher, filters=[window.contains], sinks=sinks)
+        self.shared = shared
+
+    def pages(self) -> Iterator[List[Dict]]:
+        index = 0
+        while True:
+            page = self.shared.get(index)
+            if page is None:
+                return
+            self.stats['pages'] += 1
+            self.stats['fetched'] += len(page)
+            yield page
+            index += 1
+
+
+def group_windows(windows: Sequence[Window], now: Optional[float] = None) -> List[List[int]]:
+    """Indexes of windows that share one upstream stream
+
+    A window joins a group when both push down the same end_date_min and the
+    window covers at least MIN_OVERLAP of their combined span.
+    """
+    now = time.time() if now is None else now
+    order = sorted(range(len(windows)), key=lambda i: windows[i].span(now))
+    groups: List[Tuple[List[int], float, float]] = []
+    for i in order:
+        start, end = windows[i].span(now)
+        for g, (members, group_start, group_end) in enumerate(groups):
+            if windows[members[0]].end_bound(now) != windows[i].end_bound(now):
+                continue
+            overlap = min(end, group_end) - max(start, group_start)
+            combined = max(end, group_end) - min(start, group_start)
+            if combined <= 0 or overlap / combined >= MIN_OVERLAP:
+                groups[g] = (members + [i], min(start, group_start), max(end, group_end))
+                break
+        else:
+            groups.append(([i], start, end))
+    return [members for members, _, _ in groups]
+
+
+def union_window(windows: Sequence[Window]) -> Window:
+    starts = [window.start_date for window in windows]
+    ends = [window.end_date for window in windows]
+    return Window(None if None in starts else min(starts), None if None in ends else max(ends))
+
+
+def page_size_for(windows: Sequence[Window], top: int, now: Optional[float] = None) -> int:
+    """Page size for a group's stream, so its first page likely holds the top of every window
+
+    Assumes creation dates are spread evenly, so a window covering a quarter of
+    the union's span needs four times as many records.
+    """
+    now = time.time() if now is None else now
+    spans = [window.span(now) for window in windows]
+    union = max(end for _, end in spans) - min(start for start, _ in spans)
+    coverage = min((end - start) / union for start, end in spans) if union > 0 else 1.0
+    size = math.ceil(top * FIRST_PAGE_FACTOR / max(coverage, 0.01))
+    return max(MIN_PAGE_SIZE, min(MAX_PAGE_SIZE, size))
+
+
+def run_batch(kind: str, ranges: Sequence[Tuple[Optional[str], Optional[str]]], top: int = 50,
+              concurrency: int = 4, sinks_for: Optional[Callable[[int], List[Callable]]] = None
+              ) -> Tuple[List[List[Dict]], Dict]:
+    """Top records of every (start_date, end_date) range, in request order, plus upstream stats
+
+    sinks_for(i) gives the sinks of range i, e.g. a CsvSink per range.
+    """
+    source = SOURCES[kind]
+    windows = [Window(start_date, end_date) for start_date, end_date in ranges]
+    groups = group_windows(windows)
+    pipelines: List[Optional[WindowPipeline]] = [None] * len(windows)
+    shared_streams = []
+    for members in groups:
+        members_windows = [windows[i] for i in members]
+        shared = SharedPages(source, source.make_fetcher(), union_window(members_windows),
+                             page_size_for(members_windows, top), concurrency)
+        shared_streams.append(shared)
+        for i in members:
+            pipelines[i] = WindowPipeline(kind, shared, windows[i], top=top,
+                                          sinks=sinks_for(i) if sinks_for else ())
+
+    with ThreadPoolExecutor(max_workers=len(pipelines)) as executor:
+        results = _map_in_context(executor, lambda pipeline: pipeline.run(), pipelines)
+    stats = {
+        'groups': groups,
+        'pages': sum(shared.stats['pages'] for shared in shared_streams),
+        'fetched': sum(shared.stats['fetched'] for shared in shared_streams),
+    }
+    return results, stats
@@ -0,0 +1,228 @@
+"""Offline benchmarks for the parse, categorize and export hot paths.
+
+Runs entirely on bundled or synthetic data; the fetchers' network calls are
+replaced with canned payloads for the route benchmarks. Results are written as
+JSON so runs from different releases can be compared:
+
+    python -m benchmarks.bench_hotpaths --output bench.json
+    python -m benchmarks.bench_hotpaths --sizes 10000 --compare bench.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+from unittest import mock
+
+from benchmarks.fixtures import BASE_DIR, load_fixture_events, synthetic_events, synthetic_markets
+from parse_cache import ParseCache
+from polymarket import PolymarketFetcher
+from polymarketevents import PolymarketEventsFetcher
+
+
+def _timed(fn: Callable[[], object], repeat: int) -> List[float]:
+    timings = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def _result(name: str, dataset: str, records: int, timings: List[float]) -> Dict:
+    median = statistics.median(timings)
+    return {
+        'name': name,
+        'dataset': dataset,
+        'records': records,
+        'repeat': len(timings),
+        'min_s': min(timings),
+        'median_s': median,
+        'max_s': max(timings),
+        'per_record_us': median / records * 1e6 if records else None,
+        'records_per_s': records / median if median > 0 else None,
+    }
+
+
+def bench_parsers(dataset: str, markets: List[Dict], events: List[Dict], repeat: int) -> List[Dict]:
+    """Benchmark the per-record parsers, tag categorization and both exporters"""
+    market_fetcher = PolymarketFetcher()
+    events_fetcher = PolymarketEventsFetcher()
+    results = []
+
+    def parse_markets():
+        return [market_fetcher.parse_market_data(m, i) for i, m in enumerate(markets, 1)]
+
+    def parse_events():
+        return [events_fetcher.parse_event_data(e, i) for i, e in enumerate(events, 1)]
+
+    tag_lists = [e.get('tags', []) for e in events]
+
+    def categorize():
+        for tags in tag_lists:
+            events_fetcher.parse_category_from_tags(tags)
+
+    # Warm cache, unchanged input: the steady state of a periodic refresh
+    cache = ParseCache(maxsize=len(markets) + len(events))
+
+    def parse_markets_cached():
+        return [cache.parse('markets', m, i, market_fetcher.parse_market_data) for i, m in enumerate(markets, 1)]
+
+    def parse_events_cached():
+        return [cache.parse('events', e, i, events_fetcher.parse_event_data) for i, e in enumerate(events, 1)]
+
+    if markets:
+        results.append(_result('parse_market_data', dataset, len(markets), _timed(parse_markets, repeat)))
+        _timed(parse_markets_cached, 1)
+        results.append(_result('parse_market_data.cached', dataset, len(markets),
+                               _timed(parse_markets_cached, repeat)))
+    if events:
+        results.append(_result('parse_event_data', dataset, len(events), _timed(parse_events, repeat)))
+        _timed(parse_events_cached, 1)
+        results.append(_result('parse_event_data.cached', dataset, len(events),
+                               _timed(parse_events_cached, repeat)))
+        results.append(_result('parse_category_from_tags', dataset, len(tag_lists), _timed(categorize, repeat)))
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        parsed_markets = [p for p in parse_markets() if p]
+        parsed_events = [p for p in parse_events() if p]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'bench.csv')
+        json_path = os.path.join(tmp, 'bench.json')
+        if parsed_markets:
+            results.append(_result('markets.save_to_csv', dataset, len(parsed_markets),
+                                   _timed(lambda: market_fetcher.save_to_csv(parsed_markets, csv_path), repeat)))
+            results.append(_result('markets.save_to_json', dataset, len(parsed_markets),
+                                   _timed(lambda: market_fetcher.save_to_json(parsed_markets, json_path), repeat)))
+        if parsed_events:
+            results.append(_result('events.save_to_csv', dataset, len(parsed_events),
+                                   _timed(lambda: events_fetcher.save_to_csv(parsed_events, csv_path), repeat)))
+            results.append(_result('events.save_to_json', dataset, len(parsed_events),
+                                   _timed(lambda: events_fetcher.save_to_json(parsed_events, json_path), repeat)))
+    return results
+
+
+def bench_routes(repeat: int) -> List[Dict]:
+    """Benchmark end-to-end route latency through the Flask test client with canned upstream data"""
+    from app import app
+    from snapshots import Bootstrap
+
+    client = app.test_client()
+    raw_markets = synthetic_markets(150, seed=1)
+    raw_events = synthetic_events(100, seed=1)
+    results = []
+
+    # Without a bootstrap snapshot every request runs the pipeline, and the
+    # snapshots it publishes go to a scratch dir rather than the real one
+    with tempfile.TemporaryDirectory() as snapshot_dir, \
+            mock.patch.dict(os.environ, {'POLYMARKET_SNAPSHOT_DIR': snapshot_dir}), \
+            mock.patch.object(Bootstrap, 'current', return_value=None), \
+            mock.patch.object(PolymarketFetcher, 'fetch_top_markets_by_volume', return_value=raw_markets), \
+            mock.patch.object(PolymarketEventsFetcher, 'fetch_top_events_by_volume', return_value=raw_events):
+        for route, records in (('/fetch_markets', raw_markets), ('/fetch_events', raw_events)):
+            filename = {}
+
+            def call():
+                response = client.post(route, json={})
+                assert response.status_code == 200, response.status_code
+                payload = response.get_json()
+                assert 'snapshot' not in payload, 'answered from a snapshot'
+                filename['name'] = payload['filename']
+
+            results.append(_result(f"POST {route}", 'synthetic-route', len(records), _timed(call, repeat)))
+
+            def download():
+                response = client.get(f"/download/{filename['name']}")
+                assert response.status_code == 200, response.status_code
+                response.get_data()
+                response.close()
+
+            results.append(_result(f"GET /download ({route})", 'synthetic-route', 50, _timed(download, repeat)))
+    return results
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> int:
+    """Print median ratios against a baseline run; return the number of regressions"""
+    previous = {(r['name'], r['dataset']): r for r in baseline.get('results', [])}
+    regressions = 0
+    print(f"{'benchmark':<45} {'dataset':<18} {'baseline':>10} {'current':>10} {'ratio':>7}", file=sys.stderr)
+    for result in current['results']:
+        old = previous.get((result['name'], result['dataset']))
+        if not old:
+            continue
+        ratio = result['median_s'] / old['median_s'] if old['median_s'] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions += 1
+            flag = '  REGRESSION'
+        print(f"{result['name']:<45} {result['dataset']:<18} {old['median_s']:>10.4f} "
+              f"{result['median_s']:>10.4f} {ratio:>7.2f}{flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for parse, categorize and export hot paths')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                        help='Synthetic catalog sizes to benchmark (default: 10000 100000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed repetitions per benchmark')
+    parser.add_argument('--skip-routes', action='store_true', help='Skip the Flask route benchmarks')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='Baseline JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown that counts as a regression (default: 0.2)')
+    args = parser.parse_args()
+
+    results = []
+    fixture_events = load_fixture_events()
+    results += bench_parsers('bundled-top50', fixture_events, fixture_events, args.repeat)
+    for size in args.sizes:
+        print(f"Generating synthetic catalog of {size} records...", file=sys.stderr)
+        results += bench_parsers(f"synthetic-{size}", synthetic_markets(size), synthetic_events(size), args.repeat)
+    if not args.skip_routes:
+        results += bench_routes(args.repeat)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Cold-start benchmark based on ``python -X importtime``.
+
+Imports each entry module in a fresh interpreter several times and records the
+cumulative import time, the process wall time and the slowest imports, so
+cold-start regressions show up between releases:
+
+    python -m benchmarks.bench_importtime --output importtime.json
+    python -m benchmarks.bench_importtime --compare importtime.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from benchmarks.fixtures import BASE_DIR
+
+DEFAULT_MODULES = ['app', 'api.index', 'polymarket', 'polymarketevents']
+
+
+def parse_importtime(stderr: str) -> List[Dict]:
+    """Parse '-X importtime' output into [{'module', 'self_us', 'cumulative_us'}, ...]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            _, self_us, cumulative_us, name = (part.strip() for part in line.replace('import time:', '|', 1).split('|'))
+            rows.append({'module': name, 'self_us': int(self_us), 'cumulative_us': int(cumulative_us)})
+        except ValueError:
+            continue
+    return rows
+
+
+def measure(module: str, runs: int) -> Dict:
+    """Import module in runs fresh interpreters and summarize the timings"""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    cumulative, wall, self_times = [], [], {}
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                                   cwd=BASE_DIR, env=env, capture_output=True, text=True)
+        wall.append(time.perf_counter() - start)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+        rows = parse_importtime(completed.stderr)
+        top = next((row for row in reversed(rows) if row['module'] == module), None)
+        cumulative.append(top['cumulative_us'] if top else sum(row['self_us'] for row in rows))
+        for row in rows:
+            self_times.setdefault(row['module'], []).append(row['self_us'])
+
+    slowest = sorted(((statistics.median(values), name) for name, values in self_times.items()), reverse=True)[:15]
+    return {
+        'name': f"import {module}",
+        'runs': runs,
+        'median_s': statistics.median(cumulative) / 1e6,
+        'min_s': min(cumulative) / 1e6,
+        'process_wall_median_s': statistics.median(wall),
+        'slowest_self_us': [{'module': name, 'self_us': us} for us, name in slowest],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold-start import cost of the app entry points')
+    parser.add_argument('--modules', nargs='+', default=DEFAULT_MODULES)
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per module')
+    parser.add_argument('--output', help='Write JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='Baseline JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Relative slowdown that counts as a regression (default: 0.2)')
+    args = parser.parse_args()
+
+    results = [measure(module, args.runs) for module in args.modules]
+    for result in results:
+        print(f"{result['name']:<30} {result['median_s'] * 1000:8.1f} ms import "
+              f"{result['process_wall_median_s'] * 1000:8.1f} ms process", file=sys.stderr)
+
+    report = {'meta': {'python': sys.version.split()[0], 'runs': args.runs}, 'results': results}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        from benchmarks.bench_hotpaths import compare
+
+        baseline_results = []
+        with open(args.compare, encoding='utf-8') as f:
+            for result in json.load(f).get('results', []):
+                baseline_results.append(dict(result, dataset='cold-start'))
+        current = {'results': [dict(result, dataset='cold-start') for result in results]}
+        if compare(current, {'results': baseline_results}, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
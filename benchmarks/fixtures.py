@@ -0,0 +1,135 @@
+"""Offline Gamma-shaped data for benchmarks and the local API stand-in.
+
+Two sources are available: the bundled polymarket_top50_events.json snapshot
+converted back into raw Gamma event payloads, and deterministic synthetic
+catalogs of any size. Synthetic catalogs include a share of closed, low-volume
+and already-ended records so the skip paths of the parsers get exercised too.
+"""
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUNDLED_EVENTS_FILE = os.path.join(BASE_DIR, 'polymarket_top50_events.json')
+
+TAG_LABELS = [
+    'Politics', 'Elections', 'Fed Rates', 'Economy', 'Crypto', 'Bitcoin', 'Sports',
+    'NBA', 'Soccer', 'Culture', 'Geopolitics', 'Ukraine', 'AI', 'Big Tech',
+    'Recurring', 'Weekly', 'Weather', 'Science'
+]
+TITLE_WORDS = [
+    'Fed', 'Trump', 'election', 'Bitcoin', 'NBA', 'Finals', 'Ukraine', 'ceasefire',
+    'OpenAI', 'Oscar', 'inflation', 'GDP', 'mayor', 'tournament', 'rain', 'record'
+]
+
+
+def _iso(dt: datetime) -> str:
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def load_fixture_events() -> List[Dict]:
+    """Return the bundled top-50 snapshot as raw Gamma event payloads
+
+    The snapshot stores parsed rows, so the fields are mapped back to their
+    upstream names. End dates are moved into the future so the records survive
+    the end-date filter regardless of when the benchmark runs.
+    """
+    with open(BUNDLED_EVENTS_FILE, encoding='utf-8') as f:
+        rows = json.load(f)
+
+    now = datetime.now(timezone.utc)
+    events = []
+    for i, row in enumerate(rows, 1):
+        events.append({
+            'id': str(row.get('market_id') or row.get('event_id') or i),
+            'slug': row.get('market_slug') or row.get('event_slug', ''),
+            'title': row.get('title'),
+            'description': row.get('description', ''),
+            'volume': row.get('volume_total') or row.get('volume_usd', 0),
+            'volume24hr': row.get('volume_24h', 0),
+            'liquidity': row.get('liquidity', 0),
+            'createdAt': row.get('created_at'),
+            'endDate': _iso(now + timedelta(days=30 + i)),
+            'active': True,
+            'closed': False,
+            'tags': [{'label': row.get('category', 'Uncategorized')}],
+            'markets': [],
+        })
+    return events
+
+
+def synthetic_markets(n: int, seed: int = 0) -> List[Dict]:
+    """Generate n raw Gamma market payloads sorted by volume descending"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    markets = []
+    for i in range(n):
+        volume = rng.lognormvariate(10, 2.5)
+        roll = rng.random()
+        closed = roll < 0.05
+        low_volume = 0.05 <= roll < 0.10
+        ended = 0.10 <= roll < 0.15
+        if low_volume:
+            volume = rng.uniform(0, 999)
+        end = now - timedelta(days=rng.randint(1, 60)) if ended else now + timedelta(days=rng.randint(1, 400))
+        title = ' '.join(rng.choice(TITLE_WORDS) for _ in range(6)) + '?'
+        markets.append({
+            'id': str(500000 + i),
+            'slug': f"synthetic-market-{i}",
+            'question': title,
+            'conditionId': f"0x{rng.getrandbits(128):032x}",
+            'description': 'Synthetic market for benchmarking. ' * rng.randint(1, 20),
+            'volume': f"{volume:.6f}",
+            'volumeNum': volume,
+            'volume24hr': volume * rng.uniform(0, 0.2),
+            'liquidity': f"{volume * rng.uniform(0.01, 0.3):.5f}",
+            'createdAt': _iso(now - timedelta(days=rng.randint(1, 700))),
+            'endDate': _iso(end),
+            'updatedAt': _iso(now - timedelta(minutes=rng.randint(0, 10000))),
+            'active': True,
+            'closed': closed,
+            'outcomes': '["Yes", "No"]',
+            'clobTokenIds': json.dumps([str(rng.getrandbits(64)), str(rng.getrandbits(64))]),
+        })
+    markets.sort(key=lambda m: m['volumeNum'], reverse=True)
+    return markets
+
+
+def synthetic_events(n: int, seed: int = 0, markets_per_event: int = 3) -> List[Dict]:
+    """Generate n raw Gamma event payloads with nested markets, sorted by volume descending"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    events = []
+    for i in range(n):
+        nested = synthetic_markets(rng.randint(1, markets_per_event * 2 - 1), seed=seed * 1000003 + i)
+        # Market ids are unique across events, as upstream, so event↔market joins stay one-to-many
+        for j, market in enumerate(nested):
+            market['id'] = str(1000000 + i * 100 + j)
+            market['slug'] = f"synthetic-event-{i}-market-{j}"
+        volume = sum(m['volumeNum'] for m in nested) * rng.uniform(1, 10)
+        roll = rng.random()
+        if roll < 0.05:
+            volume = rng.uniform(0, 9999)
+        end = now - timedelta(days=rng.randint(1, 60)) if 0.05 <= roll < 0.10 else now + timedelta(days=rng.randint(1, 400))
+        events.append({
+            'id': str(20000 + i),
+            'slug': f"synthetic-event-{i}",
+            'title': ' '.join(rng.choice(TITLE_WORDS) for _ in range(4)),
+            'description': 'Synthetic event for benchmarking. ' * rng.randint(1, 30),
+            'volume': volume,
+            'volume24hr': volume * rng.uniform(0, 0.1),
+            'liquidity': volume * rng.uniform(0.01, 0.2),
+            'createdAt': _iso(now - timedelta(days=rng.randint(1, 700))),
+            'endDate': _iso(end),
+            'updatedAt': _iso(now - timedelta(minutes=rng.randint(0, 10000))),
+            'active': True,
+            'closed': 0.10 <= roll < 0.13,
+            'featured': rng.random() < 0.05,
+            'competitive': rng.random(),
+            'tags': [{'label': label} for label in rng.sample(TAG_LABELS, rng.randint(0, 4))],
+            'markets': nested,
+        })
+    events.sort(key=lambda e: e['volume'], reverse=True)
+    return events
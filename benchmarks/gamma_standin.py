@@ -0,0 +1,297 @@
+"""Local stand-in for the Gamma API, for offline load testing.
+
+Serves /markets and /events from the bundled snapshot or from synthetic
+catalogs and honours limit, offset, order, ascending, closed, active and the
+volume_num_min / volume_min / end_date_min lower bounds and the
+created_at_min / created_at_max window, repeated id parameters, plus single records
+by id (GET /markets/<id>, /events/<id>).
+It also answers CLOB-style order-book lookups (GET /book?token_id=... and
+POST /books with [{"token_id": ...}]) with deterministic synthetic books, for
+the price enrichment in enrich.py. Latency, jitter and error rates can be
+injected so throughput and tail latency are reproducible on one machine:
+
+    python -m benchmarks.gamma_standin --port 8900 --markets 10000 --events 5000 \\
+        --latency-ms 150 --jitter-ms 50 --error-429 0.02 --error-5xx 0.01
+    POLYMARKET_GAMMA_URL=http://127.0.0.1:8900 POLYMARKET_CLOB_URL=http://127.0.0.1:8900 python run.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fixtures import load_fixture_events, synthetic_events, synthetic_markets
+
+
+def _sort_value(record: Dict, order: str) -> Tuple[float, str]:
+    value = record.get(order)
+    if value is None:
+        value = record.get('volume', 0)
+    try:
+        return float(value), ''
+    except (TypeError, ValueError):
+        # ISO timestamps such as updatedAt sort correctly as strings
+        return 0.0, str(value)
+
+
+def synthetic_book(token_id: str) -> Dict:
+    """Order book for a token id, the same on every call"""
+    rng = random.Random(token_id)
+    mid = rng.uniform(0.03, 0.97)
+    half_spread = rng.choice((0.005, 0.01, 0.02))
+    bids = [{'price': f"{max(mid - half_spread - i * 0.01, 0.001):.3f}", 'size': f"{rng.uniform(10, 5000):.2f}"}
+            for i in range(rng.randint(1, 8))]
+    asks = [{'price': f"{min(mid + half_spread + i * 0.01, 0.999):.3f}", 'size': f"{rng.uniform(10, 5000):.2f}"}
+            for i in range(rng.randint(1, 8))]
+    # Upstream lists levels worst-first, so the best bid and ask are the last entries
+    return {'asset_id': token_id, 'bids': bids[::-1], 'asks': asks[::-1],
+            'timestamp': str(int(time.time() * 1000))}
+
+
+def _parse_bool(value: Optional[str]) -> Optional[bool]:
+    if value is None:
+        return None
+    return value.lower() in ('true', '1', 'yes')
+
+
+def _parse_date_bound(value: Optional[str]) -> Optional[str]:
+    """An epoch or ISO end_date_min as an ISO string comparable with the fixtures' endDate"""
+    if value is None:
+        return None
+    try:
+        return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(float(value)))
+    except ValueError:
+        return value
+
+
+class GammaStandin:
+    """In-memory catalog plus the fault-injection settings shared by all handler threads
+
+    Args:
+        catalogs: Mapping of endpoint name ('markets', 'events') to raw records.
+        latency_ms: Base latency added to every response.
+        jitter_ms: Uniform random jitter added on top of the base latency.
+        error_429: Fraction of requests answered with 429 and a Retry-After header.
+        error_5xx: Fraction of requests answered with a 502/503/504.
+        retry_after: Value of the Retry-After header sent with 429s.
+        seed: Seed for the latency and fault RNG, for reproducible runs.
+    """
+
+    def __init__(self, catalogs: Dict[str, List[Dict]], latency_ms: float = 0, jitter_ms: float = 0,
+                 error_429: float = 0, error_5xx: float = 0, retry_after: float = 1, seed: int = 0):
+        self.catalogs = catalogs
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._views = {}
+        self._views_lock = threading.Lock()
+        self.stats = {'requests': 0, '429': 0, '5xx': 0}
+
+    def draw(self):
+        """Return (delay seconds, injected status or None) for one request"""
+        with self._rng_lock:
+            self.stats['requests'] += 1
+            delay = (self.latency_ms + self._rng.uniform(0, self.jitter_ms)) / 1000.0
+            roll = self._rng.random()
+            if roll < self.error_429:
+                self.stats['429'] += 1
+                return delay, 429
+            if roll < self.error_429 + self.error_5xx:
+                self.stats['5xx'] += 1
+                return delay, self._rng.choice((502, 503, 504))
+            return delay, None
+
+    def by_id(self, endpoint: str, record_id: str) -> Optional[Dict]:
+        with self._views_lock:
+            index = self._views.get((endpoint, 'by_id'))
+            if index is None:
+                index = self._views[(endpoint, 'by_id')] = {str(r.get('id')): r for r in self.catalogs.get(endpoint, [])}
+        return index.get(record_id)
+
+    def view(self, endpoint: str, order: Optional[str], ascending: bool,
+             closed: Optional[bool], active: Optional[bool], volume_min: Optional[float] = None,
+             end_date_min: Optional[str] = None, created_min: Optional[str] = None,
+             created_max: Optional[str] = None) -> List[Dict]:
+        """Filtered and sorted records, cached per distinct query shape"""
+        key = (endpoint, order, ascending, closed, active, volume_min, end_date_min, created_min, created_max)
+        with self._views_lock:
+            cached = self._views.get(key)
+        if cached is not None:
+            return cached
+
+        records = self.catalogs.get(endpoint, [])
+        if closed is not None:
+            records = [r for r in records if bool(r.get('closed', False)) == closed]
+        if active is not None:
+            records = [r for r in records if bool(r.get('active', True)) == active]
+        if volume_min is not None:
+            records = [r for r in records if float(r.get('volumeNum', r.get('volume')) or 0) >= volume_min]
+        if end_date_min is not None:
+            records = [r for r in records if not r.get('endDate') or r['endDate'] > end_date_min]
+        if created_min is not None:
+            records = [r for r in records if r.get('createdAt', '') >= created_min]
+        if created_max is not None:
+            records = [r for r in records if r.get('createdAt', '') <= created_max]
+        if order:
+            records = sorted(records, key=lambda r: _sort_value(r, order), reverse=not ascending)
+
+        with self._views_lock:
+            self._views[key] = records
+        return records
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server_version = 'GammaStandin/1.0'
+    standin: GammaStandin = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload, headers: Optional[Dict] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _inject(self) -> bool:
+        """Apply the configured latency and faults; True when an error response was sent"""
+        delay, injected = self.standin.draw()
+        if delay:
+            time.sleep(delay)
+        if injected == 429:
+            self._send_json(429, {'error': 'Too Many Requests'}, {'Retry-After': str(self.standin.retry_after)})
+            return True
+        if injected:
+            self._send_json(injected, {'error': 'Injected upstream failure'})
+            return True
+        return False
+
+    def do_POST(self):
+        if urlparse(self.path).path.strip('/') != 'books':
+            return self._send_json(404, {'error': f"Unknown endpoint: {self.path}"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'[]')
+            token_ids = [str(item['token_id']) for item in body]
+        except (ValueError, TypeError, KeyError):
+            return self._send_json(400, {'error': 'expected a JSON list of {"token_id": ...}'})
+        if self._inject():
+            return
+        self._send_json(200, [synthetic_book(token_id) for token_id in token_ids])
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        endpoint = parsed.path.strip('/')
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+
+        if endpoint == 'stats':
+            return self._send_json(200, self.standin.stats)
+        if endpoint == 'book':
+            if not query.get('token_id'):
+                return self._send_json(400, {'error': 'token_id is required'})
+            if self._inject():
+                return
+            return self._send_json(200, synthetic_book(query['token_id']))
+        collection, _, record_id = endpoint.partition('/')
+        if record_id and collection in self.standin.catalogs:
+            if self._inject():
+                return
+            record = self.standin.by_id(collection, record_id)
+            if record is None:
+                return self._send_json(404, {'error': f"Unknown id: {record_id}"})
+            return self._send_json(200, record)
+        if endpoint not in self.standin.catalogs:
+            return self._send_json(404, {'error': f"Unknown endpoint: {parsed.path}"})
+
+        if self._inject():
+            return
+
+        try:
+            limit = int(query.get('limit', 100))
+            offset = int(query.get('offset', 0))
+            volume_min = query.get('volume_num_min' if endpoint == 'markets' else 'volume_min')
+            volume_min = float(volume_min) if volume_min is not None else None
+            end_date_min = _parse_date_bound(query.get('end_date_min'))
+            created_min = _parse_date_bound(query.get('created_at_min'))
+            created_max = _parse_date_bound(query.get('created_at_max'))
+        except ValueError:
+            return self._send_json(422, {'error': 'limit, offset and the lower bounds must be numbers'})
+
+        ids = parse_qs(parsed.query).get('id')
+        if ids:
+            found = (self.standin.by_id(endpoint, record_id) for record_id in ids)
+            return self._send_json(200, [record for record in found if record is not None][offset:offset + limit])
+
+        records = self.standin.view(
+            endpoint,
+            query.get('order'),
+            _parse_bool(query.get('ascending')) or False,
+            _parse_bool(query.get('closed')),
+            _parse_bool(query.get('active')),
+            volume_min,
+            end_date_min,
+            created_min,
+            created_max,
+        )
+        self._send_json(200, records[offset:offset + limit])
+
+
+def make_server(standin: GammaStandin, host: str = '127.0.0.1', port: int = 8900) -> ThreadingHTTPServer:
+    """Create (but don't start) a threaded HTTP server bound to the given stand-in"""
+    handler = type('BoundStandinHandler', (StandinHandler,), {'standin': standin})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Gamma API stand-in for offline load testing')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--fixture', choices=['synthetic', 'bundled'], default='synthetic',
+                        help='Serve generated catalogs or the bundled top-50 snapshot')
+    parser.add_argument('--markets', type=int, default=10000, help='Synthetic markets to generate')
+    parser.add_argument('--events', type=int, default=5000, help='Synthetic events to generate')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for data generation and fault injection')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Base latency per response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Uniform jitter added to the latency')
+    parser.add_argument('--error-429', type=float, default=0, help='Fraction of requests answered with 429')
+    parser.add_argument('--error-5xx', type=float, default=0, help='Fraction of requests answered with 5xx')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After seconds sent with 429s')
+    args = parser.parse_args()
+
+    if args.fixture == 'bundled':
+        events = load_fixture_events()
+        catalogs = {'markets': events, 'events': events}
+    else:
+        catalogs = {
+            'markets': synthetic_markets(args.markets, seed=args.seed),
+            'events': synthetic_events(args.events, seed=args.seed),
+        }
+
+    standin = GammaStandin(catalogs, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                           error_429=args.error_429, error_5xx=args.error_5xx,
+                           retry_after=args.retry_after, seed=args.seed)
+    server = make_server(standin, args.host, args.port)
+    print(f"Gamma stand-in serving {len(catalogs['markets'])} markets and {len(catalogs['events'])} events "
+          f"on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
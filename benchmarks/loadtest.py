@@ -0,0 +1,229 @@
+"""Load generator for the Flask routes.
+
+Drives /fetch_markets, /fetch_events and /download at a fixed concurrency and
+request mix against a running app and reports requests/sec, p50/p95/p99
+latency and error rates:
+
+    python -m benchmarks.loadtest --target http://127.0.0.1:5000 --concurrency 16 --duration 30 \\
+        --mix fetch_markets=4,fetch_events=4,download=2 --output run.json
+
+With --sweep it starts gunicorn itself for each workers x threads setting and
+prints a side-by-side comparison (point the app at benchmarks.gamma_standin
+through POLYMARKET_GAMMA_URL to keep production out of the loop):
+
+    POLYMARKET_GAMMA_URL=http://127.0.0.1:8900 python -m benchmarks.loadtest --sweep 1x1 2x4 4x8
+"""
+import argparse
+import json
+import math
+import random
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from benchmarks.fixtures import BASE_DIR
+
+OPERATIONS = ('fetch_markets', 'fetch_events', 'download')
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """Parse 'fetch_markets=4,download=1' into [(operation, weight), ...]"""
+    mix = []
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{name}' (choose from {', '.join(OPERATIONS)})")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _summarize(samples: List[Tuple[float, bool]], elapsed: float) -> Dict:
+    latencies = sorted(latency for latency, _ in samples)
+    errors = sum(1 for _, ok in samples if not ok)
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': errors / len(samples) if samples else 0.0,
+        'rps': len(samples) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'p95_ms': percentile(latencies, 95) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+        'max_ms': latencies[-1] * 1000 if latencies else None,
+    }
+
+
+def run_load(target: str, concurrency: int, mix: List[Tuple[str, float]], duration: float,
+             body: Optional[Dict] = None, timeout: float = 120, seed: int = 0) -> Dict:
+    """Run the request mix for duration seconds and return the summary"""
+    target = target.rstrip('/')
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    samples = {name: [] for name in names}
+    statuses = {}
+    lock = threading.Lock()
+    filenames = {}
+    deadline = time.perf_counter() + duration
+
+    def prime(session):
+        # /download needs a file produced by an earlier fetch
+        for route, key in (('/fetch_markets', 'markets'), ('/fetch_events', 'events')):
+            try:
+                response = session.post(f"{target}{route}", json=body or {}, timeout=timeout)
+                if response.ok:
+                    filenames[key] = response.json().get('filename')
+            except (requests.RequestException, ValueError):
+                pass
+
+    def worker(index: int):
+        rng = random.Random(seed + index)
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            operation = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            status = 'exception'
+            try:
+                if operation == 'download':
+                    filename = filenames.get(rng.choice(('markets', 'events'))) or 'polymarket_top50.csv'
+                    response = session.get(f"{target}/download/{filename}", timeout=timeout)
+                else:
+                    response = session.post(f"{target}/{operation}", json=body or {}, timeout=timeout)
+                    if response.ok and operation == 'fetch_markets':
+                        filenames['markets'] = response.json().get('filename')
+                    elif response.ok:
+                        filenames['events'] = response.json().get('filename')
+                status = response.status_code
+                ok = response.ok
+            except (requests.RequestException, ValueError):
+                ok = False
+            latency = time.perf_counter() - start
+            with lock:
+                samples[operation].append((latency, ok))
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    if 'download' in names:
+        prime(requests.Session())
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    all_samples = [sample for values in samples.values() for sample in values]
+    return {
+        'target': target,
+        'concurrency': concurrency,
+        'duration_s': elapsed,
+        'mix': dict(mix),
+        'overall': _summarize(all_samples, elapsed),
+        'by_operation': {name: _summarize(values, elapsed) for name, values in samples.items()},
+        'status_codes': statuses,
+    }
+
+
+def _wait_healthy(target: str, timeout: float = 30) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{target}/health", timeout=2).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def run_gunicorn(setting: str, port: int, args) -> Dict:
+    """Start gunicorn with a 'WORKERSxTHREADS' setting, load it, and shut it down"""
+    workers, _, threads = setting.partition('x')
+    command = [sys.executable, '-m', 'gunicorn', '-w', workers, '--threads', threads or '1',
+               '-b', f"127.0.0.1:{port}", '--timeout', '120', 'app:app']
+    print(f"Starting: {' '.join(command)}", file=sys.stderr)
+    process = subprocess.Popen(command, cwd=BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    target = f"http://127.0.0.1:{port}"
+    try:
+        if not _wait_healthy(target):
+            raise RuntimeError(f"gunicorn ({setting}) did not become healthy")
+        result = run_load(target, args.concurrency, args.mix, args.duration, args.body, seed=args.seed)
+        result['label'] = f"gunicorn {workers}w x {threads or '1'}t"
+        return result
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def print_table(runs: List[Dict]):
+    print(f"{'run':<28} {'conc':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for run in runs:
+        overall = run['overall']
+
+        def fmt(value):
+            return f"{value:9.1f}" if value is not None else f"{'-':>9}"
+
+        print(f"{run.get('label', run['target']):<28} {run['concurrency']:>5} {overall['rps']:>8.1f} "
+              f"{fmt(overall['p50_ms'])} {fmt(overall['p95_ms'])} {fmt(overall['p99_ms'])} "
+              f"{overall['error_rate']:>7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the Flask routes and report throughput and latency')
+    parser.add_argument('--target', default='http://127.0.0.1:5000', help='Base URL of a running app')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent client threads')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run each load test')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('fetch_markets=4,fetch_events=4,download=2'),
+                        help='Weighted request mix (default: fetch_markets=4,fetch_events=4,download=2)')
+    parser.add_argument('--body', type=json.loads, default=None,
+                        help='JSON body for the fetch routes, e.g. \'{"start_date": "2025-01-01"}\'')
+    parser.add_argument('--label', help='Label for this run in comparisons')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sweep', nargs='+', metavar='WORKERSxTHREADS',
+                        help='Start gunicorn for each setting (e.g. 1x1 2x4 4x8) and compare them')
+    parser.add_argument('--port', type=int, default=5055, help='Port for gunicorn started by --sweep')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    parser.add_argument('--compare', nargs='+', metavar='RESULT_JSON',
+                        help='Print a comparison of previously saved runs and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        runs = []
+        for path in args.compare:
+            with open(path, encoding='utf-8') as f:
+                loaded = json.load(f)
+            runs.extend(loaded if isinstance(loaded, list) else [loaded])
+        print_table(runs)
+        return
+
+    if args.sweep:
+        runs = [run_gunicorn(setting, args.port, args) for setting in args.sweep]
+    else:
+        run = run_load(args.target, args.concurrency, args.mix, args.duration, args.body, seed=args.seed)
+        run['label'] = args.label or run['target']
+        runs = [run]
+
+    print_table(runs)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(runs if len(runs) > 1 else runs[0], f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
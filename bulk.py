@@ -0,0 +1,167 @@
+"""Multi-process bulk parsing of saved market/event dumps.
+
+Reads a dump of raw Gamma records (a JSON array or NDJSON, optionally gzipped),
+parses it in chunks across a ProcessPoolExecutor with the regular
+parse_market_data/parse_event_data, and merges the chunk results into a single
+output ranked by volume:
+
+    python bulk.py archive/markets.ndjson.gz --kind markets --workers 8 --output markets.csv
+"""
+import argparse
+import contextlib
+import gzip
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_CHUNK_SIZE = 2000
+
+_worker_fetcher = None
+
+
+def _open_text(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, encoding='utf-8')
+
+
+def iter_dump(path: str) -> Iterator[Dict]:
+    """Yield raw records from a JSON array or NDJSON dump
+
+    NDJSON is streamed line by line; a JSON array (or a pretty-printed object
+    wrapping 'markets'/'events') has to be loaded whole.
+    """
+    with _open_text(path) as f:
+        first = f.readline()
+        while first and not first.strip():
+            first = f.readline()
+        if not first:
+            return
+        if first.lstrip().startswith('['):
+            yield from json.loads(first + f.read())
+            return
+        try:
+            record = json.loads(first)
+        except json.JSONDecodeError:
+            data = json.loads(first + f.read())
+            records = (data.get('markets') or data.get('events')) if isinstance(data, dict) else None
+            yield from (records if isinstance(records, list) else [data])
+            return
+        yield record
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def _chunks(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _get_worker_fetcher(kind: str):
+    global _worker_fetcher
+    if _worker_fetcher is None:
+        if kind == 'events':
+            from polymarketevents import PolymarketEventsFetcher
+            _worker_fetcher = PolymarketEventsFetcher()
+        else:
+            from polymarket import PolymarketFetcher
+            _worker_fetcher = PolymarketFetcher()
+    return _worker_fetcher
+
+
+def parse_chunk(kind: str, start_index: int, records: List[Dict], verbose: bool = False) -> Tuple[List[Dict], int]:
+    """Parse one chunk in a worker process; returns (parsed records, skipped count)
+
+    Records are numbered by their position in the dump, so parser warnings
+    point at the right record.
+    """
+    fetcher = _get_worker_fetcher(kind)
+    parse = fetcher.parse_event_data if kind == 'events' else fetcher.parse_market_data
+    parsed = []
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            # The parsers print per record; in bulk that output dominates the run time
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        for offset, record in enumerate(records):
+            result = parse(record, start_index + offset)
+            if result:
+                parsed.append(result)
+    return parsed, len(records) - len(parsed)
+
+
+def bulk_parse(records: Iterable[Dict], kind: str = 'markets', workers: Optional[int] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE, top: Optional[int] = None,
+               verbose: bool = False) -> Tuple[List[Dict], int]:
+    """Parse records across a process pool and return (ranked records, skipped count)
+
+    At most two chunks per worker are in flight, so a streamed NDJSON dump is
+    never fully materialised as raw records. Chunk results are collected in
+    submission order, then ranked by volume descending.
+    """
+    workers = workers or os.cpu_count() or 1
+    parsed: List[Dict] = []
+    skipped = 0
+    position = 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in _chunks(records, chunk_size):
+            pending.append(executor.submit(parse_chunk, kind, position, chunk, verbose))
+            position += len(chunk)
+            if len(pending) >= workers * 2:
+                chunk_parsed, chunk_skipped = pending.popleft().result()
+                parsed.extend(chunk_parsed)
+                skipped += chunk_skipped
+        while pending:
+            chunk_parsed, chunk_skipped = pending.popleft().result()
+            parsed.extend(chunk_parsed)
+            skipped += chunk_skipped
+
+    # sort is stable, so equal volumes keep their dump order
+    parsed.sort(key=lambda record: record.get('volume_usd', 0), reverse=True)
+    if top:
+        parsed = parsed[:top]
+    for rank, record in enumerate(parsed, 1):
+        record['rank'] = rank
+    return parsed, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse a large saved market/event dump across all cores')
+    parser.add_argument('dump', help='JSON array or NDJSON file of raw Gamma records (.gz supported)')
+    parser.add_argument('--kind', choices=['markets', 'events'], default='markets')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='Records per chunk')
+    parser.add_argument('--top', type=int, default=None, help='Keep only the top N records by volume')
+    parser.add_argument('--output', required=True, help='Output file (.csv, .json or .ndjson)')
+    parser.add_argument('--verbose', action='store_true', help="Keep the parsers' per-record output")
+    args = parser.parse_args()
+
+    parsed, skipped = bulk_parse(iter_dump(args.dump), args.kind, args.workers, args.chunk_size,
+                                 args.top, args.verbose)
+    print(f"Parsed {len(parsed)} {args.kind}, skipped {skipped}")
+
+    fetcher = _get_worker_fetcher(args.kind)
+    if args.output.endswith('.csv'):
+        fetcher.save_to_csv(parsed, args.output)
+    elif args.output.endswith('.ndjson'):
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for record in parsed:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"Data saved to {args.output}")
+    else:
+        fetcher.save_to_json(parsed, args.output)
+    return 0 if parsed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
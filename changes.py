@@ -0,0 +1,126 @@
+"""Snapshot diff engine for rank and volume movers.
+
+Every parsed top-N snapshot is diffed against the previous one of the same
+kind as it arrives: rank changes, entries, exits and volume/liquidity deltas.
+Only the diffs and the latest snapshot are kept, so /changes?since=<cursor>
+returns the retained diffs after a cursor without recomputing anything.
+Change logs are per process, like the metrics.
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+ID_FIELDS = {'markets': 'market_id', 'events': 'event_id'}
+DEFAULT_RETAIN = 200
+
+
+def _snapshot(records: List[Dict], id_field: str) -> Dict[str, Dict]:
+    snapshot = {}
+    for record in records:
+        record_id = record.get(id_field)
+        if record_id in (None, ''):
+            continue
+        snapshot[str(record_id)] = {
+            'rank': record.get('rank'),
+            'title': record.get('title'),
+            'volume_usd': float(record.get('volume_usd') or 0),
+            'liquidity': float(record.get('liquidity') or 0),
+        }
+    return snapshot
+
+
+def diff_snapshots(previous: Dict[str, Dict], current: Dict[str, Dict]) -> Dict[str, List[Dict]]:
+    """Compare two snapshots keyed by id; movers are sorted by the size of the move"""
+    entered = [dict(current[record_id], id=record_id) for record_id in current if record_id not in previous]
+    exited = [dict(previous[record_id], id=record_id) for record_id in previous if record_id not in current]
+
+    rank_changes, volume_changes = [], []
+    for record_id, now in current.items():
+        before = previous.get(record_id)
+        if before is None:
+            continue
+        if now['rank'] != before['rank'] and now['rank'] is not None and before['rank'] is not None:
+            rank_changes.append({
+                'id': record_id, 'title': now['title'],
+                'old_rank': before['rank'], 'new_rank': now['rank'],
+                'delta': before['rank'] - now['rank'],
+            })
+        volume_delta = now['volume_usd'] - before['volume_usd']
+        liquidity_delta = now['liquidity'] - before['liquidity']
+        if volume_delta or liquidity_delta:
+            volume_changes.append({
+                'id': record_id, 'title': now['title'],
+                'volume_usd': now['volume_usd'], 'volume_delta': volume_delta,
+                'liquidity': now['liquidity'], 'liquidity_delta': liquidity_delta,
+            })
+
+    entered.sort(key=lambda record: record['rank'] or 0)
+    exited.sort(key=lambda record: record['rank'] or 0)
+    rank_changes.sort(key=lambda change: abs(change['delta']), reverse=True)
+    volume_changes.sort(key=lambda change: abs(change['volume_delta']), reverse=True)
+    return {'entered': entered, 'exited': exited, 'rank_changes': rank_changes, 'volume_changes': volume_changes}
+
+
+class ChangeLog:
+    """Latest snapshot of one kind plus a bounded history of diffs, addressed by cursor
+
+    Args:
+        kind: 'markets' or 'events'; selects the id field.
+        retain: Number of diffs kept; older cursors get a reset response.
+    """
+
+    def __init__(self, kind: str, retain: int = DEFAULT_RETAIN):
+        self.kind = kind
+        self.id_field = ID_FIELDS[kind]
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Dict[str, Dict]] = None
+        self._snapshot_at: Optional[float] = None
+        self._diffs = deque(maxlen=retain)
+        self._cursor = 0
+
+    @property
+    def cursor(self) -> int:
+        return self._cursor
+
+    def record(self, records: List[Dict]) -> Optional[Dict]:
+        """Diff a new snapshot against the previous one; returns the stored diff, if anything moved"""
+        snapshot = _snapshot(records, self.id_field)
+        now = time.time()
+        with self._lock:
+            previous, previous_at = self._snapshot, self._snapshot_at
+            self._snapshot, self._snapshot_at = snapshot, now
+            if previous is None:
+                return None
+            diff = diff_snapshots(previous, snapshot)
+            if not any(diff.values()):
+                return None
+            self._cursor += 1
+            entry = dict(diff, cursor=self._cursor, from_time=previous_at, to_time=now)
+            self._diffs.append(entry)
+            return entry
+
+    def since(self, cursor: int = 0) -> Dict:
+        """Diffs after cursor; reset is true when diffs the client hasn't seen were already dropped"""
+        with self._lock:
+            changes = [entry for entry in self._diffs if entry['cursor'] > cursor]
+            oldest = self._diffs[0]['cursor'] if self._diffs else self._cursor + 1
+            return {
+                'kind': self.kind,
+                'cursor': self._cursor,
+                'snapshot_time': self._snapshot_at,
+                'reset': cursor > self._cursor or (cursor < oldest - 1 and cursor != 0),
+                'changes': changes,
+            }
+
+
+_change_logs: Dict[str, ChangeLog] = {}
+_change_logs_lock = threading.Lock()
+
+
+def get_change_log(kind: str) -> ChangeLog:
+    """Return the process-wide change log for a kind"""
+    with _change_logs_lock:
+        if kind not in _change_logs:
+            _change_logs[kind] = ChangeLog(kind)
+        return _change_logs[kind]
@@ -0,0 +1,181 @@
+"""Non-interactive command line entry point for scheduled batch pulls.
+
+Fetches the top N markets and/or events, fetching upstream pages in parallel,
+and writes them without Flask or prompts in the loop:
+
+    python cli.py --source both --top 200 --format csv --output pulls/top.csv
+    python cli.py --source events --start 2025-01-01 --end 2025-03-31 --format json --output -
+    python cli.py --source events --expand-markets --format csv --output pulls/events.csv
+
+Exit status: 0 on success, 1 when no records could be fetched, 2 on invalid
+arguments, 3 when the output could not be written.
+"""
+import argparse
+import contextlib
+import os
+import sys
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional
+
+EXIT_OK = 0
+EXIT_NO_DATA = 1
+EXIT_USAGE = 2
+EXIT_OUTPUT_ERROR = 3
+
+DEFAULT_FILENAMES = {'markets': 'polymarket_top{n}', 'events': 'polymarket_top{n}_events'}
+
+
+def _iso_date(value: str) -> str:
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a YYYY-MM-DD date, got '{value}'")
+    return value
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value}")
+    return number
+
+
+def fetch_parsed(source: str, top: int, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 concurrency: int = 4, page_size: Optional[int] = None, sinks: Iterable[Callable] = (),
+                 expand_markets: bool = False, enrich: bool = False, lean: bool = False) -> List[Dict]:
+    """Fetch and parse the top records of one source, requesting pages in parallel
+
+    Pages are requested concurrency at a time and parsed in offset order, so
+    ranking matches a single sequential pull. Another round is fetched only if
+    too few records survived filtering and the last page was full. Records
+    pass through sinks as they are ranked. With expand_markets, events carry
+    their nested markets (see joined.py); with enrich, markets get CLOB prices
+    before reaching the sinks (see enrich.py); with lean, events come without
+    nested markets and descriptions (see lean.py).
+    """
+    from pipeline import Pipeline
+
+    if enrich and source == 'markets':
+        from enrich import ClobEnricher
+        sinks = [ClobEnricher(concurrency=concurrency)] + list(sinks)
+    return Pipeline(source, top=top, start_date=start_date, end_date=end_date, page_size=page_size,
+                    concurrency=concurrency, sinks=sinks, expand_markets=expand_markets,
+                    lean=lean and source == 'events').run()
+
+
+def output_path(output: Optional[str], source: str, sources: List[str], top: int, fmt: str) -> str:
+    """Resolve the file for one source; with several sources the name gets a _<source> suffix"""
+    if output == '-':
+        return output
+    if not output:
+        return DEFAULT_FILENAMES[source].format(n=top) + f".{fmt}"
+    if os.path.isdir(output) or output.endswith(os.sep):
+        return os.path.join(output, DEFAULT_FILENAMES[source].format(n=top) + f".{fmt}")
+    if len(sources) > 1:
+        root, ext = os.path.splitext(output)
+        return f"{root}_{source}{ext or '.' + fmt}"
+    return output
+
+
+def make_sink(source: str, path: str, fmt: str, stdout=None) -> Callable:
+    """Streaming writer for one source's output"""
+    from pipeline import CsvSink, JsonSink
+
+    if fmt == 'csv':
+        if source == 'events':
+            from polymarketevents import PolymarketEventsFetcher
+            return CsvSink(path, PolymarketEventsFetcher())
+        from polymarket import PolymarketFetcher
+        return CsvSink(path, PolymarketFetcher())
+    return JsonSink(path, fmt, stream=(stdout or sys.stdout) if path == '-' else None)
+
+
+def write_event_markets(events: List[Dict], events_path: str, fmt: str, enrich: bool = False) -> Optional[str]:
+    """Write the flat market rows of expanded events next to the events output
+
+    On stdout the nested markets inside each event record are the only copy.
+    """
+    from joined import JoinedDataset
+
+    if events_path == '-':
+        return None
+    root, ext = os.path.splitext(events_path)
+    path = f"{root}_markets{ext}"
+    rows = JoinedDataset(events).market_rows()
+    if enrich:
+        from enrich import ClobEnricher
+        ClobEnricher().enrich(rows)
+    for _ in make_sink('markets', path, fmt)(iter(rows)):
+        pass
+    if rows:
+        print(f"Wrote {len(rows)} markets of those events to {path}", file=sys.stderr)
+    return path
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Fetch top Polymarket markets/events without prompts')
+    parser.add_argument('--source', choices=['markets', 'events', 'both'], default='markets')
+    parser.add_argument('--top', type=_positive_int, default=50, help='Number of records per source (default: 50)')
+    parser.add_argument('--start', type=_iso_date, help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--end', type=_iso_date, help='End date (YYYY-MM-DD)')
+    parser.add_argument('--format', choices=['csv', 'json', 'ndjson'], default='csv')
+    parser.add_argument('--output', help="Output file or directory, or '-' for stdout (json/ndjson only)")
+    parser.add_argument('--concurrency', type=_positive_int, default=4, help='Upstream pages fetched in parallel')
+    parser.add_argument('--page-size', type=_positive_int,
+                        help='Records requested per upstream page (default: sized from the observed filter pass rate)')
+    parser.add_argument('--expand-markets', action='store_true',
+                        help="With --source events, also write the events' nested markets (no extra requests)")
+    parser.add_argument('--enrich', action='store_true',
+                        help='Add CLOB best bid/ask, midpoint, spread and depth to markets (json/ndjson)')
+    parser.add_argument('--lean', action='store_true',
+                        help='Fetch events without nested markets and descriptions (market counts are kept)')
+    parser.add_argument('--quiet', action='store_true', help='Suppress fetcher progress output')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.output == '-' and args.format == 'csv':
+        parser.error("writing to stdout requires --format json or ndjson")
+    if args.expand_markets and args.source != 'events':
+        parser.error("--expand-markets requires --source events")
+    if args.lean and args.expand_markets:
+        parser.error("--lean can't be combined with --expand-markets")
+
+    sources = ['markets', 'events'] if args.source == 'both' else [args.source]
+    stdout = sys.stdout
+    # Fetcher progress goes to stderr so stdout stays clean for piped output
+    progress = open(os.devnull, 'w') if args.quiet else sys.stderr
+    status = EXIT_OK
+    try:
+        for source in sources:
+            path = output_path(args.output, source, sources, args.top, args.format)
+            # Records are written as they are ranked; nothing is created when none survive
+            sink = make_sink(source, path, args.format, stdout)
+            try:
+                with contextlib.redirect_stdout(progress):
+                    records = fetch_parsed(source, args.top, args.start, args.end, args.concurrency,
+                                           args.page_size, sinks=[sink], expand_markets=args.expand_markets,
+                                           enrich=args.enrich, lean=args.lean)
+                    if records and args.expand_markets:
+                        write_event_markets(records, path, args.format, args.enrich)
+            except OSError as e:
+                print(f"ERROR: could not write {path}: {e}", file=sys.stderr)
+                return EXIT_OUTPUT_ERROR
+            if not records:
+                print(f"ERROR: no {source} could be fetched", file=sys.stderr)
+                status = EXIT_NO_DATA
+                continue
+            if len(records) < args.top:
+                print(f"WARNING: only {len(records)} of {args.top} {source} passed filtering", file=sys.stderr)
+            if path != '-':
+                print(f"Wrote {len(records)} {source} to {path}", file=sys.stderr)
+    finally:
+        if progress is not sys.stderr:
+            progress.close()
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""Resumable full-catalog crawler writing sharded, gzipped NDJSON.
+
+Pages through /markets and /events, both open and closed records, ordered by
+id so offsets stay stable. Each shard covers a fixed number of pages, which
+are fetched with bounded concurrency, written to a temporary file and renamed
+into place before the checkpoint moves past them. An interrupted crawl picks
+up at the first shard that was not committed:
+
+    python crawler.py --output catalog/ --concurrency 4 --page-size 500
+    # ... interrupted, later:
+    python crawler.py --output catalog/            # resumes
+    python crawler.py --output catalog/ --restart  # starts over
+
+Layout: catalog/<endpoint>/closed=<true|false>/part-<offset>.ndjson.gz plus
+catalog/_checkpoint.json.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from polymarket import PolymarketFetcher
+
+CHECKPOINT_FILE = '_checkpoint.json'
+STREAMS = [
+    ('markets', 'false'),
+    ('markets', 'true'),
+    ('events', 'false'),
+    ('events', 'true'),
+]
+
+
+def _stream_key(endpoint: str, closed: str) -> str:
+    return f"{endpoint}/closed={closed}"
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CatalogCrawler:
+    """Crawls every Gamma market and event into sharded NDJSON with checkpoints
+
+    Args:
+        output_dir: Directory for shards and the checkpoint file.
+        fetcher: PolymarketFetcher used for requests (shares its rate limiter and base URL).
+        page_size: Records requested per page.
+        concurrency: Pages fetched in parallel within a shard.
+        shard_pages: Pages per shard; also the checkpoint granularity.
+        max_attempts: Attempts per page before the crawl stops (the checkpoint is kept).
+    """
+
+    def __init__(self, output_dir: str, fetcher: Optional[PolymarketFetcher] = None, page_size: int = 500,
+                 concurrency: int = 4, shard_pages: int = 20, max_attempts: int = 5):
+        self.output_dir = output_dir
+        self.fetcher = fetcher or PolymarketFetcher()
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.shard_pages = shard_pages
+        self.max_attempts = max_attempts
+        self.checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+        self.checkpoint = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> Dict:
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                return json.load(f)
+        return {'streams': {}, 'started_at': time.time()}
+
+    def _save_checkpoint(self):
+        self.checkpoint['updated_at'] = time.time()
+        _write_atomic(self.checkpoint_path, json.dumps(self.checkpoint, indent=2).encode('utf-8'))
+
+    def reset(self):
+        self.checkpoint = {'streams': {}, 'started_at': time.time()}
+        self._save_checkpoint()
+
+    def _fetch_page(self, session, endpoint: str, closed: str, offset: int) -> List[Dict]:
+        params = {'order': 'id', 'ascending': 'true', 'closed': closed}
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return self.fetcher.fetch_page(f"/{endpoint}", offset, self.page_size, params, session=session)
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    raise
+                delay = min(30, 2 ** attempt)
+                print(f"Page {endpoint} closed={closed} offset={offset} failed ({type(e).__name__}: {e}); "
+                      f"retrying in {delay}s")
+                time.sleep(delay)
+
+    def crawl_stream(self, session, executor, endpoint: str, closed: str):
+        key = _stream_key(endpoint, closed)
+        state = self.checkpoint['streams'].setdefault(key, {'offset': 0, 'records': 0, 'shards': 0, 'done': False})
+        if state['done']:
+            print(f"{key}: already complete ({state['records']} records)")
+            return
+
+        shard_dir = os.path.join(self.output_dir, endpoint, f"closed={closed}")
+        os.makedirs(shard_dir, exist_ok=True)
+        while not state['done']:
+            offset = state['offset']
+            offsets = [offset + i * self.page_size for i in range(self.shard_pages)]
+            # executor.map keeps offset order, so shard contents are deterministic
+            pages = list(executor.map(lambda page_offset: self._fetch_page(session, endpoint, closed, page_offset),
+                                      offsets))
+
+            records = []
+            for page in pages:
+                records.extend(page)
+                if len(page) < self.page_size:
+                    state['done'] = True
+                    break
+
+            if records:
+                payload = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+                shard_path = os.path.join(shard_dir, f"part-{offset:09d}.ndjson.gz")
+                _write_atomic(shard_path, gzip.compress(payload.encode('utf-8'), compresslevel=6))
+                state['shards'] += 1
+            state['records'] += len(records)
+            state['offset'] = offset + len(offsets) * self.page_size
+            self._save_checkpoint()
+            print(f"{key}: {state['records']} records, offset {state['offset']}")
+
+    def run(self, streams=STREAMS):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        session = requests.Session()
+        session.headers.update(self.fetcher.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                for endpoint, closed in streams:
+                    self.crawl_stream(session, executor, endpoint, closed)
+        finally:
+            session.close()
+        self.checkpoint['completed_at'] = time.time()
+        self._save_checkpoint()
+        return self.checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl every Polymarket market and event into sharded NDJSON')
+    parser.add_argument('--output', required=True, help='Output directory (also holds the checkpoint)')
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=4, help='Pages fetched in parallel')
+    parser.add_argument('--shard-pages', type=int, default=20, help='Pages per shard / checkpoint')
+    parser.add_argument('--only', choices=['markets', 'events'], help='Crawl a single endpoint')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start over')
+    args = parser.parse_args()
+
+    crawler = CatalogCrawler(args.output, page_size=args.page_size, concurrency=args.concurrency,
+                             shard_pages=args.shard_pages)
+    if args.restart:
+        crawler.reset()
+    streams = [stream for stream in STREAMS if not args.only or stream[0] == args.only]
+    try:
+        checkpoint = crawler.run(streams)
+    except KeyboardInterrupt:
+        print("Interrupted; rerun the same command to resume from the checkpoint")
+        return 130
+    except Exception as e:
+        print(f"Crawl stopped: {type(e).__name__}: {e}; rerun to resume from the checkpoint")
+        return 1
+
+    total = sum(state['records'] for state in checkpoint['streams'].values())
+    print(f"Crawl complete: {total} records in {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Optional CLOB price and order-book enrichment for ranked markets.
+
+Parsed markets know their outcome token ids but not what they trade at.
+ClobEnricher is a pipeline stage that attaches best bid/ask, midpoint, spread
+and depth per outcome token. It looks tokens up in batches through POST /books,
+with up to `concurrency` batches in flight, a timeout per request and a
+short-lived per-token cache. A top-50 list costs a handful of parallel
+requests instead of 50 serial ones:
+
+    Pipeline('markets', top=50, sinks=[ClobEnricher(), CsvSink(path, fetcher)]).run()
+
+POLYMARKET_CLOB_URL points it at a local stand-in (benchmarks.gamma_standin
+serves /books too). Lookups that fail or run out of time leave the
+affected records without prices; enrichment never fails the fetch.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import metrics
+import timing
+
+DEFAULT_CLOB_URL = "https://clob.polymarket.com"
+DEFAULT_TIMEOUT = float(os.environ.get('POLYMARKET_CLOB_TIMEOUT', '3'))
+DEFAULT_CACHE_TTL = float(os.environ.get('POLYMARKET_CLOB_CACHE_TTL', '15'))
+DEFAULT_BATCH_SIZE = 25
+DEFAULT_CONCURRENCY = 4
+CACHE_SIZE = 20000
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize_book(book: Dict) -> Dict:
+    """Best bid/ask, midpoint, spread and resting size per side of one order book"""
+    bids = [(_float(level.get('price')), _float(level.get('size'))) for level in book.get('bids') or []]
+    asks = [(_float(level.get('price')), _float(level.get('size'))) for level in book.get('asks') or []]
+    bids = [(price, size or 0.0) for price, size in bids if price is not None]
+    asks = [(price, size or 0.0) for price, size in asks if price is not None]
+    # Levels aren't guaranteed to be sorted best-first
+    best_bid = max((price for price, _ in bids), default=None)
+    best_ask = min((price for price, _ in asks), default=None)
+    summary = {
+        'best_bid': best_bid,
+        'best_ask': best_ask,
+        'midpoint': None,
+        'spread': None,
+        'bid_depth': sum(size for _, size in bids),
+        'ask_depth': sum(size for _, size in asks),
+    }
+    if best_bid is not None and best_ask is not None:
+        summary['midpoint'] = round((best_bid + best_ask) / 2, 6)
+        summary['spread'] = round(best_ask - best_bid, 6)
+    return summary
+
+
+class ClobEnricher:
+    """Pipeline stage attaching order-book summaries to market records
+
+    Args:
+        base_url: CLOB API root; defaults to POLYMARKET_CLOB_URL or the public API.
+        batch_size: Token ids per POST /books request.
+        concurrency: Maximum requests in flight.
+        timeout: Seconds each request may take before its batch is given up on.
+        cache_ttl: Seconds a token's summary is reused; 0 disables the cache.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY, timeout: float = DEFAULT_TIMEOUT,
+                 cache_ttl: float = DEFAULT_CACHE_TTL):
+        self.base_url = (base_url or os.environ.get('POLYMARKET_CLOB_URL') or DEFAULT_CLOB_URL).rstrip('/')
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.cache_ttl = cache_ttl
+        self._cache: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._session = None
+        self.stats = {'requests': 0, 'failed': 0, 'tokens': 0, 'cached': 0}
+
+    def _cached(self, token_id: str) -> Optional[Dict]:
+        if self.cache_ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._cache.get(token_id)
+            if entry is not None and time.time() - entry[0] < self.cache_ttl:
+                self._cache.move_to_end(token_id)
+                return entry[1]
+        return None
+
+    def _store(self, summaries: Dict[str, Dict]):
+        if self.cache_ttl <= 0:
+            return
+        now = time.time()
+        with self._lock:
+            for token_id, summary in summaries.items():
+                self._cache[token_id] = (now, summary)
+                self._cache.move_to_end(token_id)
+            while len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def fetch_books(self, token_ids: List[str]) -> Dict[str, Dict]:
+        """One POST /books round trip; returns summaries keyed by token id, or {} on failure"""
+        import requests
+
+        start = time.perf_counter()
+        with self._lock:
+            self.stats['requests'] += 1
+        try:
+            response = self._session.post(f"{self.base_url}/books", json=[{'token_id': token} for token in token_ids],
+                                          timeout=self.timeout)
+            metrics.CLOB_REQUEST_SECONDS.observe(time.perf_counter() - start, ('/books',))
+            metrics.CLOB_RESPONSES.inc(('/books', str(response.status_code)))
+            response.raise_for_status()
+            books = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            if not isinstance(e, requests.exceptions.HTTPError):
+                metrics.CLOB_RESPONSES.inc(('/books', 'error'))
+            print(f"CLOB lookup for {len(token_ids)} tokens failed: {type(e).__name__}: {e}")
+            with self._lock:
+                self.stats['failed'] += 1
+            return {}
+        if not isinstance(books, list):
+            return {}
+        return {str(book.get('asset_id')): summarize_book(book) for book in books if isinstance(book, dict)}
+
+    def lookup(self, token_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Summaries for token_ids, fetching uncached ones in concurrent batches"""
+        found, missing = {}, []
+        for token_id in dict.fromkeys(token_ids):
+            summary = self._cached(token_id)
+            metrics.record_cache_lookup('clob', summary is not None)
+            if summary is not None:
+                found[token_id] = summary
+                self.stats['cached'] += 1
+            else:
+                missing.append(token_id)
+        if not missing:
+            return found
+
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        with timing.phase('clob'):
+            if len(batches) == 1:
+                results = [self.fetch_books(batches[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as executor:
+                    results = list(executor.map(self.fetch_books, batches))
+        for summaries in results:
+            self._store(summaries)
+            found.update(summaries)
+        self.stats['tokens'] += len(missing)
+        return found
+
+    def enrich(self, records: List[Dict]) -> List[Dict]:
+        """Attach per-outcome 'prices' (and the first outcome's midpoint/spread) to records in place"""
+        from polymarket import parse_json_list
+
+        summaries = self.lookup(token for record in records for token in record.get('clob_token_ids') or [])
+        for record in records:
+            token_ids = record.get('clob_token_ids') or []
+            if not token_ids:
+                continue
+            outcomes = parse_json_list(record.get('outcomes'))
+            prices = []
+            for i, token_id in enumerate(token_ids):
+                summary = summaries.get(token_id)
+                if summary is None:
+                    continue
+                outcome = outcomes[i] if i < len(outcomes) else None
+                prices.append(dict(summary, outcome=outcome, token_id=token_id))
+            if prices:
+                record['prices'] = prices
+                record['midpoint'] = prices[0]['midpoint']
+                record['spread'] = prices[0]['spread']
+        return records
+
+    def __call__(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        """Enrich the stream a window at a time, so one window's batches go out together"""
+        window_tokens = self.batch_size * self.concurrency
+        window, tokens = [], 0
+        for record in records:
+            window.append(record)
+            tokens += len(record.get('clob_token_ids') or [])
+            if tokens >= window_tokens:
+                yield from self.enrich(window)
+                window, tokens = [], 0
+        if window:
+            yield from self.enrich(window)
+
+
+_shared_enricher = None
+
+
+def get_enricher() -> ClobEnricher:
+    """Return the process-wide enricher, so its token cache is shared across requests"""
+    global _shared_enricher
+    if _shared_enricher is None:
+        _shared_enricher = ClobEnricher()
+    return _shared_enricher
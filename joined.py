@@ -0,0 +1,95 @@
+"""Event ↔ market expansion from a single events fetch.
+
+Gamma event payloads already embed their markets, so the market-level view
+of the top events doesn't need a second /markets request. expand_event_markets
+parses the nested markets of one event with the regular market parser and
+links them to their parent; JoinedDataset indexes both directions in one pass:
+
+    events = Pipeline('events', top=50, expand_markets=True).run()
+    joined = JoinedDataset(events)
+    joined.markets_for(event_id), joined.event_for(market_id)
+"""
+from typing import Callable, Dict, List, Optional
+
+def expand_event_markets(event: Dict, parsed_event: Dict, parser: Callable[[Dict, int], Optional[Dict]],
+                         parse_cache=None) -> List[Dict]:
+    """Parse the markets nested in a raw event, linked to the parsed event and sorted by volume
+
+    Nested markets carry no events field of their own; the parent is added
+    before parsing so the parser can categorize them from the event and
+    series titles, as it does for /markets records.
+    """
+    markets = []
+    parent = {'title': event.get('title'), 'slug': event.get('slug'), 'series': event.get('series')}
+    for position, market in enumerate(event.get('markets') or [], 1):
+        if not isinstance(market, dict):
+            continue
+        if not market.get('events'):
+            market = dict(market, events=[parent])
+        if parse_cache is not None:
+            parsed = parse_cache.parse('markets', market, position, parser)
+        else:
+            parsed = parser(market, position)
+        if not parsed:
+            continue
+        parsed['event_id'] = parsed_event.get('event_id')
+        parsed['event_slug'] = parsed_event.get('event_slug')
+        parsed['event_title'] = parsed_event.get('title')
+        markets.append(parsed)
+    markets.sort(key=lambda market: market.get('volume_usd') or 0, reverse=True)
+    for rank, market in enumerate(markets, 1):
+        market['rank'] = rank
+    return markets
+
+
+class JoinedDataset:
+    """Expanded events plus their markets, indexed both ways
+
+    Args:
+        events: Parsed events whose 'markets' lists came from expand_event_markets.
+    """
+
+    def __init__(self, events: List[Dict]):
+        self.events = events
+        self.markets: List[Dict] = []
+        self.event_markets: Dict[str, List[str]] = {}
+        self.market_event: Dict[str, str] = {}
+        self._events_by_id: Dict[str, Dict] = {}
+        self._markets_by_id: Dict[str, Dict] = {}
+        for event in events:
+            event_id = str(event.get('event_id'))
+            self._events_by_id[event_id] = event
+            market_ids = self.event_markets.setdefault(event_id, [])
+            for market in event.get('markets') or []:
+                market_id = str(market.get('market_id'))
+                market_ids.append(market_id)
+                # A market listed under several events keeps its first (highest ranked) parent
+                if market_id not in self.market_event:
+                    self.market_event[market_id] = event_id
+                    self._markets_by_id[market_id] = market
+                    self.markets.append(market)
+        self.markets.sort(key=lambda market: market.get('volume_usd') or 0, reverse=True)
+
+    def markets_for(self, event_id) -> List[Dict]:
+        return [self._markets_by_id[market_id] for market_id in self.event_markets.get(str(event_id), [])]
+
+    def event_for(self, market_id) -> Optional[Dict]:
+        event_id = self.market_event.get(str(market_id))
+        return self._events_by_id.get(event_id) if event_id is not None else None
+
+    def market_rows(self) -> List[Dict]:
+        """Flat market records ranked by volume across all events, without touching the nested ones"""
+        rows = []
+        for rank, market in enumerate(self.markets, 1):
+            row = dict(market)
+            row['rank_in_event'] = market.get('rank')
+            row['rank'] = rank
+            rows.append(row)
+        return rows
+
+    def as_dict(self) -> Dict:
+        return {
+            'events': self.events,
+            'markets': self.market_rows(),
+            'index': {'event_markets': self.event_markets, 'market_event': self.market_event},
+        }
@@ -0,0 +1,197 @@
+"""Lean event pages: no nested markets or descriptions, with details loaded by id on demand.
+
+Each event on a Gamma /events page embeds its full markets and a long
+description, while parse_event_data keeps only the market count and the UI
+hides descriptions. In lean mode the request leaves out the per-market
+include_* options, and decode_lean cuts both subtrees out of the page text
+before decoding the rest. The cut subtrees are only scanned for their end,
+bracket by bracket, so no objects are built for them:
+
+    Pipeline('events', top=50, lean=True).run()    # market_count kept, description ''
+    get_event_details().get(event_id)              # {'description', 'markets'} via /events/{id}
+
+Markets aren't lean: their parser categorizes by description.
+"""
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import timing
+
+# Per-market extras on /events that a lean page has no markets for
+LEAN_DROPPED_PARAMS = ('include_trading_stats', 'include_market_liquidity')
+DETAILS_TTL = float(os.environ.get('POLYMARKET_DETAILS_TTL', '300'))
+DETAILS_CACHE_SIZE = 1000
+
+# A quote after a backslash is an escaped one inside a string (e.g. the key "x\"markets")
+_HEAVY_KEY = re.compile(r'(?<!\\)"(markets|description)"\s*:\s*')
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_SCALAR = re.compile(r'[^,}\]\s]*')
+_BRACKET = re.compile(r'[\[\]{}]')
+_ESCAPE = re.compile(r'\\.', re.S)
+
+
+def _skip_value(text: str, pos: int):
+    """(end, number of objects and arrays directly inside) of the JSON value at pos
+
+    Walks from bracket to bracket; an odd number of unescaped quotes in
+    between means the bracket is inside a string.
+    """
+    first = text[pos:pos + 1]
+    if first == '"':
+        match = _STRING.match(text, pos)
+        if match is None:
+            raise ValueError(f"Unterminated string at {pos}")
+        return match.end(), 0
+    if first not in ('[', '{'):
+        return _SCALAR.match(text, pos).end(), 0
+    depth = 0
+    count = 0
+    in_string = False
+    for match in _BRACKET.finditer(text, pos):
+        at = match.start()
+        # pos follows a bracket, so it never starts inside an escape
+        quotes = text.count('"', pos, at)
+        if quotes and text.find('\\', pos, at) != -1:
+            if text.find('\\\\', pos, at) == -1:
+                quotes -= text.count('\\"', pos, at)
+            else:
+                # An escaped backslash may precede a closing quote
+                quotes -= _ESCAPE.findall(text, pos, at).count('\\"')
+        if quotes % 2:
+            in_string = not in_string
+        pos = at + 1
+        if in_string:
+            continue
+        if text[at] in '[{':
+            if depth == 1:
+                count += 1
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return pos, count
+    raise ValueError(f"Unterminated value at {pos}")
+
+
+def decode_lean(text: str):
+    """Decode an /events response without its markets and description subtrees
+
+    'markets' becomes 'market_count' (the number of market objects in the
+    list) and descriptions become ''. Inside a JSON string every quote is
+    escaped, and the key pattern skips escaped quotes, so it only matches keys.
+    """
+    parts = []
+    pos = 0
+    for match in _HEAVY_KEY.finditer(text):
+        if match.start() < pos:
+            # Inside a subtree that was already cut
+            continue
+        end, count = _skip_value(text, match.end())
+        parts.append(text[pos:match.start()])
+        if match.group(1) == 'markets':
+            parts.append(f'"market_count":{count}')
+        else:
+            parts.append('"description":""')
+        pos = end
+    parts.append(text[pos:])
+    return json.loads(''.join(parts))
+
+
+def lean_record(record: Dict) -> Dict:
+    """Copy of a parsed event as a lean page would have produced it"""
+    record = dict(record)
+    record['description'] = ''
+    record.pop('markets', None)
+    return record
+
+
+class EventDetails:
+    """Description and parsed nested markets of single events, fetched by id and cached
+
+    Args:
+        fetcher: Events fetcher whose base URL and rate limiter are used.
+        ttl: Seconds an event's details are reused.
+    """
+
+    def __init__(self, fetcher=None, ttl: float = DETAILS_TTL):
+        if fetcher is None:
+            from polymarketevents import PolymarketEventsFetcher
+            fetcher = PolymarketEventsFetcher()
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self._cache: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._session = None
+
+    def fetch(self, event_id: str) -> Optional[Dict]:
+        """The raw event from GET /events/{id}, or None if upstream doesn't know it"""
+        import requests
+        from ratelimit import limited_get
+
+        if self._session is None:
+            self._session = requests.Session()
+        url = f"{self.fetcher.base_url}/events/{event_id}"
+        response = limited_get(url, self.fetcher.rate_limiter, session=self._session, endpoint='/events/{id}',
+                               headers=self.fetcher.headers, timeout=30)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        with timing.phase('decode'):
+            event = response.json()
+        return event if isinstance(event, dict) else None
+
+    def get(self, event_id) -> Optional[Dict]:
+        """{'event_id', 'title', 'description', 'markets'} for one event, or None
+
+        Raises requests exceptions when upstream fails.
+        """
+        from joined import expand_event_markets
+        from parse_cache import get_parse_cache
+        from polymarket import PolymarketFetcher
+
+        event_id = str(event_id)
+        with self._lock:
+            entry = self._cache.get(event_id)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self._cache.move_to_end(event_id)
+                return entry[1]
+
+        with timing.phase('details'):
+            event = self.fetch(event_id)
+        if event is None:
+            return None
+        parent = {'event_id': str(event.get('id', event_id)), 'event_slug': event.get('slug', ''),
+                  'title': event.get('title')}
+        parser = PolymarketFetcher(rate_limiter=self.fetcher.rate_limiter).parse_market_data
+        with timing.phase('expand'):
+            markets: List[Dict] = expand_event_markets(event, parent, parser, get_parse_cache())
+        details = {
+            'event_id': parent['event_id'],
+            'title': parent['title'],
+            'description': event.get('description', ''),
+            'markets': markets,
+        }
+        with self._lock:
+            self._cache[event_id] = (time.time(), details)
+            self._cache.move_to_end(event_id)
+            while len(self._cache) > DETAILS_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return details
+
+
+_shared_details = None
+_shared_details_lock = threading.Lock()
+
+
+def get_event_details() -> EventDetails:
+    """Return the process-wide event details loader"""
+    global _shared_details
+    with _shared_details_lock:
+        if _shared_details is None:
+            _shared_details = EventDetails()
+        return _shared_details
@@ -0,0 +1,152 @@
+"""Shared refresh loop pushing top-N snapshots to Server-Sent Events subscribers.
+
+One background thread per kind and process fetches and parses the top list
+every POLYMARKET_STREAM_INTERVAL seconds (default 30) while at least one
+browser is subscribed, records the diff in the change log and fans the
+pre-encoded SSE message out to every subscriber queue. Viewers therefore cost
+one upstream fetch per interval in total, not one per viewer per click.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from changes import get_change_log
+from pipeline import Pipeline
+from snapshots import publish_top
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = float(os.environ.get('POLYMARKET_STREAM_INTERVAL', '30'))
+KEEPALIVE_SECONDS = 15
+TOP_N = 50
+# Every message is a full snapshot, so a slow subscriber only needs the newest ones
+SUBSCRIBER_QUEUE_SIZE = 4
+
+
+def refresh_top(kind: str, n: int = TOP_N) -> List[Dict]:
+    """Fetch, parse and rank the unfiltered top n markets or events"""
+    return Pipeline(kind, top=n).run()
+
+
+def encode_event(event: str, data: Dict, event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class LiveFeed:
+    """Refresh loop for one kind plus its subscriber queues
+
+    Args:
+        kind: 'markets' or 'events'.
+        interval: Seconds between upstream refreshes.
+    """
+
+    def __init__(self, kind: str, interval: float = DEFAULT_INTERVAL):
+        self.kind = kind
+        self.interval = interval
+        self.latest: Optional[str] = None
+        self.latest_at: Optional[float] = None
+        self._subscribers: List[queue.Queue] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> queue.Queue:
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.append(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"live-{self.kind}", daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def publish(self, message: str):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            while True:
+                try:
+                    subscriber.put_nowait(message)
+                    break
+                except queue.Full:
+                    try:
+                        subscriber.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def refresh(self):
+        records = refresh_top(self.kind)
+        if not records:
+            logger.warning(f"Live {self.kind} refresh returned no records; keeping the previous snapshot")
+            return
+        diff = publish_top(self.kind, records)
+        cursor = get_change_log(self.kind).cursor
+        self.latest_at = time.time()
+        self.latest = encode_event('snapshot', {
+            'kind': self.kind,
+            'updated_at': self.latest_at,
+            'cursor': cursor,
+            'changes': diff,
+            'records': records,
+        }, cursor)
+        self.publish(self.latest)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Exit while holding the lock so a concurrent subscribe starts a new thread
+                    self._thread = None
+                    return
+            if self.latest_at is None or time.time() - self.latest_at >= self.interval:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    logger.error(f"Live {self.kind} refresh failed: {type(e).__name__}: {e}")
+                    self.latest_at = time.time()
+            wait = self.interval - (time.time() - (self.latest_at or 0))
+            self._wakeup.wait(max(1.0, min(wait, KEEPALIVE_SECONDS)))
+
+    def stream(self):
+        """SSE generator for one subscriber: current snapshot first, then updates and keepalives"""
+        subscriber = self.subscribe()
+        try:
+            if self.latest:
+                yield self.latest
+            else:
+                yield ': waiting for first snapshot\n\n'
+            while True:
+                try:
+                    yield subscriber.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+
+_feeds: Dict[str, LiveFeed] = {}
+_feeds_lock = threading.Lock()
+
+
+def get_live_feed(kind: str) -> LiveFeed:
+    """Return the process-wide live feed for a kind"""
+    with _feeds_lock:
+        if kind not in _feeds:
+            _feeds[kind] = LiveFeed(kind)
+        return _feeds[kind]
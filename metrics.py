@@ -0,0 +1,170 @@
+"""Minimal in-process metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms keep their samples in plain dicts keyed by label-value
+tuples and take a single uncontended lock per update, which keeps them cheap
+enough to call from the per-record parse loop. Values are per process: under
+gunicorn each worker reports its own series, distinguished by the scrape target.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+_registry: List['_Metric'] = []
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in items]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, labels: Tuple = ()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, labels: Tuple = ()):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(counts), total, count))
+                           for labels, (counts, total, count) in self._values.items())
+        lines = []
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+GAMMA_REQUEST_SECONDS = Histogram(
+    'polymarket_gamma_request_seconds', 'Gamma API round-trip latency', ('endpoint', 'order'))
+GAMMA_RESPONSES = Counter(
+    'polymarket_gamma_responses_total', 'Gamma API responses by status code', ('endpoint', 'status'))
+CLOB_REQUEST_SECONDS = Histogram(
+    'polymarket_clob_request_seconds', 'CLOB API round-trip latency for enrichment lookups', ('endpoint',))
+CLOB_RESPONSES = Counter(
+    'polymarket_clob_responses_total', 'CLOB API responses by status code', ('endpoint', 'status'))
+PARSE_BATCH_SECONDS = Histogram(
+    'polymarket_parse_batch_seconds', 'Time to parse and filter one batch of raw records', ('kind',))
+RECORDS_PARSED = Counter(
+    'polymarket_records_parsed_total', 'Records that passed parsing and filtering', ('kind',))
+RECORDS_SKIPPED = Counter(
+    'polymarket_records_skipped_total', 'Records dropped during parsing, by reason', ('kind', 'reason'))
+EXPORT_SECONDS = Histogram(
+    'polymarket_export_seconds', 'Time to write an export file', ('kind', 'format'))
+HTTP_REQUEST_SECONDS = Histogram(
+    'polymarket_http_request_seconds', 'Flask request latency', ('route', 'status'))
+RESPONSE_SIZE_BYTES = Histogram(
+    'polymarket_response_size_bytes', 'Flask response body size', ('route',), buckets=SIZE_BUCKETS)
+SYNC_RECORDS = Counter(
+    'polymarket_sync_records_total', 'Records seen by incremental sync, by outcome', ('kind', 'outcome'))
+CACHE_LOOKUPS = Counter(
+    'polymarket_cache_lookups_total', 'Cache lookups by cache and result (hit or miss)', ('cache', 'result'))
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.inc((cache, 'hit' if hit else 'miss'))
+
+
+# Reason of the last record_skip in this thread/context, for callers that cache parse results
+_last_skip = contextvars.ContextVar('polymarket_last_skip', default=None)
+
+
+def record_skip(kind: str, reason: str):
+    RECORDS_SKIPPED.inc((kind, reason))
+    _last_skip.set(reason)
+
+
+def take_last_skip() -> Optional[str]:
+    """Reason of the last record_skip since the previous call, or None"""
+    reason = _last_skip.get()
+    if reason is not None:
+        _last_skip.set(None)
+    return reason
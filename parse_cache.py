@@ -0,0 +1,165 @@
+"""Memoized parse results keyed by record id and a hash of the fields the parsers read.
+
+Refreshes mostly see records that are identical to the previous pull, so the
+parsed dict is reused instead of running parse_market_data/parse_event_data
+again. Only the end-date filter depends on the clock; cached entries keep the
+parsed end timestamp and are re-checked against now on every hit. Dropped
+records are cached with their skip reason, so hits count as skips too.
+The cache is a per-process LRU bounded by POLYMARKET_PARSE_CACHE_SIZE
+(default 20000 entries, 0 disables it).
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import metrics
+
+DEFAULT_SIZE = int(os.environ.get('POLYMARKET_PARSE_CACHE_SIZE', '20000'))
+
+# Raw fields read by parse_market_data / parse_event_data; changes elsewhere
+# in the record (prices, order book stats, ...) can't change the parsed output
+MARKET_FIELDS = (
+    'id', 'title', 'question', 'name', 'description', 'market_description', 'slug', 'condition_id',
+    'volume', 'totalVolume', 'total_volume', 'volumeNum', 'volume_num', 'cumulativeVolume',
+    'cumulative_volume', 'allTimeVolume', 'all_time_volume', 'volumeUSD', 'volume_usd', 'volumeClob',
+    'volume24hr', 'volume_24hr', 'volume_24h', 'dailyVolume', 'daily_volume', 'volume24hrClob',
+    'volume24Hour', 'volume_24_hour',
+    'created_at', 'start_date', 'createdAt', 'startDate', 'created_time', 'creation_time', 'creation_date',
+    'end_date', 'endDate', 'end_date_iso', 'expiry_date', 'expiryDate', 'expiration_time', 'resolution_time',
+    'closed', 'resolved', 'active', 'outcomes', 'outcome_options', 'liquidity_num', 'liquidity', 'market_count',
+    'clobTokenIds', 'clob_token_ids',
+)
+EVENT_FIELDS = (
+    'id', 'title', 'question', 'description', 'slug', 'tags', 'featured', 'competitive',
+    'volume', 'totalVolume', 'total_volume', 'volumeNum', 'volume_num', 'cumulativeVolume',
+    'cumulative_volume', 'allTimeVolume', 'all_time_volume',
+    'volume24hr', 'volume_24hr', 'volume_24h', 'dailyVolume', 'daily_volume', 'volume24Hour', 'volume_24_hour',
+    'createdAt', 'created_at', 'creationDate', 'startDate', 'endDate', 'end_date', 'end_date_iso',
+    'closed', 'active', 'liquidity', 'liquidityClob',
+)
+
+
+def _relevant_fields(kind: str, record: Dict) -> Dict:
+    fields = EVENT_FIELDS if kind == 'events' else MARKET_FIELDS
+    relevant = {field: record[field] for field in fields if field in record}
+    markets = record.get('markets')
+    if kind == 'events':
+        # Lean pages carry the count instead of the markets
+        relevant['_market_count'] = len(markets) if isinstance(markets, list) else record.get('market_count', 0)
+    else:
+        # Markets only use their parent event and series titles for categorization
+        relevant['_is_event'] = bool(markets)
+        events = record.get('events')
+        if isinstance(events, list) and events and isinstance(events[0], dict):
+            event = events[0]
+            series = event.get('series')
+            series_title = series[0].get('title') if isinstance(series, list) and series \
+                and isinstance(series[0], dict) else None
+            relevant['_event'] = [event.get('title'), series_title]
+    return relevant
+
+
+def record_digest(kind: str, record: Dict) -> str:
+    payload = json.dumps(_relevant_fields(kind, record), sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _end_timestamp(parsed: Dict) -> Optional[float]:
+    end_date = parsed.get('end_date')
+    if not end_date:
+        return None
+    if isinstance(end_date, (int, float)):
+        return float(end_date)
+    try:
+        from polymarket import parse_date
+        return parse_date(end_date).timestamp()
+    except Exception:
+        # The parser already warned and kept the record; so does the cache
+        return None
+
+
+class ParseCache:
+    """LRU of parse results keyed by (kind, id) and validated by the content digest
+
+    Args:
+        maxsize: Maximum number of entries; the least recently used are evicted first.
+            A maxsize of 0 or less disables caching.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_SIZE):
+        self.maxsize = maxsize
+        # (digest, parsed, end timestamp, skip reason if the parser dropped the record)
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[str, Optional[Dict], Optional[float], Optional[str]]]' = \
+            OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def parse(self, kind: str, record: Dict, rank: int, parser: Callable[[Dict, int], Optional[Dict]]) -> Optional[Dict]:
+        """Return parser(record, rank), reusing the cached result when the record is unchanged
+
+        Hits return a shallow copy with the new rank, so callers can re-rank freely.
+        """
+        record_id = record.get('id')
+        if self.maxsize <= 0 or record_id is None:
+            return parser(record, rank)
+
+        key = (kind, str(record_id))
+        digest = record_digest(kind, record)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == digest:
+                self._entries.move_to_end(key)
+            else:
+                entry = None
+        metrics.record_cache_lookup('parse', entry is not None)
+
+        if entry is not None:
+            _, parsed, end_ts, reason = entry
+            if parsed is None:
+                if reason is not None:
+                    metrics.RECORDS_SKIPPED.inc((kind, reason))
+                return None
+            if end_ts is not None and end_ts <= time.time():
+                metrics.RECORDS_SKIPPED.inc((kind, 'past_end_date'))
+                self._store(key, (digest, None, None, 'past_end_date'))
+                return None
+            metrics.RECORDS_PARSED.inc((kind,))
+            result = dict(parsed)
+            result['rank'] = rank
+            return result
+
+        metrics.take_last_skip()
+        parsed = parser(record, rank)
+        if parsed:
+            self._store(key, (digest, dict(parsed), _end_timestamp(parsed), None))
+        else:
+            self._store(key, (digest, None, None, metrics.take_last_skip()))
+        return parsed
+
+    def _store(self, key: Tuple[str, str], entry: Tuple[str, Optional[Dict], Optional[float], Optional[str]]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+_shared_cache = None
+
+
+def get_parse_cache() -> ParseCache:
+    """Return the process-wide parse cache configured from the environment"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ParseCache()
+    return _shared_cache
@@ -0,0 +1,407 @@
+"""Streaming fetch → normalize → filter → rank → export pipeline for markets and events.
+
+Markets and events differ only in their Source configuration (endpoint,
+sort-field fallbacks, over-fetch factor, parser, CSV layout). Each stage is a
+generator, so records flow one at a time from the upstream pages into the
+sinks and the next page is only requested when the stages downstream still
+need records:
+
+    pipeline = Pipeline('events', top=50, sinks=[CsvSink('top_events.csv', fetcher)])
+    top_events = pipeline.run()
+
+The fetchers' fetch_top_*_by_volume methods use build_params and
+request_list from here, so the request/fallback/decode logic exists once.
+"""
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import metrics
+import timing
+from joined import expand_event_markets
+from lean import LEAN_DROPPED_PARAMS, decode_lean
+from queryplan import plan_query
+from ratelimit import limited_get
+
+
+class Source:
+    """How one Gamma list endpoint plugs into the pipeline
+
+    Args:
+        kind: 'markets' or 'events'; also the key of a wrapped JSON response.
+        endpoint: API path.
+        orders: Sort fields to try in order when upstream rejects the previous one.
+        overfetch: Page size as a multiple of N for one-shot top-N requests (fetch_top_*_by_volume),
+            since filtering drops records. The pipeline sizes its pages adaptively instead.
+        id_field: Id field of parsed records.
+    """
+
+    def __init__(self, kind: str, endpoint: str, orders: Sequence[str], overfetch: int, id_field: str):
+        self.kind = kind
+        self.endpoint = endpoint
+        self.orders = tuple(orders)
+        self.overfetch = overfetch
+        self.id_field = id_field
+
+    def make_fetcher(self):
+        if self.kind == 'events':
+            from polymarketevents import PolymarketEventsFetcher
+            return PolymarketEventsFetcher()
+        from polymarket import PolymarketFetcher
+        return PolymarketFetcher()
+
+    def fetch_page(self, fetcher, n: int, start_date: Optional[str], end_date: Optional[str],
+                   offset: int, limit: int, lean: bool = False) -> List[Dict]:
+        if self.kind == 'events':
+            return fetcher.fetch_top_events_by_volume(n, start_date=start_date, end_date=end_date, offset=offset,
+                                                      limit=limit, lean=lean)
+        return fetcher.fetch_top_markets_by_volume(n, start_date=start_date, end_date=end_date, offset=offset,
+                                                   limit=limit)
+
+    def parser(self, fetcher) -> Callable[[Dict, int], Optional[Dict]]:
+        return fetcher.parse_event_data if self.kind == 'events' else fetcher.parse_market_data
+
+
+SOURCES = {
+    'markets': Source('markets', '/markets', ('volumeNum', 'volumeClob', 'volume24hr'), 3, 'market_id'),
+    'events': Source('events', '/events', ('volume', 'volume24hr'), 2, 'event_id'),
+}
+
+
+def build_params(source: Source, limit: int, offset: int = 0, start_date: Optional[str] = None,
+                 end_date: Optional[str] = None, lean: bool = False) -> Dict:
+    """Query parameters for a top-by-volume page, with the optional creation date window
+
+    The parsers' filters that Gamma can apply itself are pushed down as
+    parameters (see queryplan.py). Lean pages leave out the per-market extras.
+    """
+    params = {
+        'order': source.orders[0],
+        'ascending': 'false',
+        'limit': limit,
+        'include_trading_stats': 'true',
+        'include_market_liquidity': 'true',
+        'include_categories': 'true',
+        'include_timestamps': 'true',
+    }
+    params.update(plan_query(source.kind, end_date).params)
+    if lean:
+        for name in LEAN_DROPPED_PARAMS:
+            params.pop(name, None)
+    if offset:
+        params['offset'] = offset
+
+    if start_date:
+        try:
+            params['created_at_min'] = int(datetime.fromisoformat(start_date).timestamp())
+        except ValueError:
+            print(f"Warning: Invalid start_date format: {start_date}")
+    if end_date:
+        try:
+            params['created_at_max'] = int(datetime.fromisoformat(end_date).timestamp())
+        except ValueError:
+            print(f"Warning: Invalid end_date format: {end_date}")
+    return params
+
+
+def request_list(fetcher, source: Source, params: Dict, session=None, lean: bool = False) -> List[Dict]:
+    """Request one page, falling back through source.orders on HTTP errors, and decode it
+
+    Raises requests exceptions once the last fallback fails (including a 429
+    that survived limited_get's retries); returns [] for undecodable bodies.
+    Lean event pages are decoded without their nested markets and descriptions.
+    """
+    url = f"{fetcher.base_url}{source.endpoint}"
+    print(f"Requesting URL: {url}")
+    print(f"Request parameters: {json.dumps(params, indent=2)}")
+
+    start_time = time.time()
+    response = limited_get(url, fetcher.rate_limiter, session=session, headers=fetcher.headers,
+                           params=params, timeout=30)
+    print(f"API response time: {time.time() - start_time:.2f} seconds")
+    print(f"Response status code: {response.status_code}")
+
+    for order in source.orders[1:]:
+        if response.status_code == 200:
+            break
+        print(f"HTTP Error {response.status_code} with order '{params['order']}': {response.text[:500]}...")
+        # Still throttled after backing off; a different sort field won't help
+        if response.status_code == 429:
+            break
+        print(f"Trying with '{order}' parameter as fallback...")
+        params['order'] = order
+        response = limited_get(url, fetcher.rate_limiter, session=session, headers=fetcher.headers,
+                               params=params, timeout=30)
+    response.raise_for_status()
+
+    try:
+        with timing.phase('decode'):
+            data = decode_lean(response.text) if lean and source.kind == 'events' else response.json()
+    except ValueError as e:
+        print(f"JSON parsing error: {e}")
+        print(f"Raw response content: {response.text[:500]}...")
+        return []
+
+    if isinstance(data, dict) and source.kind in data:
+        data = data.get(source.kind) or []
+        print(f"Extracted {len(data)} {source.kind} from response")
+    if not isinstance(data, list):
+        print(f"Unexpected response format: {type(data)}")
+        print(f"Response keys: {data.keys() if isinstance(data, dict) else 'Not a dictionary'}")
+        return []
+
+    if data:
+        print(f"Successfully fetched {len(data)} {source.kind}")
+        first = data[0]
+        volume_fields = [f"{key}: {first.get(key)}" for key in first.keys() if 'volume' in key.lower()]
+        print(f"First record: {first.get('title') or first.get('question', 'N/A')}")
+        print(f"Volume-related fields: {volume_fields}")
+    return data
+
+
+# Bounds for adaptively sized pages; Gamma caps limit at 500
+MIN_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 500
+# The first page assumes most of the top records survive filtering; later pages
+# use the observed pass rate, asking for this much more than the estimate needs
+FIRST_PAGE_FACTOR = 1.25
+PAGE_SIZE_MARGIN = 1.2
+
+
+class Pipeline:
+    """Lazily fetch, parse, filter, rank and export the top records of one source
+
+    Args:
+        kind: 'markets' or 'events'.
+        top: Number of records to produce.
+        start_date, end_date: Optional creation date window (YYYY-MM-DD).
+        fetcher: Fetcher to use; defaults to a new one for the source.
+        page_size: Fixed upstream page size. When omitted, each page is sized from the filter
+            pass rate observed so far, to fetch just enough for the records still missing.
+        concurrency: Pages requested in parallel per round.
+        filters: Extra predicates on parsed records, applied before ranking.
+        sinks: Callables wrapping the ranked record stream, e.g. CsvSink or JsonSink.
+        parser: Override for the source's parser; the parse cache is bypassed when set.
+        parse_cache: Cache to memoize parsing with; defaults to the process-wide one.
+        expand_markets: Events only; attach each event's nested markets, parsed and
+            linked to the event, as a 'markets' list (see joined.py).
+        lean: Events only; fetch pages without nested markets and descriptions (see lean.py).
+    """
+
+    def __init__(self, kind: str, top: int = 50, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                 fetcher=None, page_size: Optional[int] = None, concurrency: int = 1,
+                 filters: Iterable[Callable[[Dict], bool]] = (), sinks: Iterable[Callable] = (),
+                 parser: Optional[Callable[[Dict, int], Optional[Dict]]] = None, parse_cache=None,
+                 expand_markets: bool = False, lean: bool = False):
+        self.source = SOURCES[kind]
+        self.top = top
+        self.start_date = start_date
+        self.end_date = end_date
+        self.fetcher = fetcher or self.source.make_fetcher()
+        self.page_size = page_size
+        self.concurrency = max(1, concurrency)
+        self.filters = list(filters)
+        self.sinks = list(sinks)
+        self.parser = parser or self.source.parser(self.fetcher)
+        if parser is None and parse_cache is None:
+            from parse_cache import get_parse_cache
+            parse_cache = get_parse_cache()
+        self.parse_cache = parse_cache if parser is None else None
+        self.market_parser = None
+        if lean and (kind != 'events' or expand_markets):
+            raise ValueError("lean only applies to events without expand_markets")
+        self.lean = lean
+        if expand_markets:
+            if kind != 'events':
+                raise ValueError("expand_markets only applies to events")
+            from polymarket import PolymarketFetcher
+            self.market_parser = PolymarketFetcher(rate_limiter=self.fetcher.rate_limiter).parse_market_data
+        # Upstream applies the pushed-down filters; the rest are checked before parsing
+        self.plan = plan_query(kind, end_date)
+        self.stats = {'pages': 0, 'fetched': 0, 'parsed': 0, 'skipped': 0, 'filtered': 0, 'passed': 0}
+
+    def next_page_size(self) -> int:
+        """Records to request per page in the next round, given how many are still missing"""
+        if self.page_size:
+            return self.page_size
+        missing = max(self.top - self.stats['passed'], 1)
+        if not self.stats['fetched']:
+            size = missing * FIRST_PAGE_FACTOR
+        else:
+            # Smoothed so a page where nothing passed doesn't divide by zero
+            pass_rate = (self.stats['passed'] + 1) / (self.stats['fetched'] + 1)
+            size = missing / pass_rate * PAGE_SIZE_MARGIN
+        # Concurrent rounds split what's missing across their pages
+        size = math.ceil(size / self.concurrency)
+        return max(MIN_PAGE_SIZE, min(MAX_PAGE_SIZE, size))
+
+    def pages(self) -> Iterator[List[Dict]]:
+        """Upstream pages in offset order, concurrency at a time; ends after a short page
+
+        Pages are only requested while downstream stages still need records, so
+        by the time the next round is sized every record of the previous one has
+        been parsed, filtered and ranked.
+        """
+        offset = 0
+        with ExitStack() as stack:
+            executor = None
+            if self.concurrency > 1:
+                executor = stack.enter_context(ThreadPoolExecutor(max_workers=self.concurrency))
+            while True:
+                limit = self.next_page_size()
+                fetch = lambda page_offset: self.source.fetch_page(self.fetcher, self.top, self.start_date,
+                                                                   self.end_date, page_offset, limit, self.lean)
+                offsets = [offset + i * limit for i in range(self.concurrency)]
+                offset += self.concurrency * limit
+                pages = executor.map(fetch, offsets) if executor else [fetch(offsets[0])]
+                for page in pages:
+                    self.stats['pages'] += 1
+                    self.stats['fetched'] += len(page)
+                    yield page
+                    if len(page) < limit:
+                        return
+
+    def records(self) -> Iterator[Dict]:
+        """Raw records, deduplicated by id across pages"""
+        seen = set()
+        for page in self.pages():
+            new = 0
+            for record in page:
+                record_id = record.get('id')
+                if record_id is not None:
+                    if record_id in seen:
+                        continue
+                    seen.add(record_id)
+                new += 1
+                yield record
+            if not new:
+                # Upstream ignored the offset; further pages would repeat this one
+                return
+
+    def normalize(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        """Parse records, dropping the ones the parser filters out"""
+        kind = self.source.kind
+        parse_seconds = 0.0
+        try:
+            for position, record in enumerate(records, 1):
+                reason = self.plan.rejects(record)
+                if reason is not None:
+                    metrics.RECORDS_SKIPPED.inc((kind, reason))
+                    self.stats['skipped'] += 1
+                    continue
+                start = time.perf_counter()
+                with timing.phase('parse'):
+                    if self.parse_cache is not None:
+                        parsed = self.parse_cache.parse(kind, record, position, self.parser)
+                    else:
+                        parsed = self.parser(record, position)
+                parse_seconds += time.perf_counter() - start
+                if parsed and self.market_parser is not None:
+                    with timing.phase('expand'):
+                        parsed['markets'] = expand_event_markets(record, parsed, self.market_parser,
+                                                                 self.parse_cache)
+                if parsed:
+                    self.stats['parsed'] += 1
+                    yield parsed
+                else:
+                    self.stats['skipped'] += 1
+        finally:
+            metrics.PARSE_BATCH_SECONDS.observe(parse_seconds, (kind,))
+
+    def filter(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        for record in records:
+            if all(predicate(record) for predicate in self.filters):
+                yield record
+            else:
+                self.stats['filtered'] += 1
+
+    def rank(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        """Number the first top records; upstream ordering already ranks them by volume"""
+        if self.top <= 0:
+            return
+        for rank, record in enumerate(records, 1):
+            # Timed per record: the loop itself also waits on the upstream stages
+            with timing.phase('rank'):
+                record['rank'] = rank
+                self.stats['passed'] = rank
+            yield record
+            if rank >= self.top:
+                return
+
+    def __iter__(self) -> Iterator[Dict]:
+        stream = self.rank(self.filter(self.normalize(self.records())))
+        for sink in self.sinks:
+            stream = sink(stream)
+        return stream
+
+    def run(self) -> List[Dict]:
+        return list(self)
+
+
+class CsvSink:
+    """Writes each ranked record as a CSV row while passing it on; the file is only created once a record arrives"""
+
+    def __init__(self, path: str, fetcher):
+        self.path = path
+        self.fetcher = fetcher
+
+    def __call__(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        import csv
+
+        kind = self.fetcher.kind
+        f = writer = None
+        write_seconds = 0.0
+        try:
+            for record in records:
+                start = time.perf_counter()
+                with timing.phase('csv'):
+                    if writer is None:
+                        f = open(self.path, 'w', newline='', encoding='utf-8')
+                        writer = csv.DictWriter(f, fieldnames=self.fetcher.CSV_HEADERS)
+                        writer.writeheader()
+                    writer.writerow(self.fetcher.csv_row(record))
+                write_seconds += time.perf_counter() - start
+                yield record
+        finally:
+            if f is not None:
+                f.close()
+                metrics.EXPORT_SECONDS.observe(write_seconds, (kind, 'csv'))
+                print(f"Data saved to {self.path}")
+
+
+class JsonSink:
+    """Streams ranked records as a JSON array or NDJSON to a path or an open text stream"""
+
+    def __init__(self, path: str, fmt: str = 'json', stream=None):
+        self.path = path
+        self.fmt = fmt
+        self.stream = stream
+
+    def __call__(self, records: Iterable[Dict]) -> Iterator[Dict]:
+        out = None
+        count = 0
+        try:
+            for record in records:
+                if out is None:
+                    out = self.stream or open(self.path, 'w', encoding='utf-8')
+                    if self.fmt == 'json':
+                        out.write('[\n')
+                line = json.dumps(record, ensure_ascii=False)
+                if self.fmt == 'json':
+                    out.write((',\n' if count else '') + '  ' + line)
+                else:
+                    out.write(line + '\n')
+                count += 1
+                yield record
+        finally:
+            if out is not None:
+                if self.fmt == 'json':
+                    out.write('\n]\n')
+                if out is not self.stream:
+                    out.close()
+                else:
+                    out.flush()
@@ -1,25 +1,61 @@
-import requests
 import json
 from datetime import datetime
 from typing import List, Dict, Optional
-import time
+import os
 
-try:
-    from dateutil.parser import parse as parse_date
-except ImportError:
-    print("Warning: python-dateutil not installed. Date parsing may be limited.")
-    def parse_date(date_string):
-        # Fallback basic date parsing
-        return datetime.fromisoformat(date_string.replace('Z', '+00:00'))
+import metrics
+import timing
+from pipeline import SOURCES, Pipeline, build_params, request_list
+from queryplan import MIN_VOLUME
+from ratelimit import TokenBucket, get_shared_limiter, limited_get
+
+_parse_date = None
+
+def parse_date(date_string):
+    """Parse a date string, importing dateutil on first use to keep cold starts cheap"""
+    global _parse_date
+    if _parse_date is None:
+        try:
+            from dateutil.parser import parse as dateutil_parse
+            _parse_date = dateutil_parse
+        except ImportError:
+            print("Warning: python-dateutil not installed. Date parsing may be limited.")
+            # Fallback basic date parsing
+            _parse_date = lambda value: datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return _parse_date(date_string)
+
+def parse_json_list(value) -> List:
+    """Gamma sends some list fields (outcomes, clobTokenIds) as JSON-encoded strings"""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str) and value.startswith('['):
+        try:
+            decoded = json.loads(value)
+        except ValueError:
+            return []
+        return decoded if isinstance(decoded, list) else []
+    return []
+
+DEFAULT_BASE_URL = "https://gamma-api.polymarket.com"
 
 class PolymarketFetcher:
-    def __init__(self):
-        self.base_url = "https://gamma-api.polymarket.com"
+    kind = 'markets'
+    # CSV columns - include both volume fields
+    CSV_HEADERS = [
+        'rank', 'title', 'volume_total', 'volume_24h', 'status', 'category', 
+        'created_at', 'end_date', 'url', 'liquidity', 'market_id'
+    ]
+    
+    def __init__(self, rate_limiter: Optional[TokenBucket] = None, base_url: Optional[str] = None):
+        # POLYMARKET_GAMMA_URL points the fetcher at a local stand-in for load testing
+        self.base_url = (base_url or os.environ.get('POLYMARKET_GAMMA_URL') or DEFAULT_BASE_URL).rstrip('/')
         self.markets_endpoint = "/markets"
         self.events_endpoint = "/events"  # Add events endpoint
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        # Shared across worker processes so parallel gunicorn workers don't trip 429s
+        self.rate_limiter = rate_limiter or get_shared_limiter()
         
     def parse_category_from_tags(self, tags: List[Dict]) -> str:
         """Parse category from tags list, prioritizing meaningful categories"""
@@ -94,131 +130,28 @@ class PolymarketFetcher:
             
         return 'Uncategorized'
     
-    def fetch_top_markets_by_volume(self, n: int = 50, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
+    def fetch_top_markets_by_volume(self, n: int = 50, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                    offset: int = 0, limit: Optional[int] = None) -> List[Dict]:
         """Fetch top N markets by volume from Gamma Markets API
         
         Args:
             n: Number of markets to fetch
             start_date: Start date in ISO format (YYYY-MM-DD) for filtering markets
             end_date: End date in ISO format (YYYY-MM-DD) for filtering markets
+            offset: Number of upstream records to skip, for fetching later pages
+            limit: Page size to request; defaults to 3x n to account for filtering
         """
+        # requests is imported on first fetch so module import stays cheap on cold starts
+        import requests
+        
         print(f"Fetching top {n} markets by volume from Polymarket Gamma API...")
         if start_date:
             print(f"Filtering markets from {start_date} to {end_date or 'now'}")
         
+        source = SOURCES['markets']
         try:
-            # Try different API parameters to match website behavior
-            url = f"{self.base_url}{self.markets_endpoint}"
-            params = {
-                'order': 'volumeNum',  # Use volumeNum instead of volume for proper sorting
-                'ascending': 'false',
-                'limit': n * 3,  # Fetch more to account for filtering
-                'closed': 'false',
-                'active': 'true',
-                'include_trading_stats': 'true',
-                'include_market_liquidity': 'true',
-                'include_categories': 'true',
-                'include_timestamps': 'true',
-                'end_date_min': int(datetime.now().timestamp())
-            }
-            
-            # Add date filtering parameters if provided
-            if start_date:
-                try:
-                    start_dt = datetime.fromisoformat(start_date)
-                    params['created_at_min'] = int(start_dt.timestamp())
-                except ValueError:
-                    print(f"Warning: Invalid start_date format: {start_date}")
-            
-            if end_date:
-                try:
-                    end_dt = datetime.fromisoformat(end_date)
-                    params['created_at_max'] = int(end_dt.timestamp())
-                    # Also update end_date_min to show markets that were active during this period
-                    params['end_date_min'] = int(end_dt.timestamp())
-                except ValueError:
-                    print(f"Warning: Invalid end_date format: {end_date}")
-            
-            print(f"Requesting URL: {url}")
-            print(f"Request parameters: {json.dumps(params, indent=2)}")
-            
-            start_time = time.time()
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response_time = time.time() - start_time
-            
-            print(f"API response time: {response_time:.2f} seconds")
-            print(f"Response status code: {response.status_code}")
-            
-            try:
-                response.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                print(f"HTTP Error: {e}")
-                print(f"Response body: {response.text[:500]}...")
-                
-                # If volumeNum doesn't work, try volumeClob as fallback
-                print("Trying with 'volumeClob' parameter as fallback...")
-                params['order'] = 'volumeClob'
-                response = requests.get(url, headers=self.headers, params=params, timeout=30)
-                
-                # If that also fails, try 'volume24hr' as last resort
-                if response.status_code != 200:
-                    print("Trying with 'volume24hr' parameter as final fallback...")
-                    params['order'] = 'volume24hr'
-                    response = requests.get(url, headers=self.headers, params=params, timeout=30)
-                    
-                response.raise_for_status()
-            
-            try:
-                markets = response.json()
-            except json.JSONDecodeError as e:
-                print(f"JSON parsing error: {e}")
-                print(f"Raw response content: {response.text[:500]}...")
-                return []
-            
-            # Debug: Print first few markets to see structure
-            if isinstance(markets, list) and len(markets) > 0:
-                print(f"Successfully fetched {len(markets)} markets")
-                print("\n=== DEBUG: First market structure ===")
-                first_market = markets[0]
-                print(f"Market keys: {list(first_market.keys())}")
-                
-                # Look for different volume fields
-                volume_fields = []
-                for key in first_market.keys():
-                    if 'volume' in key.lower():
-                        volume_fields.append(f"{key}: {first_market.get(key)}")
-                
-                print(f"Volume-related fields: {volume_fields}")
-                print(f"Title: {first_market.get('title', 'N/A')}")
-                print(f"Active: {first_market.get('active', 'N/A')}")
-                print(f"Closed: {first_market.get('closed', 'N/A')}")
-                print("=====================================\n")
-                
-                return markets
-            elif isinstance(markets, dict) and 'markets' in markets:
-                markets_list = markets.get('markets', [])
-                print(f"Extracted {len(markets_list)} markets from response")
-                
-                if len(markets_list) > 0:
-                    print("\n=== DEBUG: First market structure ===")
-                    first_market = markets_list[0]
-                    print(f"Market keys: {list(first_market.keys())}")
-                    
-                    volume_fields = []
-                    for key in first_market.keys():
-                        if 'volume' in key.lower():
-                            volume_fields.append(f"{key}: {first_market.get(key)}")
-                    
-                    print(f"Volume-related fields: {volume_fields}")
-                    print(f"Title: {first_market.get('title', 'N/A')}")
-                    print("=====================================\n")
-                
-                return markets_list
-            else:
-                print(f"Unexpected response format: {type(markets)}")
-                print(f"Response keys: {markets.keys() if isinstance(markets, dict) else 'Not a dictionary'}")
-                return []
-                
+            params = build_params(source, limit or n * source.overfetch, offset, start_date, end_date)
+            return request_list(self, source, params)
         except requests.exceptions.RequestException as e:
             print(f"Network error fetching markets: {e}")
             return []
@@ -228,88 +161,48 @@ class PolymarketFetcher:
             print(f"Traceback: {traceback.format_exc()}")
             return []
     
-    def fetch_top_events_by_volume(self, n: int = 50) -> List[Dict]:
-        """Fetch top N events by volume from Gamma Events API"""
-        print(f"Fetching top {n} events by volume from Polymarket Gamma Events API...")
+    def fetch_top_events_by_volume(self, n: int = 50, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                   offset: int = 0, limit: Optional[int] = None, lean: bool = False) -> List[Dict]:
+        """Fetch top N events by volume from Gamma Events API
         
-        try:
-            url = f"{self.base_url}{self.events_endpoint}"
-            # Try sorting by total volume first
-            params = {
-                'order': 'volume',  # Try total volume first
-                'ascending': 'false',
-                'limit': n * 2,
-                'closed': 'false',
-                'active': 'true',
-                'include_trading_stats': 'true',
-                'include_market_liquidity': 'true',
-                'include_categories': 'true',
-                'include_timestamps': 'true',
-                'end_date_min': int(datetime.now().timestamp())
-            }
-            
-            print(f"Requesting Events URL: {url}")
-            print(f"Request parameters: {json.dumps(params, indent=2)}")
-            
-            start_time = time.time()
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response_time = time.time() - start_time
-            
-            print(f"Events API response time: {response_time:.2f} seconds")
-            print(f"Response status code: {response.status_code}")
-            
-            try:
-                response.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                print(f"Events API HTTP Error with 'volume' parameter: {e}")
-                print(f"Response body: {response.text[:500]}...")
-                
-                # Fallback to volume24hr if volume doesn't work
-                print("Trying with 'volume24hr' parameter as fallback...")
-                params['order'] = 'volume24hr'
-                response = requests.get(url, headers=self.headers, params=params, timeout=30)
-                
-                if response.status_code != 200:
-                    print(f"Events API failed with volume24hr too. Status: {response.status_code}")
-                    return []
-            
-            try:
-                events = response.json()
-            except json.JSONDecodeError as e:
-                print(f"Events API JSON parsing error: {e}")
-                print(f"Raw response content: {response.text[:500]}...")
-                return []
-            
-            if isinstance(events, list) and len(events) > 0:
-                print(f"Successfully fetched {len(events)} events")
-                print("\n=== DEBUG: First event structure ===")
-                first_event = events[0]
-                print(f"Event keys: {list(first_event.keys())}")
-                
-                volume_fields = []
-                for key in first_event.keys():
-                    if 'volume' in key.lower():
-                        volume_fields.append(f"{key}: {first_event.get(key)}")
-                
-                print(f"Volume-related fields: {volume_fields}")
-                print(f"Title: {first_event.get('title', 'N/A')}")
-                print("=====================================\n")
-                
-                return events
-            elif isinstance(events, dict) and 'events' in events:
-                events_list = events.get('events', [])
-                print(f"Extracted {len(events_list)} events from response")
-                return events_list
-            else:
-                print(f"Events API: Unexpected response format: {type(events)}")
-                return []
-                
-        except requests.exceptions.RequestException as e:
-            print(f"Network error fetching events: {e}")
-            return []
-        except Exception as e:
-            print(f"Unexpected error in fetch_top_events_by_volume: {type(e).__name__}: {e}")
-            return []
+        Same paging arguments as PolymarketEventsFetcher.fetch_top_events_by_volume,
+        so the pipeline can page events through this fetcher too.
+        """
+        from polymarketevents import PolymarketEventsFetcher
+        
+        events_fetcher = PolymarketEventsFetcher(rate_limiter=self.rate_limiter, base_url=self.base_url)
+        return events_fetcher.fetch_top_events_by_volume(n, start_date=start_date, end_date=end_date,
+                                                         offset=offset, limit=limit, lean=lean)
+    
+    def fetch_page(self, endpoint: str, offset: int = 0, limit: int = 100, params: Optional[Dict] = None,
+                   session=None) -> List[Dict]:
+        """Fetch one raw page from a Gamma list endpoint without the top-N filters
+        
+        Unlike the fetch_top_* methods, failures raise instead of returning an
+        empty list, so callers paging through the whole catalog can tell an error
+        from the end of the data.
+        
+        Args:
+            endpoint: API path, e.g. self.markets_endpoint or self.events_endpoint
+            offset: Number of records to skip
+            limit: Page size
+            params: Extra query parameters (order, closed, active, ...)
+            session: Optional requests.Session for connection reuse
+        """
+        url = f"{self.base_url}{endpoint}"
+        query = dict(params or {})
+        query['offset'] = offset
+        query['limit'] = limit
+        response = limited_get(url, self.rate_limiter, session=session, headers=self.headers,
+                               params=query, timeout=30)
+        response.raise_for_status()
+        with timing.phase('decode'):
+            data = response.json()
+        if isinstance(data, dict):
+            data = data.get(endpoint.strip('/'), [])
+        if not isinstance(data, list):
+            raise ValueError(f"Unexpected response format from {endpoint}: {type(data).__name__}")
+        return data
     
     def parse_market_data(self, market: Dict, rank: int) -> Dict:
         """Parse and extract relevant market data from Gamma API response"""
@@ -403,11 +296,13 @@ class PolymarketFetcher:
             # Skip markets that are closed or resolved
             if is_closed or is_resolved or not is_active:
                 print(f"Skipping market {rank}: closed={is_closed}, resolved={is_resolved}, active={is_active}")
+                metrics.record_skip('markets', 'closed')
                 return None
             
             # Skip markets with very low volume (likely not main markets)
-            if volume < 1000:  # Skip markets with less than $1000 volume
+            if volume < MIN_VOLUME['markets']:  # Skip markets with less than $1000 volume
                 print(f"Skipping low-volume market {rank}: ${volume}")
+                metrics.record_skip('markets', 'low_volume')
                 return None
             
             # Validate end date - skip if market has already ended
@@ -424,6 +319,7 @@ class PolymarketFetcher:
                     current_timestamp = datetime.now().timestamp()
                     if end_timestamp <= current_timestamp:
                         print(f"Skipping market {rank}: end date {end_date} is in the past")
+                        metrics.record_skip('markets', 'past_end_date')
                         return None
                 except Exception as e:
                     print(f"Warning: Could not parse end date {end_date} for market {rank}: {e}")
@@ -552,6 +448,8 @@ class PolymarketFetcher:
                 'description': market.get('description', '') or market.get('market_description', ''),
                 'outcomes': market.get('outcomes') or market.get('outcome_options') or [],
                 'liquidity': liquidity_val,
+                'clob_token_ids': [str(token) for token in
+                                   parse_json_list(market.get('clobTokenIds') or market.get('clob_token_ids'))],
                 'url': ''  # Will set this below based on type
             }
             
@@ -583,6 +481,7 @@ class PolymarketFetcher:
             if missing_fields:
                 print(f"WARNING: Market {rank} missing fields: {', '.join(missing_fields)}")
             
+            metrics.RECORDS_PARSED.inc(('markets',))
             return parsed_data
             
         except Exception as e:
@@ -591,6 +490,7 @@ class PolymarketFetcher:
                 print(f"Problematic market data: {json.dumps({k: v for k, v in market.items() if k in ['id', 'title', 'slug', 'closed', 'active', 'volume']})}")
             except:
                 print("Could not dump market data for debugging")
+            metrics.record_skip('markets', 'parse_error')
             return None
     
     def format_market_info(self, market: Dict) -> str:
@@ -618,10 +518,38 @@ URL: {market['url']}
     
     def save_to_json(self, markets: List[Dict], filename: str = "polymarket_top50.json"):
         """Save market data to JSON file"""
-        with open(filename, 'w', encoding='utf-8') as f:
+        with metrics.EXPORT_SECONDS.time(('markets', 'json')), open(filename, 'w', encoding='utf-8') as f:
             json.dump(markets, f, indent=2, ensure_ascii=False)
         print(f"\nData saved to {filename}")
     
+    def csv_row(self, market: Dict) -> Dict:
+        """One CSV row for a parsed market, with columns CSV_HEADERS"""
+        # Determine total volume (use volume_total if available, otherwise volume_usd)
+        total_volume = market.get('volume_total', market.get('volume_usd', 0))
+        
+        # Get 24h volume
+        volume_24h = market.get('volume_24h', 0)
+        
+        # If we only have one type of volume, try to determine which it is
+        if volume_24h == 0 and market.get('volume_type') == '24h':
+            # volume_usd is actually 24h volume
+            volume_24h = market.get('volume_usd', 0)
+            total_volume = 0  # We don't have total volume
+        
+        return {
+            'rank': market['rank'],
+            'title': market['title'],
+            'volume_total': total_volume,
+            'volume_24h': volume_24h,
+            'status': 'Closed' if market['closed'] else ('Inactive' if not market['active'] else 'Active'),
+            'category': market['category'],
+            'created_at': market['created_at'],
+            'end_date': market['end_date'],
+            'url': market['url'],
+            'liquidity': market['liquidity'],
+            'market_id': market['market_id']
+        }
+    
     def save_to_csv(self, markets: List[Dict], filename: str = "polymarket_top50.csv"):
         """Save market data to CSV file"""
         import csv
@@ -629,43 +557,11 @@ URL: {market['url']}
         if not markets:
             return
         
-        # Define CSV headers - include both volume fields
-        headers = [
-            'rank', 'title', 'volume_total', 'volume_24h', 'status', 'category', 
-            'created_at', 'end_date', 'url', 'liquidity', 'market_id'
-        ]
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
+        with metrics.EXPORT_SECONDS.time(('markets', 'csv')), open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.CSV_HEADERS)
             writer.writeheader()
-            
             for market in markets:
-                # Determine total volume (use volume_total if available, otherwise volume_usd)
-                total_volume = market.get('volume_total', market.get('volume_usd', 0))
-                
-                # Get 24h volume
-                volume_24h = market.get('volume_24h', 0)
-                
-                # If we only have one type of volume, try to determine which it is
-                if volume_24h == 0 and market.get('volume_type') == '24h':
-                    # volume_usd is actually 24h volume
-                    volume_24h = market.get('volume_usd', 0)
-                    total_volume = 0  # We don't have total volume
-                
-                row = {
-                    'rank': market['rank'],
-                    'title': market['title'],
-                    'volume_total': total_volume,
-                    'volume_24h': volume_24h,
-                    'status': 'Closed' if market['closed'] else ('Inactive' if not market['active'] else 'Active'),
-                    'category': market['category'],
-                    'created_at': market['created_at'],
-                    'end_date': market['end_date'],
-                    'url': market['url'],
-                    'liquidity': market['liquidity'],
-                    'market_id': market['market_id']
-                }
-                writer.writerow(row)
+                writer.writerow(self.csv_row(market))
         
         print(f"Data saved to {filename}")
 
@@ -676,59 +572,35 @@ def main():
     
     print("Trying to fetch top events (grouped markets) by volume first...")
     
-    # Try Events API first for grouped markets
+    # Try Events API first for grouped markets; they are parsed as markets here
     print("About to try Events API...")
-    raw_events = fetcher.fetch_top_events_by_volume(50)
+    pipeline = Pipeline('events', top=50, fetcher=fetcher, parser=fetcher.parse_market_data)
+    top_markets = pipeline.run()
+    api_type = "Events"
     
-    if raw_events and len(raw_events) > 0:
-        print(f"Events API successful! Got {len(raw_events)} events")
+    if pipeline.stats['fetched'] > 0:
+        print(f"Events API successful! Got {pipeline.stats['fetched']} events")
         print("Using Events API data (grouped markets)...")
-        raw_markets = raw_events
-        api_type = "Events"
     else:
         print("Events API failed or returned no data. Falling back to individual Markets API...")
         # Fall back to individual markets
-        raw_markets = fetcher.fetch_top_markets_by_volume(100)
+        pipeline = Pipeline('markets', top=50, fetcher=fetcher)
+        top_markets = pipeline.run()
         api_type = "Markets"
     
-    print(f"Returned {len(raw_markets) if raw_markets else 0} raw {api_type.lower()}")
+    print(f"Returned {pipeline.stats['fetched']} raw {api_type.lower()}")
     
-    if not raw_markets:
+    if not pipeline.stats['fetched']:
         print(f"Failed to fetch {api_type.lower()} data")
         return
     
-    # Parse and filter the markets/events
-    parsed_markets = []
-    parsing_errors = 0
-    skipped_markets = 0
-    
-    print(f"Parsing and filtering {api_type.lower()} data...")
-    for i, market in enumerate(raw_markets, 1):
-        try:
-            parsed = fetcher.parse_market_data(market, i)
-            if parsed:
-                parsed_markets.append(parsed)
-            else:
-                skipped_markets += 1
-        except Exception as e:
-            parsing_errors += 1
-            print(f"Unexpected error parsing {api_type.lower()} at index {i}: {type(e).__name__}: {e}")
-    
-    print(f"Successfully parsed {len(parsed_markets)} active {api_type.lower()}")
-    print(f"Skipped {skipped_markets} closed/inactive {api_type.lower()}")
-    
-    if parsing_errors > 0:
-        print(f"WARNING: {parsing_errors} {api_type.lower()} failed to parse properly")
+    print(f"Successfully parsed {pipeline.stats['parsed']} active {api_type.lower()}")
+    print(f"Skipped {pipeline.stats['skipped']} closed/inactive {api_type.lower()}")
         
-    if len(parsed_markets) == 0:
+    if len(top_markets) == 0:
         print(f"ERROR: No valid active {api_type.lower()} data after filtering")
         return
     
-    # Take only top 50 and re-rank them
-    top_markets = parsed_markets[:50]
-    for i, market in enumerate(top_markets, 1):
-        market['rank'] = i
-    
     # Display summary statistics
     total_volume = sum(m['volume_usd'] for m in top_markets)
     markets_with_dates = sum(1 for m in top_markets if m['created_at'] and m['end_date'])
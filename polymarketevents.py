@@ -1,119 +1,73 @@
-import requests
 import json
 from datetime import datetime
 from typing import List, Dict, Optional
-import time
+import os
 
-try:
-    from dateutil.parser import parse as parse_date
-except ImportError:
-    print("Warning: python-dateutil not installed. Date parsing may be limited.")
-    def parse_date(date_string):
-        # Fallback basic date parsing
-        return datetime.fromisoformat(date_string.replace('Z', '+00:00'))
+import metrics
+from pipeline import SOURCES, Pipeline, build_params, request_list
+from queryplan import MIN_VOLUME
+from ratelimit import TokenBucket, get_shared_limiter
+from rollups import Rollups
+
+_parse_date = None
+
+def parse_date(date_string):
+    """Parse a date string, importing dateutil on first use to keep cold starts cheap"""
+    global _parse_date
+    if _parse_date is None:
+        try:
+            from dateutil.parser import parse as dateutil_parse
+            _parse_date = dateutil_parse
+        except ImportError:
+            print("Warning: python-dateutil not installed. Date parsing may be limited.")
+            # Fallback basic date parsing
+            _parse_date = lambda value: datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return _parse_date(date_string)
+
+DEFAULT_BASE_URL = "https://gamma-api.polymarket.com"
 
 class PolymarketEventsFetcher:
-    def __init__(self):
-        self.base_url = "https://gamma-api.polymarket.com"
+    kind = 'events'
+    # CSV columns - include both volume fields
+    CSV_HEADERS = [
+        'rank', 'title', 'volume_total', 'volume_24h', 'status', 'category', 
+        'created_at', 'end_date', 'url', 'liquidity', 'market_count', 
+        'featured', 'event_id'
+    ]
+    
+    def __init__(self, rate_limiter: Optional[TokenBucket] = None, base_url: Optional[str] = None):
+        # POLYMARKET_GAMMA_URL points the fetcher at a local stand-in for load testing
+        self.base_url = (base_url or os.environ.get('POLYMARKET_GAMMA_URL') or DEFAULT_BASE_URL).rstrip('/')
         self.events_endpoint = "/events"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
+        # Shared across worker processes so parallel gunicorn workers don't trip 429s
+        self.rate_limiter = rate_limiter or get_shared_limiter()
     
-    def fetch_top_events_by_volume(self, n: int = 50, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[Dict]:
+    def fetch_top_events_by_volume(self, n: int = 50, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                                   offset: int = 0, limit: Optional[int] = None, lean: bool = False) -> List[Dict]:
         """Fetch top N events by total volume from Polymarket Gamma Events API
         
         Args:
             n: Number of events to fetch
             start_date: Start date in ISO format (YYYY-MM-DD) for filtering events
             end_date: End date in ISO format (YYYY-MM-DD) for filtering events
+            offset: Number of upstream records to skip, for fetching later pages
+            limit: Page size to request; defaults to 2x n to account for filtering
+            lean: Leave out nested markets and descriptions (see lean.py)
         """
+        # requests is imported on first fetch so module import stays cheap on cold starts
+        import requests
+        
         print(f"Fetching top {n} events by total volume from Polymarket Gamma Events API...")
         if start_date:
             print(f"Filtering events from {start_date} to {end_date or 'now'}")
         
+        source = SOURCES['events']
         try:
-            url = f"{self.base_url}{self.events_endpoint}"
-            params = {
-                'order': 'volume',  # Changed from 'volume24hr' to 'volume' for total volume
-                'ascending': 'false',
-                'limit': n * 2,  # Fetch more to account for filtering
-                'closed': 'false',
-                'active': 'true',
-                'include_trading_stats': 'true',
-                'include_market_liquidity': 'true',
-                'include_categories': 'true',
-                'include_timestamps': 'true',
-                'end_date_min': int(datetime.now().timestamp())
-            }
-            
-            # Add date filtering parameters if provided
-            if start_date:
-                try:
-                    start_dt = datetime.fromisoformat(start_date)
-                    params['created_at_min'] = int(start_dt.timestamp())
-                except ValueError:
-                    print(f"Warning: Invalid start_date format: {start_date}")
-            
-            if end_date:
-                try:
-                    end_dt = datetime.fromisoformat(end_date)
-                    params['created_at_max'] = int(end_dt.timestamp())
-                    # Also update end_date_min to show events that were active during this period
-                    params['end_date_min'] = int(end_dt.timestamp())
-                except ValueError:
-                    print(f"Warning: Invalid end_date format: {end_date}")
-            
-            print(f"Requesting Events URL: {url}")
-            print(f"Request parameters: {json.dumps(params, indent=2)}")
-            
-            start_time = time.time()
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            response_time = time.time() - start_time
-            
-            print(f"Events API response time: {response_time:.2f} seconds")
-            print(f"Response status code: {response.status_code}")
-            
-            try:
-                response.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                print(f"Events API HTTP Error: {e}")
-                print(f"Response body: {response.text[:500]}...")
-                
-                # If total volume doesn't work, try 24hr volume as fallback
-                print("Trying with 'volume24hr' parameter as fallback...")
-                params['order'] = 'volume24hr'
-                response = requests.get(url, headers=self.headers, params=params, timeout=30)
-                response.raise_for_status()
-            
-            try:
-                events = response.json()
-            except json.JSONDecodeError as e:
-                print(f"Events API JSON parsing error: {e}")
-                print(f"Raw response content: {response.text[:500]}...")
-                return []
-            
-            if isinstance(events, list) and len(events) > 0:
-                print(f"Successfully fetched {len(events)} events")
-                print(f"First event title: {events[0].get('title', 'N/A')}")
-                
-                # Debug: Print volume fields for first event
-                first_event = events[0]
-                print("\n=== DEBUG: First event volume fields ===")
-                for key in first_event.keys():
-                    if 'volume' in key.lower():
-                        print(f"{key}: {first_event.get(key)}")
-                print("=====================================\n")
-                
-                return events
-            elif isinstance(events, dict) and 'events' in events:
-                events_list = events.get('events', [])
-                print(f"Extracted {len(events_list)} events from response")
-                return events_list
-            else:
-                print(f"Events API: Unexpected response format: {type(events)}")
-                return []
-                
+            params = build_params(source, limit or n * source.overfetch, offset, start_date, end_date, lean)
+            return request_list(self, source, params, lean=lean)
         except requests.exceptions.RequestException as e:
             print(f"Network error fetching events: {e}")
             return []
@@ -256,12 +210,14 @@ class PolymarketEventsFetcher:
             
             if is_closed or not is_active:
                 print(f"Skipping event {rank}: closed={is_closed}, active={is_active}")
+                metrics.record_skip('events', 'closed')
                 return None
             
             # Skip low volume events (adjust threshold for total volume)
-            min_volume = 10000 if total_volume > 0 else 1000  # Higher threshold for total volume
+            min_volume = MIN_VOLUME['events'] if total_volume > 0 else MIN_VOLUME['markets']  # Higher threshold for total volume
             if volume < min_volume:
                 print(f"Skipping low-volume event {rank}: ${volume:,.2f}")
+                metrics.record_skip('events', 'low_volume')
                 return None
             
             # Validate end date
@@ -276,6 +232,7 @@ class PolymarketEventsFetcher:
                     current_timestamp = datetime.now().timestamp()
                     if end_timestamp <= current_timestamp:
                         print(f"Skipping event {rank}: end date {end_date} is in the past")
+                        metrics.record_skip('events', 'past_end_date')
                         return None
                 except Exception as e:
                     print(f"Warning: Could not parse end date {end_date} for event {rank}: {e}")
@@ -302,15 +259,18 @@ class PolymarketEventsFetcher:
                 'description': event.get('description', ''),
                 'liquidity': float(event.get('liquidity', 0) or event.get('liquidityClob', 0) or 0),
                 'url': f"https://polymarket.com/event/{event.get('slug', '')}" if event.get('slug') else '',
-                'market_count': len(event.get('markets', [])),
+                'market_count': len(event['markets']) if isinstance(event.get('markets'), list)
+                                else event.get('market_count', 0),
                 'featured': event.get('featured', False),
                 'competitive': event.get('competitive', False)
             }
             
+            metrics.RECORDS_PARSED.inc(('events',))
             return parsed_data
             
         except Exception as e:
             print(f"Error parsing event data for event {rank}: {e}")
+            metrics.record_skip('events', 'parse_error')
             return None
     
     def format_event_info(self, event: Dict) -> str:
@@ -344,10 +304,28 @@ URL: {event['url']}
     
     def save_to_json(self, events: List[Dict], filename: str = "polymarket_top50_events.json"):
         """Save event data to JSON file"""
-        with open(filename, 'w', encoding='utf-8') as f:
+        with metrics.EXPORT_SECONDS.time(('events', 'json')), open(filename, 'w', encoding='utf-8') as f:
             json.dump(events, f, indent=2, ensure_ascii=False)
         print(f"\nData saved to {filename}")
     
+    def csv_row(self, event: Dict) -> Dict:
+        """One CSV row for a parsed event, with columns CSV_HEADERS"""
+        return {
+            'rank': event['rank'],
+            'title': event['title'],
+            'volume_total': event.get('volume_total', event.get('volume_usd', 0)),
+            'volume_24h': event.get('volume_24h', 0),
+            'status': 'Closed' if event['is_closed'] else ('Inactive' if not event['is_active'] else 'Active'),
+            'category': event['category'],
+            'created_at': event['created_at'],
+            'end_date': event['end_date'],
+            'url': event['url'],
+            'liquidity': event['liquidity'],
+            'market_count': event['market_count'],
+            'featured': event['featured'],
+            'event_id': event['event_id']
+        }
+    
     def save_to_csv(self, events: List[Dict], filename: str = "polymarket_top50_events.csv"):
         """Save event data to CSV file"""
         import csv
@@ -355,34 +333,11 @@ URL: {event['url']}
         if not events:
             return
         
-        # Define CSV headers - updated to include both volume fields
-        headers = [
-            'rank', 'title', 'volume_total', 'volume_24h', 'status', 'category', 
-            'created_at', 'end_date', 'url', 'liquidity', 'market_count', 
-            'featured', 'event_id'
-        ]
-        
-        with open(filename, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
+        with metrics.EXPORT_SECONDS.time(('events', 'csv')), open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=self.CSV_HEADERS)
             writer.writeheader()
-            
             for event in events:
-                row = {
-                    'rank': event['rank'],
-                    'title': event['title'],
-                    'volume_total': event.get('volume_total', event.get('volume_usd', 0)),
-                    'volume_24h': event.get('volume_24h', 0),
-                    'status': 'Closed' if event['is_closed'] else ('Inactive' if not event['is_active'] else 'Active'),
-                    'category': event['category'],
-                    'created_at': event['created_at'],
-                    'end_date': event['end_date'],
-                    'url': event['url'],
-                    'liquidity': event['liquidity'],
-                    'market_count': event['market_count'],
-                    'featured': event['featured'],
-                    'event_id': event['event_id']
-                }
-                writer.writerow(row)
+                writer.writerow(self.csv_row(event))
         
         print(f"Data saved to {filename}")
 
@@ -391,61 +346,35 @@ def main():
     print("Starting Polymarket Events Tracker...")
     fetcher = PolymarketEventsFetcher()
     
-    # Fetch events
+    # Fetch, parse and rank events
     print("Fetching top events by total volume...")
-    raw_events = fetcher.fetch_top_events_by_volume(50)
+    pipeline = Pipeline('events', top=50, fetcher=fetcher)
+    top_events = pipeline.run()
     
-    if not raw_events:
+    if not pipeline.stats['fetched']:
         print("Failed to fetch events data")
         return
     
-    # Parse and filter events
-    parsed_events = []
-    parsing_errors = 0
-    skipped_events = 0
-    
-    print("Parsing and filtering events data...")
-    for i, event in enumerate(raw_events, 1):
-        try:
-            parsed = fetcher.parse_event_data(event, i)
-            if parsed:
-                parsed_events.append(parsed)
-            else:
-                skipped_events += 1
-        except Exception as e:
-            parsing_errors += 1
-            print(f"Unexpected error parsing event at index {i}: {type(e).__name__}: {e}")
-    
-    print(f"Successfully parsed {len(parsed_events)} active events")
-    print(f"Skipped {skipped_events} closed/inactive events")
-    
-    if parsing_errors > 0:
-        print(f"WARNING: {parsing_errors} events failed to parse properly")
+    print(f"Successfully parsed {pipeline.stats['parsed']} active events")
+    print(f"Skipped {pipeline.stats['skipped']} closed/inactive events")
         
-    if len(parsed_events) == 0:
+    if len(top_events) == 0:
         print("ERROR: No valid active events data after filtering")
         return
     
-    # Take only top 50 and re-rank them
-    top_events = parsed_events[:50]
-    for i, event in enumerate(top_events, 1):
-        event['rank'] = i
-    
     # Display summary statistics
-    total_volume = sum(e['volume_usd'] for e in top_events)
-    total_24h_volume = sum(e.get('volume_24h', 0) for e in top_events)
-    categories = {}
-    for event in top_events:
-        cat = event['category']
-        categories[cat] = categories.get(cat, 0) + 1
+    rollups = Rollups('events')
+    rollups.ingest(top_events)
+    summary = rollups.stats()
+    categories = {name: bucket['count'] for name, bucket in summary['by_category'].items()}
     
     print(f"\n{'='*60}")
     print(f"TOP 50 POLYMARKET EVENTS BY TOTAL VOLUME")
     print(f"{'='*60}")
-    print(f"Total Volume (All Time): ${total_volume:,.2f}")
-    if total_24h_volume > 0:
-        print(f"Total 24h Volume: ${total_24h_volume:,.2f}")
-    print(f"Active Events: {len(top_events)}")
+    print(f"Total Volume (All Time): ${summary['totals']['volume_usd']:,.2f}")
+    if summary['totals']['volume_24h'] > 0:
+        print(f"Total 24h Volume: ${summary['totals']['volume_24h']:,.2f}")
+    print(f"Active Events: {summary['totals']['count']}")
     print(f"Categories: {dict(sorted(categories.items(), key=lambda x: x[1], reverse=True))}")
     print(f"{'='*60}\n")
     
@@ -0,0 +1,164 @@
+"""Declarative top-list filters, pushed down into Gamma query parameters where possible.
+
+The parsers drop closed, resolved and inactive records, records under a volume
+floor ($1,000 for markets, $10,000 for events, or $1,000 of 24h volume for
+events without a total) and records whose end date has passed. Written as
+Conditions, the ones Gamma can evaluate itself become query parameters, so
+those records are never downloaded, decoded or parsed. Only the remainder is
+checked locally, on raw records before they reach the parser:
+
+    plan = plan_query('markets', end_date='2025-03-31')
+    plan.params    # {'closed': 'false', 'active': 'true', 'volume_num_min': 1000, 'end_date_min': ...}
+    plan.residual  # [resolved == False]
+
+Conditions on the same field are merged first, e.g. the end of a date window and
+"not ended yet" become one end_date_min. The parsers keep their own checks,
+so records from an upstream that ignores a parameter are still dropped.
+"""
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+MIN_VOLUME = {'markets': 1000, 'events': 10000}
+
+# Raw fields holding each logical field, in the order the parsers read them
+RAW_FIELDS = {
+    'closed': ('closed',),
+    'resolved': ('resolved',),
+    'active': ('active',),
+    'volume': ('volumeNum', 'volume', 'volumeClob'),
+    'end_date': ('endDate', 'end_date', 'end_date_iso'),
+}
+DEFAULTS = {'closed': False, 'resolved': False, 'active': True}
+
+# (field, op) -> Gamma query parameter, per endpoint
+PUSHDOWN = {
+    'markets': {('closed', 'eq'): 'closed', ('active', 'eq'): 'active',
+                ('volume', 'min'): 'volume_num_min', ('end_date', 'min'): 'end_date_min'},
+    'events': {('closed', 'eq'): 'closed', ('active', 'eq'): 'active',
+               ('volume', 'min'): 'volume_min', ('end_date', 'min'): 'end_date_min'},
+}
+
+
+def _timestamp(value) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        from polymarket import parse_date
+        return parse_date(value).timestamp()
+    except Exception:
+        return None
+
+
+class Condition:
+    """One filter a record has to pass
+
+    Args:
+        field: Logical field: 'closed', 'resolved', 'active', 'volume' or 'end_date'.
+        op: 'eq', or 'min' for a lower bound (exclusive for end_date, a timestamp).
+        value: Expected value or bound.
+        reason: RECORDS_SKIPPED reason for records it drops.
+    """
+
+    def __init__(self, field: str, op: str, value, reason: str):
+        self.field = field
+        self.op = op
+        self.value = value
+        self.reason = reason
+
+    def _raw(self, record: Dict):
+        for name in RAW_FIELDS[self.field]:
+            if record.get(name) not in (None, ''):
+                return record[name]
+        return DEFAULTS.get(self.field)
+
+    def matches(self, record: Dict) -> bool:
+        """Whether a raw record passes; values that can't be read pass and are left to the parser"""
+        value = self._raw(record)
+        if self.op == 'eq':
+            return bool(value) == self.value
+        if value is None:
+            return True
+        if self.field == 'end_date':
+            end_ts = _timestamp(value)
+            return end_ts is None or end_ts > self.value
+        try:
+            volume = float(value)
+        except (TypeError, ValueError):
+            return True
+        # Without a total volume the parsers fall back to 24h volume
+        return not volume or volume >= self.value
+
+    def param_value(self):
+        if isinstance(self.value, bool):
+            return 'true' if self.value else 'false'
+        if self.field == 'end_date':
+            return int(self.value)
+        return self.value
+
+    def __repr__(self):
+        return f"{self.field} {'==' if self.op == 'eq' else '>='} {self.value!r}"
+
+
+class QueryPlan:
+    """Conditions split into upstream query parameters and the residual checked locally"""
+
+    def __init__(self, kind: str, conditions: Iterable[Condition]):
+        self.kind = kind
+        self.conditions = merge(conditions)
+        self.params: Dict = {}
+        self.pushed: List[Condition] = []
+        self.residual: List[Condition] = []
+        for condition in self.conditions:
+            param = PUSHDOWN[kind].get((condition.field, condition.op))
+            if param is None:
+                self.residual.append(condition)
+            else:
+                self.params[param] = condition.param_value()
+                self.pushed.append(condition)
+
+    def rejects(self, record: Dict) -> Optional[str]:
+        """Skip reason of the first residual condition a raw record fails, or None"""
+        for condition in self.residual:
+            if not condition.matches(record):
+                return condition.reason
+        return None
+
+
+def merge(conditions: Iterable[Condition]) -> List[Condition]:
+    """One condition per field and op; lower bounds keep the tightest one"""
+    merged: Dict = {}
+    for condition in conditions:
+        key = (condition.field, condition.op)
+        current = merged.get(key)
+        if current is None or (condition.op == 'min' and condition.value > current.value):
+            merged[key] = condition
+    return list(merged.values())
+
+
+def top_list_conditions(kind: str, now: Optional[float] = None) -> List[Condition]:
+    """The filters parse_market_data / parse_event_data apply to a top list"""
+    # An event without total volume passes the events parser on 24h volume at the markets
+    # floor, so that is the only safe bound for events; the parser applies the $10,000 itself
+    volume_floor = MIN_VOLUME['markets'] if kind == 'events' else MIN_VOLUME[kind]
+    conditions = [
+        Condition('closed', 'eq', False, 'closed'),
+        Condition('active', 'eq', True, 'closed'),
+        Condition('volume', 'min', volume_floor, 'low_volume'),
+        Condition('end_date', 'min', time.time() if now is None else now, 'past_end_date'),
+    ]
+    if kind == 'markets':
+        conditions.insert(1, Condition('resolved', 'eq', False, 'closed'))
+    return conditions
+
+
+def plan_query(kind: str, end_date: Optional[str] = None, now: Optional[float] = None) -> QueryPlan:
+    """Plan a top-list request; an end_date window also asks for records still open at its end"""
+    conditions = top_list_conditions(kind, now)
+    if end_date:
+        try:
+            end_ts = datetime.fromisoformat(end_date).timestamp()
+            conditions.append(Condition('end_date', 'min', end_ts, 'past_end_date'))
+        except ValueError:
+            pass
+    return QueryPlan(kind, conditions)
@@ -0,0 +1,210 @@
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlparse
+
+import metrics
+import timing
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no flock; the bucket then only coordinates threads in one process
+    fcntl = None
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_RATE = float(os.environ.get('POLYMARKET_RATE_LIMIT', '5'))
+DEFAULT_BURST = float(os.environ.get('POLYMARKET_RATE_BURST', '10'))
+DEFAULT_STATE_FILE = os.environ.get('POLYMARKET_RATE_LIMIT_FILE')
+# Longest Retry-After honoured; a longer one would stall every worker on the host
+MAX_RETRY_AFTER = float(os.environ.get('POLYMARKET_MAX_RETRY_AFTER', '60'))
+
+# tokens, last refill timestamp, blocked-until timestamp
+_STATE = struct.Struct('ddd')
+
+
+class TokenBucket:
+    """Token bucket shared by every process on the host through a locked state file.
+
+    Each acquire takes an exclusive flock on the state file, refills the bucket
+    from the elapsed wall-clock time and either takes a token or computes how long
+    to wait. Sleeping happens outside the lock so waiting workers don't block
+    the ones that can proceed.
+
+    Args:
+        rate: Tokens added per second. A rate of 0 or less disables limiting.
+        burst: Maximum number of tokens the bucket can hold.
+        state_file: Path of the shared state file. Defaults to a file in the system
+            temp directory, resolved here rather than at import to keep cold starts cheap.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: float = DEFAULT_BURST,
+                 state_file: Optional[str] = DEFAULT_STATE_FILE):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.state_file = state_file or os.path.join(tempfile.gettempdir(), 'polymarket_gamma_ratelimit.state')
+        self._thread_lock = threading.Lock()
+        self._fd = None
+        self._fd_pid = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def _open(self) -> int:
+        # A forked worker inherits the parent's descriptor, and flock on a shared
+        # open file description would not exclude the parent, so reopen per process
+        if self._fd is None or self._fd_pid != os.getpid():
+            # O_BINARY keeps Windows from translating newline bytes in the packed state
+            self._fd = os.open(self.state_file, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+            self._fd_pid = os.getpid()
+        return self._fd
+
+    def _locked_update(self, update):
+        """Run update(tokens, blocked_until, now) under the file lock and persist its result"""
+        with self._thread_lock:
+            fd = self._open()
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                # lseek + read/write rather than pread/pwrite, which Windows lacks;
+                # the locks above keep the offset from being moved in between
+                os.lseek(fd, 0, os.SEEK_SET)
+                raw = os.read(fd, _STATE.size)
+                if len(raw) == _STATE.size:
+                    tokens, last, blocked_until = _STATE.unpack(raw)
+                    if last > now:
+                        # Clock went backwards; start the refill window again
+                        last = now
+                else:
+                    tokens, last, blocked_until = self.burst, now, 0.0
+                tokens = min(self.burst, tokens + (now - last) * self.rate)
+                tokens, blocked_until, result = update(tokens, blocked_until, now)
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, _STATE.pack(tokens, now, blocked_until))
+                return result
+            finally:
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Block until a token is available. Returns False if timeout expires first."""
+        if not self.enabled:
+            return True
+
+        deadline = None if timeout is None else time.time() + timeout
+
+        def take(tokens, blocked_until, now):
+            if now < blocked_until:
+                return tokens, blocked_until, blocked_until - now
+            if tokens >= 1:
+                return tokens - 1, blocked_until, 0.0
+            return tokens, blocked_until, (1 - tokens) / self.rate
+
+        while True:
+            wait = self._locked_update(take)
+            if wait <= 0:
+                return True
+            if deadline is not None and time.time() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def penalize(self, delay: float):
+        """Stop all workers from sending requests for delay seconds (e.g. after a 429)"""
+        if not self.enabled or delay <= 0:
+            return
+
+        def block(tokens, blocked_until, now):
+            return 0.0, max(blocked_until, now + delay), None
+
+        self._locked_update(block)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_shared_limiter = None
+
+
+def get_shared_limiter() -> TokenBucket:
+    """Return the process-wide limiter configured from the environment"""
+    global _shared_limiter
+    if _shared_limiter is None:
+        _shared_limiter = TokenBucket()
+    return _shared_limiter
+
+
+def endpoint_label(url: str) -> str:
+    """Metric label for a request path, with id segments collapsed (/events/123 -> /events/{id})"""
+    path = urlparse(url).path or '/'
+    return '/'.join('{id}' if segment.isdigit() else segment for segment in path.split('/'))
+
+
+def limited_get(url: str, limiter: Optional[TokenBucket] = None, max_retries: int = 3,
+                session: Optional['requests.Session'] = None, endpoint: Optional[str] = None,
+                **kwargs) -> 'requests.Response':
+    """requests.get that takes a token first and honours Retry-After on 429/503
+
+    A throttled response penalizes the shared bucket so every worker backs off,
+    then the request is retried up to max_retries times. A Retry-After longer
+    than POLYMARKET_MAX_RETRY_AFTER isn't waited for; that response is
+    returned right away instead. The last response is
+    returned as-is so callers keep their own raise_for_status handling. Pass a
+    requests.Session to reuse connections across many calls, and endpoint to
+    label the request metrics when the URL path carries ids.
+    """
+    import requests
+
+    limiter = limiter or get_shared_limiter()
+    endpoint = endpoint or endpoint_label(url)
+    order = str((kwargs.get('params') or {}).get('order', ''))
+    attempt = 0
+    while True:
+        with timing.phase('ratelimit_wait'):
+            limiter.acquire()
+        start = time.perf_counter()
+        try:
+            with timing.phase('upstream'):
+                response = (session or requests).get(url, **kwargs)
+        except requests.exceptions.RequestException:
+            metrics.GAMMA_RESPONSES.inc((endpoint, 'error'))
+            raise
+        metrics.GAMMA_REQUEST_SECONDS.observe(time.perf_counter() - start, (endpoint, order))
+        metrics.GAMMA_RESPONSES.inc((endpoint, str(response.status_code)))
+        if response.status_code not in (429, 503) or attempt >= max_retries:
+            return response
+
+        delay = parse_retry_after(response.headers.get('Retry-After'))
+        if delay is None:
+            if response.status_code == 503:
+                return response
+            delay = 2 ** attempt
+        elif delay > MAX_RETRY_AFTER:
+            print(f"Gamma API returned {response.status_code} with Retry-After {delay:.0f}s, "
+                  f"over the {MAX_RETRY_AFTER:.0f}s limit; not retrying")
+            return response
+        print(f"Gamma API returned {response.status_code}, backing off {delay:.1f}s "
+              f"(retry {attempt + 1}/{max_retries})")
+        if limiter.enabled:
+            limiter.penalize(delay)
+        else:
+            time.sleep(delay)
+        attempt += 1
@@ -0,0 +1,170 @@
+"""Incrementally maintained aggregates behind /stats.
+
+Rollups keep each record's contribution (category, end month, volumes,
+liquidity) keyed by id. Ingesting a snapshot only applies the differences to
+the running totals: records that left are subtracted, new ones added and
+changed ones swapped. The /stats view is rebuilt from the per-bucket totals
+after each ingest, so serving it is a dictionary lookup no matter how many
+records were ingested. Rollups are per process, like the change logs.
+"""
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from changes import ID_FIELDS
+
+
+def end_month(end_date) -> str:
+    """End-date bucket of a parsed record: 'YYYY-MM', or 'unknown'"""
+    if isinstance(end_date, str) and len(end_date) >= 7 and end_date[4] == '-':
+        return end_date[:7]
+    if isinstance(end_date, (int, float)):
+        return time.strftime('%Y-%m', time.gmtime(end_date))
+    return 'unknown'
+
+
+class _Bucket:
+    __slots__ = ('count', 'volume_usd', 'volume_24h', 'liquidity', 'members', 'top_id')
+
+    def __init__(self):
+        self.count = 0
+        self.volume_usd = 0.0
+        self.volume_24h = 0.0
+        self.liquidity = 0.0
+        self.members: Dict[str, float] = {}
+        self.top_id: Optional[str] = None
+
+    def add(self, record_id: str, contribution: Tuple):
+        _, _, volume, volume_24h, liquidity, _ = contribution
+        self.count += 1
+        self.volume_usd += volume
+        self.volume_24h += volume_24h
+        self.liquidity += liquidity
+        self.members[record_id] = volume
+        if self.top_id is None or volume > self.members[self.top_id]:
+            self.top_id = record_id
+
+    def remove(self, record_id: str, contribution: Tuple):
+        _, _, volume, volume_24h, liquidity, _ = contribution
+        self.count -= 1
+        self.volume_usd -= volume
+        self.volume_24h -= volume_24h
+        self.liquidity -= liquidity
+        del self.members[record_id]
+        if record_id == self.top_id:
+            # Only rescans this bucket, and only when its top record leaves or changes
+            self.top_id = max(self.members, key=self.members.get) if self.members else None
+
+
+class Rollups:
+    """Count, volume, 24h volume, liquidity and top record per category and end month for one kind
+
+    Args:
+        kind: 'markets' or 'events'; selects the id field.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.id_field = ID_FIELDS[kind]
+        self._lock = threading.Lock()
+        self._records: Dict[str, Tuple] = {}
+        self._total = _Bucket()
+        self._categories: Dict[str, _Bucket] = {}
+        self._end_months: Dict[str, _Bucket] = {}
+        self._view = self._build_view(None)
+
+    def _contribution(self, record: Dict) -> Tuple:
+        return (
+            record.get('category') or 'Uncategorized',
+            end_month(record.get('end_date')),
+            float(record.get('volume_usd') or 0),
+            float(record.get('volume_24h') or 0),
+            float(record.get('liquidity') or 0),
+            record.get('title'),
+        )
+
+    def _add(self, record_id: str, contribution: Tuple):
+        self._records[record_id] = contribution
+        self._total.add(record_id, contribution)
+        self._categories.setdefault(contribution[0], _Bucket()).add(record_id, contribution)
+        self._end_months.setdefault(contribution[1], _Bucket()).add(record_id, contribution)
+
+    def _remove(self, record_id: str):
+        contribution = self._records.pop(record_id)
+        self._total.remove(record_id, contribution)
+        for buckets, key in ((self._categories, contribution[0]), (self._end_months, contribution[1])):
+            bucket = buckets[key]
+            bucket.remove(record_id, contribution)
+            if not bucket.count:
+                del buckets[key]
+
+    def ingest(self, records: Iterable[Dict]) -> int:
+        """Apply a snapshot and return how many records changed
+
+        The snapshot replaces the previous one: ids missing from it are
+        removed. Unchanged records cost one tuple comparison.
+        """
+        incoming = {}
+        for record in records:
+            record_id = record.get(self.id_field)
+            if record_id in (None, ''):
+                continue
+            incoming[str(record_id)] = self._contribution(record)
+
+        with self._lock:
+            changed = 0
+            for record_id in [record_id for record_id in self._records if record_id not in incoming]:
+                self._remove(record_id)
+                changed += 1
+            for record_id, contribution in incoming.items():
+                previous = self._records.get(record_id)
+                if previous == contribution:
+                    continue
+                if previous is not None:
+                    self._remove(record_id)
+                self._add(record_id, contribution)
+                changed += 1
+            if changed or self._view['updated_at'] is None:
+                self._view = self._build_view(time.time())
+            else:
+                self._view = dict(self._view, updated_at=time.time())
+            return changed
+
+    def _summary(self, bucket: _Bucket) -> Dict:
+        top = None
+        if bucket.top_id is not None:
+            contribution = self._records[bucket.top_id]
+            top = {'id': bucket.top_id, 'title': contribution[5], 'volume_usd': contribution[2]}
+        return {
+            'count': bucket.count,
+            'volume_usd': round(bucket.volume_usd, 2),
+            'volume_24h': round(bucket.volume_24h, 2),
+            'liquidity': round(bucket.liquidity, 2),
+            'top': top,
+        }
+
+    def _build_view(self, updated_at: Optional[float]) -> Dict:
+        return {
+            'kind': self.kind,
+            'updated_at': updated_at,
+            'totals': self._summary(self._total),
+            'by_category': {name: self._summary(bucket) for name, bucket in
+                            sorted(self._categories.items(), key=lambda item: item[1].volume_usd, reverse=True)},
+            'by_end_month': {month: self._summary(bucket) for month, bucket in sorted(self._end_months.items())},
+        }
+
+    def stats(self) -> Dict:
+        """The prebuilt aggregate view; no work proportional to the number of records"""
+        return self._view
+
+
+_rollups: Dict[str, Rollups] = {}
+_rollups_lock = threading.Lock()
+
+
+def get_rollups(kind: str) -> Rollups:
+    """Return the process-wide rollups for a kind"""
+    with _rollups_lock:
+        if kind not in _rollups:
+            _rollups[kind] = Rollups(kind)
+        return _rollups[kind]
@@ -0,0 +1,223 @@
+"""Persisted top-N snapshots for serving the first requests after a cold start.
+
+Every fresh unfiltered top list is written to POLYMARKET_SNAPSHOT_DIR (the
+system temp directory by default). A process that has no fresh data yet loads
+the newest snapshot it can find there, or one of the snapshot files bundled
+with the repo. It answers the first unfiltered /fetch_* requests from that
+snapshot, marked with its age, while one background refresh fetches the real
+list. Once that refresh lands, requests go upstream as usual.
+
+Records whose end date has passed are dropped on load, and persisted snapshots
+older than POLYMARKET_SNAPSHOT_MAX_AGE seconds (default one day) are ignored.
+Bundled files record no save time (their mtime is just the checkout time), so
+they are the last resort and are served with an unknown age.
+"""
+import csv
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import timing
+from changes import get_change_log
+from rollups import get_rollups
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_AGE = float(os.environ.get('POLYMARKET_SNAPSHOT_MAX_AGE', '86400'))
+BUNDLED_FILES = {
+    'markets': ('polymarket_top50.json', 'polymarket_top50.csv'),
+    'events': ('polymarket_top50_events.json', 'polymarket_top50_events.csv'),
+}
+NUMERIC_FIELDS = ('rank', 'volume_usd', 'volume_total', 'volume_24h', 'liquidity')
+
+
+def snapshot_dir() -> str:
+    return os.environ.get('POLYMARKET_SNAPSHOT_DIR') or tempfile.gettempdir()
+
+
+def snapshot_path(kind: str) -> str:
+    return os.path.join(snapshot_dir(), f"polymarket_snapshot_{kind}.json")
+
+
+def save_snapshot(kind: str, records: List[Dict]):
+    """Atomically replace the persisted snapshot of a kind"""
+    path = snapshot_path(kind)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'kind': kind, 'saved_at': time.time(), 'records': records}, f, ensure_ascii=False,
+                      default=str)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not persist {kind} snapshot to {path}: {e}")
+
+
+def _read_bundled(kind: str, path: str) -> List[Dict]:
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            records = list(csv.DictReader(f))
+        for record in records:
+            for field in NUMERIC_FIELDS:
+                if record.get(field) not in (None, ''):
+                    try:
+                        record[field] = float(record[field]) if field != 'rank' else int(record[field])
+                    except ValueError:
+                        pass
+            # Event CSVs only have the split volume columns
+            record.setdefault('volume_usd', record.get('volume_total', 0))
+    else:
+        with open(path, encoding='utf-8') as f:
+            records = json.load(f)
+    if kind == 'events':
+        # Older event exports used the market field names
+        for record in records:
+            record.setdefault('event_id', record.get('market_id'))
+            record.setdefault('event_slug', record.get('market_slug'))
+    return records
+
+
+def _still_open(record: Dict, now: float) -> bool:
+    end_date = record.get('end_date')
+    if not end_date:
+        return True
+    try:
+        from polymarket import parse_date
+        end_ts = float(end_date) if isinstance(end_date, (int, float)) else parse_date(end_date).timestamp()
+    except Exception:
+        return True
+    return end_ts > now
+
+
+def load_snapshot(kind: str, max_age: float = MAX_AGE) -> Optional[Dict]:
+    """Newest usable snapshot of a kind: {kind, source, saved_at, records}, or None
+
+    saved_at is None for a bundled file.
+    """
+    now = time.time()
+    candidates = []
+    path = snapshot_path(kind)
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        saved_at = float(data['saved_at'])
+        if now - saved_at <= max_age:
+            candidates.append((saved_at, path, data['records']))
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    for name in BUNDLED_FILES[kind]:
+        bundled = os.path.join(BASE_DIR, name)
+        if os.path.exists(bundled):
+            candidates.append((None, bundled, None))
+
+    for saved_at, source, records in candidates:
+        try:
+            if records is None:
+                records = _read_bundled(kind, source)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable snapshot {source}: {e}")
+            continue
+        records = [record for record in records if isinstance(record, dict) and _still_open(record, now)]
+        if not records:
+            continue
+        for rank, record in enumerate(records, 1):
+            record['rank'] = rank
+        return {'kind': kind, 'source': os.path.basename(source), 'saved_at': saved_at, 'records': records}
+    return None
+
+
+class Bootstrap:
+    """Snapshot-backed answers for one kind until this process has fetched fresh data
+
+    Args:
+        kind: 'markets' or 'events'.
+        refresh: Fetches and publishes a fresh top list in the background; returns its records.
+        max_age: Oldest snapshot, in seconds, worth serving.
+    """
+
+    def __init__(self, kind: str, refresh: Optional[Callable[[], List[Dict]]] = None, max_age: float = MAX_AGE):
+        self.kind = kind
+        self.refresh = refresh
+        self.max_age = max_age
+        self.fresh = False
+        self.snapshot: Optional[Dict] = None
+        self._loaded = False
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        self.snapshot = load_snapshot(self.kind, self.max_age)
+        if self.snapshot is not None:
+            saved_at = self.snapshot['saved_at']
+            age = f"{time.time() - saved_at:.0f}s old" if saved_at is not None else 'age unknown'
+            logger.info(f"Bootstrapped {len(self.snapshot['records'])} {self.kind} from {self.snapshot['source']} "
+                        f"({age})")
+            # /stats and the change log start from the snapshot too
+            get_rollups(self.kind).ingest(self.snapshot['records'])
+            get_change_log(self.kind).record(self.snapshot['records'])
+
+    def current(self) -> Optional[Dict]:
+        """The snapshot to answer with, or None once fresh data exists (or there is no snapshot)
+
+        The first call also starts the background refresh; while it runs,
+        further calls keep getting the snapshot instead of going upstream.
+        """
+        with self._lock:
+            if self.fresh:
+                return None
+            self._load()
+            if self.snapshot is None:
+                return None
+            start = not self._refreshing and self.refresh is not None
+            self._refreshing = self._refreshing or start
+        if start:
+            threading.Thread(target=self._refresh, name=f"bootstrap-{self.kind}", daemon=True).start()
+        return self.snapshot
+
+    def _refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Background {self.kind} refresh failed: {type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                # Without fresh data the next request starts another attempt
+                self._refreshing = False
+
+    def mark_fresh(self):
+        with self._lock:
+            self.fresh = True
+            self.snapshot = None
+
+
+_bootstraps: Dict[str, Bootstrap] = {}
+_bootstraps_lock = threading.Lock()
+
+
+def get_bootstrap(kind: str) -> Bootstrap:
+    """Return the process-wide bootstrap for a kind"""
+    with _bootstraps_lock:
+        if kind not in _bootstraps:
+            _bootstraps[kind] = Bootstrap(kind)
+        return _bootstraps[kind]
+
+
+def publish_top(kind: str, records: List[Dict]) -> Optional[Dict]:
+    """Record a fresh unfiltered top list: change log, rollups and the persisted snapshot
+
+    Returns the change log entry, if anything moved.
+    """
+    with timing.phase('diff'):
+        diff = get_change_log(kind).record(records)
+    with timing.phase('rollup'):
+        get_rollups(kind).ingest(records)
+    save_snapshot(kind, records)
+    get_bootstrap(kind).mark_fresh()
+    return diff
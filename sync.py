@@ -0,0 +1,238 @@
+"""Incremental sync of the Gamma catalog into a local SQLite store.
+
+The store keeps one row per record keyed by (kind, id) with the upstream
+updatedAt value and a content hash. After the first full pull, a sync pages
+through the endpoint ordered by updatedAt, newest first, and stops once it
+reaches records older than the stored watermark, so an hourly refresh only
+transfers and merges what changed:
+
+    python sync.py --kind both                 # first run pulls everything
+    python sync.py --kind both                 # later runs fetch only updates
+    python sync.py --kind markets --full       # rescan, comparing content hashes
+
+If upstream ignores the ordering or records come without updatedAt, the sync
+falls back to a full scan and merges only records whose hash changed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import metrics
+
+DEFAULT_DB = os.environ.get('POLYMARKET_SYNC_DB')
+DEFAULT_PAGE_SIZE = 500
+# Records updated while a sync is paging can land behind the watermark, so
+# each sync re-reads a short window before it; the hashes make that cheap
+OVERLAP_SECONDS = 300
+
+ENDPOINTS = {'markets': '/markets', 'events': '/events'}
+
+
+def content_hash(record: Dict) -> str:
+    payload = json.dumps(record, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _timestamp(value) -> Optional[float]:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+def _updated_at(record: Dict) -> Optional[str]:
+    return record.get('updatedAt') or record.get('updated_at')
+
+
+class SyncStore:
+    """SQLite store of raw records with per-kind sync watermarks
+
+    Args:
+        path: Database file. Defaults to POLYMARKET_SYNC_DB or a file in the system temp directory.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_DB):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'polymarket_sync.sqlite3')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                kind TEXT NOT NULL,
+                id TEXT NOT NULL,
+                updated_at TEXT,
+                hash TEXT NOT NULL,
+                data TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (kind, id)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                kind TEXT PRIMARY KEY,
+                watermark TEXT,
+                last_sync REAL,
+                last_full_sync REAL
+            );
+        """)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def state(self, kind: str) -> Dict:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT watermark, last_sync, last_full_sync FROM sync_state WHERE kind = ?', (kind,)).fetchone()
+        if not row:
+            return {'watermark': None, 'last_sync': None, 'last_full_sync': None}
+        return {'watermark': row[0], 'last_sync': row[1], 'last_full_sync': row[2]}
+
+    def set_state(self, kind: str, watermark: Optional[str], full: bool):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO sync_state (kind, watermark, last_sync, last_full_sync) VALUES (?, ?, ?, ?)
+                ON CONFLICT(kind) DO UPDATE SET
+                    watermark = excluded.watermark,
+                    last_sync = excluded.last_sync,
+                    last_full_sync = COALESCE(excluded.last_full_sync, sync_state.last_full_sync)
+            """, (kind, watermark, now, now if full else None))
+
+    def merge(self, kind: str, records: Iterable[Dict]) -> Dict[str, List[str]]:
+        """Upsert records whose content hash changed; returns ids by outcome"""
+        outcome = {'inserted': [], 'updated': [], 'unchanged': []}
+        now = time.time()
+        with self._lock, self._conn:
+            for record in records:
+                record_id = record.get('id')
+                if record_id is None:
+                    continue
+                record_id = str(record_id)
+                digest = content_hash(record)
+                row = self._conn.execute(
+                    'SELECT hash FROM records WHERE kind = ? AND id = ?', (kind, record_id)).fetchone()
+                if row and row[0] == digest:
+                    outcome['unchanged'].append(record_id)
+                    continue
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO records (kind, id, updated_at, hash, data, synced_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (kind, record_id, _updated_at(record), digest,
+                     json.dumps(record, ensure_ascii=False), now))
+                outcome['updated' if row else 'inserted'].append(record_id)
+        for name, ids in outcome.items():
+            if ids:
+                metrics.SYNC_RECORDS.inc((kind, name), len(ids))
+        return outcome
+
+    def load(self, kind: str) -> List[Dict]:
+        """All stored raw records of one kind"""
+        with self._lock:
+            rows = self._conn.execute('SELECT data FROM records WHERE kind = ?', (kind,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count(self, kind: str) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM records WHERE kind = ?', (kind,)).fetchone()[0]
+
+
+def sync(store: SyncStore, kind: str = 'markets', fetcher=None, page_size: int = DEFAULT_PAGE_SIZE,
+         full: bool = False) -> Dict:
+    """Bring the store up to date for one kind and return a summary of the run
+
+    Incremental runs page newest-first by updatedAt and stop after the first
+    page that reaches below the watermark (minus OVERLAP_SECONDS). The new
+    watermark is the newest updatedAt seen.
+    """
+    import requests
+
+    if fetcher is None:
+        from polymarket import PolymarketFetcher
+        fetcher = PolymarketFetcher()
+
+    started = time.perf_counter()
+    state = store.state(kind)
+    watermark = state['watermark']
+    stop_before = None
+    if not full and watermark:
+        stop_before = (_timestamp(watermark) or 0) - OVERLAP_SECONDS
+    mode = 'incremental' if stop_before is not None else 'full'
+
+    summary = {'kind': kind, 'mode': mode, 'pages': 0, 'fetched': 0,
+               'inserted': [], 'updated': [], 'unchanged': 0}
+    newest, newest_ts = watermark, _timestamp(watermark)
+    params = {'order': 'updatedAt', 'ascending': 'false'}
+    offset = 0
+    previous_ts = None
+    with requests.Session() as session:
+        while True:
+            page = fetcher.fetch_page(ENDPOINTS[kind], offset, page_size, params, session=session)
+            summary['pages'] += 1
+            summary['fetched'] += len(page)
+            offset += len(page)
+
+            outcome = store.merge(kind, page)
+            summary['inserted'].extend(outcome['inserted'])
+            summary['updated'].extend(outcome['updated'])
+            summary['unchanged'] += len(outcome['unchanged'])
+
+            reached_watermark = False
+            for record in page:
+                ts = _timestamp(_updated_at(record))
+                if ts is None or (previous_ts is not None and ts > previous_ts):
+                    if mode == 'incremental':
+                        print(f"Sync {kind}: updatedAt missing or not ordered upstream; "
+                              f"falling back to a full hash-compared scan")
+                        mode = summary['mode'] = 'full'
+                    continue
+                previous_ts = ts
+                if newest_ts is None or ts > newest_ts:
+                    newest, newest_ts = _updated_at(record), ts
+                if mode == 'incremental' and ts < stop_before:
+                    reached_watermark = True
+
+            if len(page) < page_size or reached_watermark:
+                break
+
+    store.set_state(kind, newest, full=mode == 'full')
+    summary['watermark'] = newest
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incrementally sync Polymarket markets/events into a local store')
+    parser.add_argument('--kind', choices=['markets', 'events', 'both'], default='markets')
+    parser.add_argument('--db', default=DEFAULT_DB, help='SQLite store (default: temp directory)')
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument('--full', action='store_true', help='Rescan everything, merging only changed hashes')
+    args = parser.parse_args()
+
+    store = SyncStore(args.db)
+    kinds = ['markets', 'events'] if args.kind == 'both' else [args.kind]
+    try:
+        for kind in kinds:
+            summary = sync(store, kind, page_size=args.page_size, full=args.full)
+            print(f"Sync {kind} ({summary['mode']}): {summary['pages']} pages, {summary['fetched']} fetched, "
+                  f"{len(summary['inserted'])} new, {len(summary['updated'])} updated, "
+                  f"{summary['unchanged']} unchanged, {store.count(kind)} stored, "
+                  f"watermark {summary['watermark']} in {summary['seconds']:.2f}s")
+    except Exception as e:
+        print(f"Sync failed: {type(e).__name__}: {e}")
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""diff_snapshots and ChangeLog cursors on plain parsed records"""
+from changes import ChangeLog, diff_snapshots
+
+
+def market(record_id: str, rank: int, volume: float = 1000.0, liquidity: float = 10.0):
+    return {'market_id': record_id, 'rank': rank, 'title': f"Market {record_id}", 'volume_usd': volume,
+            'liquidity': liquidity}
+
+
+def snapshot(*records):
+    return {record['market_id']: {key: record[key] for key in ('rank', 'title', 'volume_usd', 'liquidity')}
+            for record in records}
+
+
+def test_entered_exited_and_movers():
+    previous = snapshot(market('a', 1), market('b', 2), market('c', 3), market('d', 4))
+    current = snapshot(market('c', 1), market('a', 2, volume=1500), market('e', 3), market('b', 4))
+    diff = diff_snapshots(previous, current)
+
+    assert [record['id'] for record in diff['entered']] == ['e']
+    assert [record['id'] for record in diff['exited']] == ['d']
+    assert diff['exited'][0]['rank'] == 4
+    # Biggest move first
+    assert [(change['id'], change['old_rank'], change['new_rank'], change['delta'])
+            for change in diff['rank_changes']] == [('c', 3, 1, 2), ('b', 2, 4, -2), ('a', 1, 2, -1)]
+    assert [(change['id'], change['volume_delta']) for change in diff['volume_changes']] == [('a', 500.0)]
+
+
+def test_identical_snapshots_have_no_changes():
+    records = snapshot(market('a', 1), market('b', 2))
+    assert not any(diff_snapshots(records, dict(records)).values())
+
+
+def test_record_skips_first_and_unchanged_snapshots():
+    log = ChangeLog('markets')
+    assert log.record([market('a', 1)]) is None
+    assert log.record([market('a', 1)]) is None
+    entry = log.record([market('b', 1), market('a', 2)])
+    assert entry['cursor'] == 1 == log.cursor
+    assert [record['id'] for record in entry['entered']] == ['b']
+    # Records without an id don't take part in the diff
+    assert log.record([market('b', 1), market('a', 2), {'rank': 3, 'title': 'no id'}]) is None
+
+
+def test_since_cursor_and_reset():
+    log = ChangeLog('markets', retain=2)
+    log.record([market('a', 1)])
+    for volume in (2000, 3000, 4000, 5000):
+        log.record([market('a', 1, volume=volume)])
+    assert log.cursor == 4
+
+    everything = log.since(0)
+    assert [entry['cursor'] for entry in everything['changes']] == [3, 4]
+    assert not everything['reset']
+
+    caught_up = log.since(2)
+    assert [entry['cursor'] for entry in caught_up['changes']] == [3, 4]
+    assert not caught_up['reset']
+
+    assert log.since(4)['changes'] == [] and not log.since(4)['reset']
+    # Diff 2 was dropped before this client saw it
+    assert log.since(1)['reset']
+    # A cursor from another process (or before a restart) is ahead of this log
+    assert log.since(9)['reset']
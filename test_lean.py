@@ -0,0 +1,93 @@
+"""decode_lean against json.loads: table cases plus a seeded fuzz run"""
+import json
+import random
+
+import pytest
+
+from lean import decode_lean, lean_record
+
+
+def expected_lean(value):
+    """What decode_lean should return, computed from the fully decoded value"""
+    if isinstance(value, list):
+        return [expected_lean(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    result = {}
+    for key, item in value.items():
+        if key == 'markets':
+            children = item.values() if isinstance(item, dict) else item if isinstance(item, list) else ()
+            result['market_count'] = sum(isinstance(child, (dict, list)) for child in children)
+        elif key == 'description':
+            result['description'] = ''
+        else:
+            result[key] = expected_lean(item)
+    return result
+
+
+CASES = {
+    'plain': [{'id': '1', 'title': 'Fed', 'description': 'long text', 'markets': [{'id': 'a'}, {'id': 'b'}]}],
+    'escaped quotes': [{'title': 'say "markets": [', 'description': 'a "quoted" {text}', 'markets': [{'q': '"'}]}],
+    'escaped backslash before quote': [{'title': 'ends with \\', 'description': '\\', 'markets': [{'q': 'x\\'}]},
+                                       {'title': '\\"markets\\": [', 'markets': []}],
+    'brackets in strings': [{'description': '] } [ {', 'markets': [{'outcomes': '["Yes", "No"]'}, {'q': ']]}}'}]}],
+    'escaped quote in key': [{'x"markets': [1, 2], 'markets\\': {'a': 1}, '"description"': 'kept', 'title': 't'}],
+    'nested description in markets': [{'markets': [{'description': 'inner', 'markets': [{}]}, {'description': '}'}],
+                                       'description': 'outer'}],
+    'null and empty': [{'markets': None, 'description': None}, {'markets': []}, {'markets': {}}],
+    'wrapped page': {'events': [{'markets': [{}, {}, {}], 'description': 'x'}], 'next': None},
+}
+
+
+@pytest.mark.parametrize('name', sorted(CASES))
+@pytest.mark.parametrize('indent', [None, 2])
+def test_matches_full_decode(name, indent):
+    text = json.dumps(CASES[name], indent=indent)
+    assert decode_lean(text) == expected_lean(json.loads(text))
+
+
+def test_escaped_quote_key_is_not_a_markets_key():
+    decoded = decode_lean(json.dumps([{'x"markets': [{'a': 1}], 'title': 't'}]))
+    assert decoded == [{'x"markets': [{'a': 1}], 'title': 't'}]
+
+
+def test_counts_market_objects():
+    page = [{'id': str(i), 'markets': [{'id': f"{i}-{j}", 'description': '[{'} for j in range(i)]} for i in range(5)]
+    assert [event['market_count'] for event in decode_lean(json.dumps(page))] == list(range(5))
+
+
+@pytest.mark.parametrize('text', [
+    '[{"markets": [{"a": 1}',
+    '[{"description": "abc',
+    '[{"markets": [{"a": "]"',
+])
+def test_truncated_input_raises(text):
+    with pytest.raises(ValueError):
+        decode_lean(text)
+
+
+ALPHABET = ['a', ' ', '"', '\\', '[', ']', '{', '}', ':', ',', '\n', 'é', 'markets', 'description', '\\"']
+KEYS = ['markets', 'description', 'title', 'id', 'x"markets', 'markets\\', '\\', '"description"', 'm']
+
+
+def random_value(rng: random.Random, depth: int):
+    roll = rng.random()
+    if depth > 3 or roll < 0.35:
+        return rng.choice([None, True, 1, 2.5, ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 8)))])
+    if roll < 0.65:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {rng.choice(KEYS): random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+
+
+def test_fuzz_against_json_loads():
+    rng = random.Random(48)
+    for _ in range(3000):
+        value = [random_value(rng, 0) for _ in range(rng.randint(0, 3))]
+        text = json.dumps(value, indent=rng.choice([None, 1]), ensure_ascii=rng.random() < 0.5)
+        assert decode_lean(text) == expected_lean(json.loads(text)), text
+
+
+def test_lean_record_blanks_description_and_drops_markets():
+    record = {'event_id': '1', 'description': 'text', 'markets': [{}], 'market_count': 1}
+    assert lean_record(record) == {'event_id': '1', 'description': '', 'market_count': 1}
+    assert record['description'] == 'text'
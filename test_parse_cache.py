@@ -0,0 +1,82 @@
+"""ParseCache hits, digest invalidation and end-date expiry, with a stub parser"""
+import time
+
+import metrics
+import parse_cache
+from parse_cache import ParseCache
+
+
+class CountingParser:
+    def __init__(self, end_date=None):
+        self.calls = 0
+        self.end_date = end_date
+
+    def __call__(self, record, rank):
+        self.calls += 1
+        if record.get('closed'):
+            metrics.record_skip('markets', 'closed')
+            return None
+        return {'market_id': record['id'], 'title': record.get('question'), 'rank': rank, 'end_date': self.end_date}
+
+
+def skipped(reason: str) -> float:
+    return metrics.RECORDS_SKIPPED.value(('markets', reason))
+
+
+def test_hit_reuses_parse_with_new_rank():
+    cache, parser = ParseCache(), CountingParser()
+    record = {'id': '1', 'question': 'Q?', 'volumeNum': 5000}
+    first = cache.parse('markets', record, 1, parser)
+    second = cache.parse('markets', record, 7, parser)
+    assert parser.calls == 1
+    assert second == dict(first, rank=7)
+    second['title'] = 'changed'
+    assert cache.parse('markets', record, 1, parser)['title'] == 'Q?'
+
+
+def test_digest_ignores_unread_fields_and_invalidates_on_read_ones():
+    cache, parser = ParseCache(), CountingParser()
+    record = {'id': '1', 'question': 'Q?', 'volumeNum': 5000, 'bestBid': 0.4}
+    cache.parse('markets', record, 1, parser)
+    cache.parse('markets', dict(record, bestBid=0.6), 1, parser)
+    assert parser.calls == 1
+    assert cache.parse('markets', dict(record, question='New?'), 1, parser)['title'] == 'New?'
+    cache.parse('markets', dict(record, question='New?', volumeNum=6000), 1, parser)
+    assert parser.calls == 3
+
+
+def test_hit_past_end_date_is_dropped(monkeypatch):
+    cache, parser = ParseCache(), CountingParser(end_date=time.time() + 60)
+    record = {'id': '1', 'question': 'Q?'}
+    assert cache.parse('markets', record, 1, parser) is not None
+    before = skipped('past_end_date')
+    later = time.time() + 120
+    monkeypatch.setattr(parse_cache.time, 'time', lambda: later)
+    assert cache.parse('markets', record, 1, parser) is None
+    assert cache.parse('markets', record, 1, parser) is None
+    assert parser.calls == 1
+    assert skipped('past_end_date') == before + 2
+
+
+def test_dropped_record_counts_its_skip_on_every_hit():
+    cache, parser = ParseCache(), CountingParser()
+    record = {'id': '2', 'question': 'Q?', 'closed': True}
+    before = skipped('closed')
+    for _ in range(3):
+        assert cache.parse('markets', record, 1, parser) is None
+    assert parser.calls == 1
+    assert skipped('closed') == before + 3
+
+
+def test_lru_eviction_and_disabled_cache():
+    cache, parser = ParseCache(maxsize=2), CountingParser()
+    for record_id in ('1', '2', '3'):
+        cache.parse('markets', {'id': record_id}, 1, parser)
+    assert len(cache) == 2
+    cache.parse('markets', {'id': '1'}, 1, parser)
+    assert parser.calls == 4
+
+    disabled, parser = ParseCache(maxsize=0), CountingParser()
+    disabled.parse('markets', {'id': '1'}, 1, parser)
+    disabled.parse('markets', {'id': '1'}, 1, parser)
+    assert parser.calls == 2 and len(disabled) == 0
@@ -0,0 +1,69 @@
+"""Query planning: condition merging, push-down per endpoint and residual checks on raw records"""
+from datetime import datetime
+
+from queryplan import Condition, QueryPlan, merge, plan_query
+
+NOW = datetime(2026, 1, 1).timestamp()
+
+
+def test_merge_keeps_tightest_minimum_per_field():
+    merged = merge([
+        Condition('end_date', 'min', NOW, 'past_end_date'),
+        Condition('volume', 'min', 1000, 'low_volume'),
+        Condition('end_date', 'min', NOW + 86400, 'past_end_date'),
+        Condition('volume', 'min', 500, 'low_volume'),
+        Condition('closed', 'eq', False, 'closed'),
+    ])
+    bounds = {(condition.field, condition.op): condition.value for condition in merged}
+    assert bounds == {('end_date', 'min'): NOW + 86400, ('volume', 'min'): 1000, ('closed', 'eq'): False}
+
+
+def test_end_date_window_merges_with_not_ended():
+    later = plan_query('markets', end_date='2026-03-31', now=NOW)
+    assert later.params['end_date_min'] == int(datetime(2026, 3, 31).timestamp())
+    earlier = plan_query('markets', end_date='2025-06-30', now=NOW)
+    assert earlier.params['end_date_min'] == int(NOW)
+    assert plan_query('markets', end_date='not a date', now=NOW).params['end_date_min'] == int(NOW)
+
+
+def test_markets_push_down_and_residual():
+    plan = plan_query('markets', now=NOW)
+    assert plan.params == {'closed': 'false', 'active': 'true', 'volume_num_min': 1000, 'end_date_min': int(NOW)}
+    assert [(condition.field, condition.value) for condition in plan.residual] == [('resolved', False)]
+    assert plan.rejects({'resolved': True}) == 'closed'
+    assert plan.rejects({'resolved': False, 'volumeNum': 5}) is None
+
+
+def test_events_push_down_and_residual():
+    plan = plan_query('events', now=NOW)
+    # The events parser falls back to 24h volume at $1,000 when total volume is missing
+    assert plan.params == {'closed': 'false', 'active': 'true', 'volume_min': 1000, 'end_date_min': int(NOW)}
+    assert plan.residual == []
+    assert plan.rejects({'resolved': True}) is None
+
+
+def test_unsupported_conditions_stay_residual():
+    plan = QueryPlan('events', [Condition('resolved', 'eq', False, 'closed'),
+                                Condition('volume', 'min', 5000, 'low_volume')])
+    assert plan.params == {'volume_min': 5000}
+    assert plan.rejects({'resolved': True}) == 'closed'
+
+
+def test_condition_matches_raw_records():
+    volume = Condition('volume', 'min', 1000, 'low_volume')
+    assert volume.matches({'volumeNum': 1000})
+    assert not volume.matches({'volumeNum': 999})
+    # Falls through volumeNum -> volume -> volumeClob
+    assert not volume.matches({'volume': '12.5'})
+    # Missing, zero or unreadable volume is left to the parser's 24h fallback
+    assert volume.matches({}) and volume.matches({'volumeNum': 0}) and volume.matches({'volume': 'n/a'})
+
+    ended = Condition('end_date', 'min', NOW, 'past_end_date')
+    assert not ended.matches({'endDate': '2025-12-31T00:00:00Z'})
+    assert ended.matches({'endDate': '2026-06-30T00:00:00Z'})
+    assert ended.matches({'endDate': 'someday'}) and ended.matches({})
+
+    closed = Condition('closed', 'eq', False, 'closed')
+    assert closed.matches({}) and not closed.matches({'closed': True})
+    active = Condition('active', 'eq', True, 'closed')
+    assert active.matches({}) and not active.matches({'active': False})
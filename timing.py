@@ -0,0 +1,107 @@
+"""Per-request phase timing and opt-in profiling.
+
+A PhaseTimer is bound to the current request through a context variable, so
+code deep in the fetchers can attribute time to a phase with
+``with timing.phase('upstream'):`` without the timer being passed around.
+Outside a timed request the helper is a no-op.
+"""
+import contextvars
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+PROFILE_MODE = os.environ.get('POLYMARKET_PROFILE', '').lower()  # '', 'header' or 'all'
+PROFILE_HEADER = 'X-Profile'
+PROFILE_DIR = os.environ.get('POLYMARKET_PROFILE_DIR')
+
+_current_timer = contextvars.ContextVar('polymarket_phase_timer', default=None)
+
+
+class PhaseTimer:
+    """Accumulates wall time per named phase, in first-seen order
+
+    Worker threads running in a copy of the request's context (see
+    batch.py) add to the same timer, so a phase can exceed the wall time.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self._token = None
+        self._lock = threading.Lock()
+
+    def activate(self) -> 'PhaseTimer':
+        self._token = _current_timer.set(self)
+        return self
+
+    def deactivate(self):
+        if self._token is not None:
+            _current_timer.reset(self._token)
+            self._token = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def as_dict(self) -> Dict[str, float]:
+        """Phase durations in milliseconds"""
+        return {name: round(seconds * 1000, 3) for name, seconds in self.phases.items()}
+
+    def server_timing_header(self) -> str:
+        return ', '.join(f"{name};dur={ms}" for name, ms in self.as_dict().items())
+
+
+def current_timer() -> Optional[PhaseTimer]:
+    return _current_timer.get()
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block against the active request's timer, if there is one"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+    else:
+        with timer.phase(name):
+            yield
+
+
+def profiling_requested(headers) -> bool:
+    """Whether this request should be profiled under the POLYMARKET_PROFILE setting"""
+    if PROFILE_MODE == 'all':
+        return True
+    return PROFILE_MODE == 'header' and headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes')
+
+
+class RequestProfiler:
+    """cProfile wrapper that writes one .prof file per profiled request
+
+    cProfile only sees the thread that enabled it, which is the request thread
+    under both the dev server and gunicorn's threaded workers.
+    """
+
+    def __init__(self, label: str):
+        import cProfile
+
+        self.label = re.sub(r'[^A-Za-z0-9_.-]+', '_', label).strip('_') or 'root'
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self) -> str:
+        self.profile.disable()
+        profile_dir = PROFILE_DIR or os.path.join(tempfile.gettempdir(), 'polymarket_profiles')
+        os.makedirs(profile_dir, exist_ok=True)
+        path = os.path.join(profile_dir, f"{self.label}-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{time.perf_counter_ns() % 1000000}.prof")
+        self.profile.dump_stats(path)
+        return path
@@ -0,0 +1,250 @@
+"""Watchlists: persisted sets of market or event ids, refreshed by id and served from memory.
+
+Watched markets are often far outside the top N by volume, so finding them in
+top lists means crawling. A watchlist looks its ids up directly instead. Gamma
+list endpoints take repeated id parameters (/markets?id=1&id=2...), so a refresh
+is a few requests of up to `batch_size` ids each, with `concurrency` of them in
+flight. The records go through the regular parsers (and the parse cache), and
+the ranked result is kept in memory until it is older than
+POLYMARKET_WATCHLIST_TTL seconds:
+
+    store = get_watchlists()
+    store.put('macro', 'markets', ['516710', '516711'])
+    store.view('macro')    # {'name', 'kind', 'ids', 'records', 'missing', 'refreshed_at'}
+
+Definitions are saved to POLYMARKET_WATCHLIST_FILE (default in the system temp
+directory) and reloaded when another worker changes the file. Watched ids that
+upstream doesn't return, or that the parsers drop (closed, resolved, ended),
+are listed under 'missing'.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import timing
+from pipeline import SOURCES
+
+logger = logging.getLogger(__name__)
+
+TTL = float(os.environ.get('POLYMARKET_WATCHLIST_TTL', '60'))
+MAX_IDS = 1000
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_CONCURRENCY = 4
+
+
+def watchlist_path() -> str:
+    return os.environ.get('POLYMARKET_WATCHLIST_FILE') or os.path.join(tempfile.gettempdir(),
+                                                                       'polymarket_watchlists.json')
+
+
+def fetch_by_ids(kind: str, ids: List[str], fetcher=None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY, session=None) -> List[Dict]:
+    """Raw records for ids, batch_size ids per request and up to concurrency requests at once
+
+    Raises requests exceptions when a batch fails, so a refresh never
+    mistakes an upstream error for ids that no longer exist.
+    """
+    from ratelimit import limited_get
+
+    source = SOURCES[kind]
+    fetcher = fetcher or source.make_fetcher()
+    url = f"{fetcher.base_url}{source.endpoint}"
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+
+    def fetch(batch: List[str]) -> List[Dict]:
+        response = limited_get(url, fetcher.rate_limiter, session=session, endpoint=f"{source.endpoint}?id",
+                               headers=fetcher.headers, params={'id': batch, 'limit': len(batch)}, timeout=30)
+        response.raise_for_status()
+        with timing.phase('decode'):
+            data = response.json()
+        if isinstance(data, dict):
+            data = data.get(kind) or []
+        return data if isinstance(data, list) else []
+
+    if len(batches) <= 1:
+        return fetch(batches[0]) if batches else []
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as executor:
+        return [record for page in executor.map(fetch, batches) for record in page]
+
+
+class Watchlist:
+    """One named set of ids plus its last refreshed records"""
+
+    def __init__(self, name: str, kind: str, ids: Iterable):
+        self.name = name
+        self.kind = kind
+        self.ids = list(dict.fromkeys(str(record_id) for record_id in ids))
+        self.records: List[Dict] = []
+        self.missing: List[str] = []
+        self.refreshed_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def as_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'kind': self.kind,
+            'ids': self.ids,
+            'records': self.records,
+            'missing': self.missing,
+            'refreshed_at': self.refreshed_at,
+        }
+
+
+class WatchlistStore:
+    """Watchlist definitions backed by a JSON file, with their records cached in memory
+
+    Args:
+        path: Definitions file; defaults to POLYMARKET_WATCHLIST_FILE.
+        ttl: Seconds refreshed records are served before the next read refreshes them.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = TTL, batch_size: int = DEFAULT_BATCH_SIZE,
+                 concurrency: int = DEFAULT_CONCURRENCY):
+        self.path = path or watchlist_path()
+        self.ttl = ttl
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self._watchlists: Dict[str, Watchlist] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._session = None
+        self.stats = {'refreshes': 0, 'requests': 0}
+
+    def _sync(self):
+        """Reload definitions written by another process; unchanged lists keep their records"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read watchlists from {self.path}: {e}")
+            return
+        self._mtime = mtime
+        watchlists = {}
+        for name, entry in saved.items():
+            current = self._watchlists.get(name)
+            if current is not None and current.kind == entry.get('kind') and current.ids == entry.get('ids'):
+                watchlists[name] = current
+            elif entry.get('kind') in SOURCES:
+                watchlists[name] = Watchlist(name, entry['kind'], entry.get('ids') or [])
+        self._watchlists = watchlists
+
+    def _save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        saved = {name: {'kind': watchlist.kind, 'ids': watchlist.ids} for name, watchlist in self._watchlists.items()}
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(saved, f)
+            os.replace(tmp_path, self.path)
+            self._mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            logger.warning(f"Could not persist watchlists to {self.path}: {e}")
+
+    def names(self) -> List[Dict]:
+        with self._lock:
+            self._sync()
+            return [{'name': watchlist.name, 'kind': watchlist.kind, 'count': len(watchlist.ids),
+                     'refreshed_at': watchlist.refreshed_at} for watchlist in self._watchlists.values()]
+
+    def get(self, name: str) -> Optional[Watchlist]:
+        with self._lock:
+            self._sync()
+            return self._watchlists.get(name)
+
+    def put(self, name: str, kind: str, ids: Iterable) -> Watchlist:
+        """Create or replace a watchlist; raises ValueError for an unknown kind or too many ids"""
+        if kind not in SOURCES:
+            raise ValueError("kind must be 'markets' or 'events'")
+        watchlist = Watchlist(name, kind, ids)
+        if len(watchlist.ids) > MAX_IDS:
+            raise ValueError(f"a watchlist holds at most {MAX_IDS} ids")
+        with self._lock:
+            self._sync()
+            self._watchlists[name] = watchlist
+            self._save()
+        return watchlist
+
+    def delete(self, name: str) -> bool:
+        with self._lock:
+            self._sync()
+            if self._watchlists.pop(name, None) is None:
+                return False
+            self._save()
+            return True
+
+    def refresh(self, watchlist: Watchlist) -> Watchlist:
+        """Look the ids up in batches, parse them and replace the in-memory records"""
+        from parse_cache import get_parse_cache
+
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        source = SOURCES[watchlist.kind]
+        fetcher = source.make_fetcher()
+        with timing.phase('watchlist'):
+            raw = fetch_by_ids(watchlist.kind, watchlist.ids, fetcher, self.batch_size, self.concurrency,
+                               self._session)
+        self.stats['refreshes'] += 1
+        self.stats['requests'] += -(-len(watchlist.ids) // self.batch_size)
+
+        parser = source.parser(fetcher)
+        parse_cache = get_parse_cache()
+        watched = set(watchlist.ids)
+        records = []
+        for position, record in enumerate(raw, 1):
+            # Upstream may add records the filter didn't ask for; only watched ids count
+            if str(record.get('id')) not in watched:
+                continue
+            with timing.phase('parse'):
+                parsed = parse_cache.parse(watchlist.kind, record, position, parser)
+            if parsed:
+                records.append(parsed)
+        records.sort(key=lambda record: record.get('volume_usd') or 0, reverse=True)
+        for rank, record in enumerate(records, 1):
+            record['rank'] = rank
+        found = {str(record.get(source.id_field)) for record in records}
+        watchlist.records = records
+        watchlist.missing = [record_id for record_id in watchlist.ids if record_id not in found]
+        watchlist.refreshed_at = time.time()
+        return watchlist
+
+    def view(self, name: str, refresh: bool = False) -> Optional[Dict]:
+        """The watchlist with its records, refreshed first if forced or older than ttl"""
+        watchlist = self.get(name)
+        if watchlist is None:
+            return None
+        # One refresh per watchlist at a time; concurrent readers wait for it and reuse the result
+        with watchlist.lock:
+            stale = watchlist.refreshed_at is None or time.time() - watchlist.refreshed_at >= self.ttl
+            if refresh or stale:
+                try:
+                    self.refresh(watchlist)
+                except Exception as e:
+                    if watchlist.refreshed_at is None:
+                        raise
+                    # Serve the last good records rather than nothing
+                    logger.warning(f"Refreshing watchlist {name} failed, serving the previous records: {e}")
+        return watchlist.as_dict()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_watchlists() -> WatchlistStore:
+    """Return the process-wide watchlist store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WatchlistStore()
+        return _store